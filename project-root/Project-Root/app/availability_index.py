@@ -0,0 +1,389 @@
+"""
+In-process availability index - bitmaps of 15-minute slots per trainer and per
+room over a fixed horizon, so booking pre-checks and free-slot searches are
+bitwise operations instead of queries.
+
+PostgreSQL stays the source of truth: the index only answers requests it can
+map exactly (grid-aligned times inside the horizon) and returns None for
+anything else, and its booking pre-checks are hints that the database confirms
+or overrules. Writes made by this process update it in place. Other processes'
+writes arrive as cache_invalidation notifications once listen_for_invalidations()
+is running, and claims, new availability and rooms are applied in place
+(anything else, including a released claim off the slot grid, drops the index).
+While the listener is connected the index is rebuilt AVAILABILITY_INDEX_LISTEN_TTL
+seconds (default 3600) after the last build; otherwise other processes' writes
+show up at the rebuild AVAILABILITY_INDEX_TTL seconds (default 60) after it.
+A booking that shows the index was wrong drops it too. reset_availability_index() drops it.
+"""
+import os
+import threading
+import time as timer
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import text
+from models.database import engine, start_cache_listener, cache_listener_connected
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_BYTES = SLOTS_PER_DAY // 8
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Ledger claims in the horizon as absolute slot numbers; partially covered
+# slots count as busy
+CLAIM_SLOTS_SQL = text("""
+    SELECT resource_type, resource_id,
+           floor(extract(epoch FROM lower(time_range) - :origin) / :slot_seconds)::int AS first_slot,
+           ceil(extract(epoch FROM upper(time_range) - :origin) / :slot_seconds)::int AS end_slot
+    FROM resource_bookings
+    WHERE time_range && tsrange(:origin, :horizon_end)
+""")
+
+
+def bits(first, end):
+    """Mask with bits first..end-1 set."""
+    return ((1 << (end - first)) - 1) << first
+
+
+def slot_of(moment):
+    """Slot within its day, or None if the time is not on the slot grid."""
+    minutes = moment.hour * 60 + moment.minute
+    if moment.second or moment.microsecond or minutes % SLOT_MINUTES:
+        return None
+    return minutes // SLOT_MINUTES
+
+
+def parse_tsrange(value):
+    """(lower, upper) of a tsrange in its text form, e.g. '["2025-01-06 09:00:00","2025-01-06 10:00:00")'."""
+    lower, upper = (datetime.fromisoformat(bound.strip('"')) for bound in value[1:-1].split(","))
+    return lower, upper
+
+
+def fits(mask, starts, length):
+    """
+    Slots p where p..p+length-1 are all set in mask and no window starts inside
+    p+1..p+length-1, i.e. a booking of `length` slots fits in a single window.
+    """
+    run = mask
+    for i in range(1, length):
+        run &= (mask >> i) & ~(starts >> i)
+    return run
+
+
+class AvailabilityIndex:
+    """
+    Bitmaps over `days` days from first_day. Trainer availability is kept per
+    weekday (recurring) and per date (specific), each with a second mask marking
+    where windows start so a booking is only accepted inside a single window,
+    like PT_BOOKING_CHECK_SQL. Busy slots are one bytearray per resource,
+    DAY_BYTES per day.
+    """
+
+    def __init__(self, first_day, days=365):
+        self.first_day = first_day
+        self.days = days
+        self.trainers = {}           # trainer_id -> display name
+        self.rooms = []              # room ids, in order
+        self.recurring = {}          # trainer_id -> [open mask, window starts] per weekday
+        self.specific = {}           # trainer_id -> {date ordinal: [open mask, window starts]}
+        self.busy = {}               # (resource_type, resource_id) -> bytearray
+        self.built_at = None         # time.monotonic() of the last build
+
+    # ---- building and incremental updates ----
+
+    def build(self, conn):
+        self.built_at = timer.monotonic()
+        origin = datetime.combine(self.first_day, time())
+        self.trainers = dict(conn.execute(text(
+            "SELECT trainer_id, first_name || ' ' || last_name FROM trainers"
+        )).all())
+        self.rooms = conn.execute(text("SELECT room_id FROM rooms ORDER BY room_id")).scalars().all()
+        for row in conn.execute(text(
+            "SELECT trainer_id, start_time, end_time, is_recurring, day_of_week, specific_date FROM availabilities"
+        )):
+            self.add_availability(*row)
+        claims = conn.execute(CLAIM_SLOTS_SQL, {
+            "origin": origin,
+            "horizon_end": origin + timedelta(days=self.days),
+            "slot_seconds": SLOT_MINUTES * 60,
+        }).cursor.fetchall()
+        # Hot loop for big ledgers: claims inside one day are OR-ed in directly
+        busy, size = self.busy, self.days * DAY_BYTES
+        for resource_type, resource_id, first_slot, end_slot in claims:
+            day, first = divmod(first_slot, SLOTS_PER_DAY)
+            end = end_slot - day * SLOTS_PER_DAY
+            if first_slot < 0 or end > SLOTS_PER_DAY or day >= self.days:
+                self.mark(resource_type, resource_id, first_slot, end_slot, True)
+                continue
+            buffer = busy.get((resource_type, resource_id))
+            if buffer is None:
+                buffer = busy[(resource_type, resource_id)] = bytearray(size)
+            offset = day * DAY_BYTES
+            current = int.from_bytes(buffer[offset:offset + DAY_BYTES], "little") | bits(first, end)
+            buffer[offset:offset + DAY_BYTES] = current.to_bytes(DAY_BYTES, "little")
+        return self
+
+    def add_availability(self, trainer_id, start_time, end_time, is_recurring, day_of_week, specific_date):
+        # Only slots fully inside the window are open
+        first = -(-(start_time.hour * 60 + start_time.minute) // SLOT_MINUTES)
+        end = (end_time.hour * 60 + end_time.minute) // SLOT_MINUTES
+        if first >= end:
+            return
+        if is_recurring:
+            if day_of_week not in WEEKDAYS:
+                return
+            days = self.recurring.setdefault(trainer_id, [[0, 0] for _ in WEEKDAYS])
+            window = days[WEEKDAYS.index(day_of_week)]
+        else:
+            window = self.specific.setdefault(trainer_id, {}).setdefault(specific_date.toordinal(), [0, 0])
+        window[0] |= bits(first, end)
+        window[1] |= 1 << first
+
+    def add_room(self, room_id):
+        if room_id not in self.rooms:
+            self.rooms.append(room_id)
+            self.rooms.sort()
+
+    def add_claim(self, resource_type, resource_id, start, end):
+        self.mark(resource_type, resource_id, *self.slot_range(start, end), True)
+
+    def release_claim(self, resource_type, resource_id, start, end):
+        # Clears whole slots, so only exact for a claim on the slot grid (on_grid)
+        self.mark(resource_type, resource_id, *self.slot_range(start, end), False)
+
+    def apply_change(self, payload):
+        """
+        Applies one cache_invalidation row notification (see database.py).
+        Returns False when it cannot be applied in place and the index has to
+        be rebuilt: a TRUNCATE, a trainer change (names), a removed window or
+        a released claim off the slot grid.
+        """
+        table, row = payload.get("table"), payload.get("row")
+        if row is None:
+            return False
+        if table == "resource_bookings":
+            start, end = parse_tsrange(payload["time_range"])
+            # A claim off the slot grid may share its edge slots with a neighbour's
+            if row == "old" and not self.on_grid(start, end):
+                return False
+            claim = self.add_claim if row == "new" else self.release_claim
+            claim(payload["resource_type"], payload["resource_id"], start, end)
+            return True
+        if table == "availabilities":
+            # Windows are OR-ed together, so one cannot be taken out again
+            if row == "old":
+                return False
+            specific_date = payload["specific_date"]
+            self.add_availability(payload["trainer_id"], time.fromisoformat(payload["start_time"]),
+                                  time.fromisoformat(payload["end_time"]), payload["is_recurring"],
+                                  payload["day_of_week"], specific_date and date.fromisoformat(specific_date))
+            return True
+        if table == "rooms":
+            if row == "new":
+                self.add_room(payload["room_id"])
+            elif payload["room_id"] in self.rooms:
+                self.rooms.remove(payload["room_id"])
+            return True
+        return table != "trainers"
+
+    def on_grid(self, start, end):
+        """True when start and end fall on slot boundaries, so the claim owns every slot it marks."""
+        origin = datetime.combine(self.first_day, time())
+        step = timedelta(minutes=SLOT_MINUTES)
+        return not (start - origin) % step and not (end - origin) % step
+
+    def slot_range(self, start, end):
+        origin = datetime.combine(self.first_day, time())
+        step = timedelta(minutes=SLOT_MINUTES)
+        return (start - origin) // step, -((origin - end) // step)
+
+    def mark(self, resource_type, resource_id, first_slot, end_slot, busy):
+        first_slot = max(first_slot, 0)
+        end_slot = min(end_slot, self.days * SLOTS_PER_DAY)
+        if first_slot >= end_slot:
+            return
+        buffer = self.busy.get((resource_type, resource_id))
+        if buffer is None:
+            buffer = self.busy[(resource_type, resource_id)] = bytearray(self.days * DAY_BYTES)
+        for day in range(first_slot // SLOTS_PER_DAY, (end_slot - 1) // SLOTS_PER_DAY + 1):
+            base = day * SLOTS_PER_DAY
+            mask = bits(max(first_slot, base) - base, min(end_slot, base + SLOTS_PER_DAY) - base)
+            offset = day * DAY_BYTES
+            current = int.from_bytes(buffer[offset:offset + DAY_BYTES], "little")
+            current = current | mask if busy else current & ~mask
+            buffer[offset:offset + DAY_BYTES] = current.to_bytes(DAY_BYTES, "little")
+
+    # ---- queries ----
+
+    def day_number(self, day):
+        number = (day - self.first_day).days
+        return number if 0 <= number < self.days else None
+
+    def busy_mask(self, resource_type, resource_id, number):
+        buffer = self.busy.get((resource_type, resource_id))
+        if buffer is None:
+            return 0
+        offset = number * DAY_BYTES
+        return int.from_bytes(buffer[offset:offset + DAY_BYTES], "little")
+
+    def windows(self, trainer_id, day):
+        """[open mask, window starts] pairs that apply to the trainer on this date."""
+        found = []
+        weekly = self.recurring.get(trainer_id)
+        if weekly and weekly[day.weekday()][0]:
+            found.append(weekly[day.weekday()])
+        specific = self.specific.get(trainer_id, {}).get(day.toordinal())
+        if specific:
+            found.append(specific)
+        return found
+
+    def check_booking(self, trainer_id, room_id, start, end):
+        """
+        Pre-check a same-day booking. Returns 'ok', 'unknown_trainer',
+        'trainer_unavailable', 'trainer_busy' or 'room_busy', or None when the
+        index cannot answer exactly (off-grid times, outside the horizon).
+        A prediction only: the database has the final say.
+        """
+        number = self.day_number(start.date())
+        first, last = slot_of(start), slot_of(end)
+        if number is None or first is None or last is None or end.date() != start.date() or first >= last:
+            return None
+        if trainer_id not in self.trainers:
+            return "unknown_trainer"
+        length = last - first
+        if not any(fits(mask, starts, length) >> first & 1 for mask, starts in self.windows(trainer_id, start.date())):
+            return "trainer_unavailable"
+        wanted = bits(first, last)
+        if self.busy_mask("trainer", trainer_id, number) & wanted:
+            return "trainer_busy"
+        if room_id is not None and self.busy_mask("room", room_id, number) & wanted:
+            return "room_busy"
+        return "ok"
+
+    def free_slots(self, first_day, last_day, slot_minutes=60, trainer_id=None, room_id=None,
+                   with_rooms=False, step_minutes=30, not_before=None):
+        """
+        Same contract as logic.find_free_slots, answered from the bitmaps.
+        Returns None when the request is off the slot grid or outside the horizon.
+        Claims that start or end off the grid block their whole slot here.
+        """
+        first_number, last_number = self.day_number(first_day), self.day_number(last_day)
+        if (first_number is None or last_number is None
+                or slot_minutes % SLOT_MINUTES or step_minutes % SLOT_MINUTES or slot_minutes <= 0):
+            return None
+        length, step = slot_minutes // SLOT_MINUTES, max(step_minutes // SLOT_MINUTES, 1)
+        rooms = None
+        if with_rooms or room_id is not None:
+            rooms = [r for r in self.rooms if room_id is None or r == room_id]
+        trainer_ids = sorted(self.trainers) if trainer_id is None else [trainer_id]
+
+        slots = []
+        for tid in trainer_ids:
+            if tid not in self.trainers:
+                continue
+            for number in range(first_number, last_number + 1):
+                day = self.first_day + timedelta(days=number)
+                windows = self.windows(tid, day)
+                if not windows:
+                    continue
+                free = ~self.busy_mask("trainer", tid, number) & DAY_MASK
+                midnight = datetime.combine(day, time())
+                starts = set()
+                for mask, window_starts in windows:
+                    usable = mask & free
+                    fit = fits(usable, window_starts, length)
+                    # Stretches begin at a free slot whose predecessor is unusable or a window boundary
+                    stretch = usable & (~(usable << 1) | window_starts)
+                    while stretch:
+                        low = stretch & -stretch
+                        stretch ^= low
+                        p = low.bit_length() - 1
+                        while p < SLOTS_PER_DAY and fit >> p & 1:
+                            starts.add(p)
+                            p += step
+                for p in sorted(starts):
+                    slot_start = midnight + timedelta(minutes=p * SLOT_MINUTES)
+                    if not_before and slot_start < not_before:
+                        continue
+                    free_rooms = None
+                    if rooms is not None:
+                        wanted = bits(p, p + length)
+                        free_rooms = [r for r in rooms if not self.busy_mask("room", r, number) & wanted]
+                        if not free_rooms:
+                            continue
+                    slots.append({"trainer_id": tid, "trainer_name": self.trainers[tid],
+                                  "slot_start": slot_start,
+                                  "slot_end": slot_start + timedelta(minutes=slot_minutes),
+                                  "free_rooms": free_rooms})
+        return slots
+
+
+availability_index = None
+index_ttl = float(os.getenv("AVAILABILITY_INDEX_TTL", "60"))
+# Used instead of index_ttl while the invalidation listener is connected
+listen_ttl = None
+# Notifications received while the index is being built, replayed onto it afterwards
+pending = None
+lock = threading.Lock()
+
+
+def get_availability_index(days=365):
+    """The process-wide index, built from the database on first use and rebuilt once older than current_ttl()."""
+    global availability_index, pending
+    index = availability_index
+    if index is None or index.day_number(date.today()) is None or timer.monotonic() - index.built_at > current_ttl():
+        with lock:
+            pending = []
+        try:
+            with engine.connect() as conn:
+                index = AvailabilityIndex(date.today(), days).build(conn)
+        finally:
+            with lock:
+                replay, pending = pending, None
+                if index is not availability_index:
+                    # Changes committed during the build may or may not be in it;
+                    # applying them again is harmless, and one that cannot be
+                    # applied makes the next use rebuild
+                    if not all(apply_to(index, payload) for payload in replay):
+                        index.built_at = float("-inf")
+                    availability_index = index
+    return index
+
+
+def current_ttl():
+    """listen_ttl while the invalidation listener is connected, index_ttl otherwise."""
+    return listen_ttl if listen_ttl is not None and cache_listener_connected() else index_ttl
+
+
+def apply_to(index, payload):
+    try:
+        return index.apply_change(payload)
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def apply_invalidation(payload):
+    """Applies a cache_invalidation notification to the loaded index, or drops the index."""
+    global availability_index
+    with lock:
+        if pending is not None:
+            pending.append(payload)
+        if availability_index is not None and not apply_to(availability_index, payload):
+            availability_index = None
+
+
+def listen_for_invalidations():
+    """Applies other processes' writes through LISTEN/NOTIFY, with the long TTL while it is connected."""
+    global listen_ttl
+    listen_ttl = float(os.getenv("AVAILABILITY_INDEX_LISTEN_TTL", "3600"))
+    start_cache_listener(apply_invalidation)
+
+
+def loaded_availability_index():
+    """The index if it has been built, without building it."""
+    return availability_index
+
+
+def reset_availability_index():
+    """Drop the index; the next get_availability_index() rebuilds it."""
+    global availability_index
+    availability_index = None
@@ -0,0 +1,84 @@
+"""
+Bulk health metric ingestion - streams device exports (CSV or NDJSON) into
+health_metrics through PostgreSQL COPY, one batch per transaction.
+
+Each reading needs member_id, type, value, date_recorded and optionally unit.
+CSV files must have a header row with those column names.
+"""
+import csv
+import io
+import json
+from itertools import islice
+from sqlalchemy import text
+from models.database import engine, ensure_health_metric_partitions
+
+METRIC_FIELDS = ("member_id", "type", "value", "unit", "date_recorded")
+
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS metric_staging (
+        member_id INTEGER,
+        type VARCHAR(50),
+        value DOUBLE PRECISION,
+        unit VARCHAR(20),
+        date_recorded TIMESTAMP
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Unknown members are dropped, and the unique (member_id, type, date_recorded)
+# index turns repeated readings - within the batch or already stored - into no-ops
+MERGE_STAGING_SQL = text("""
+    INSERT INTO health_metrics (member_id, type, value, unit, date_recorded)
+    SELECT s.member_id, s.type, s.value, s.unit, s.date_recorded
+    FROM metric_staging s
+    WHERE EXISTS (SELECT 1 FROM members m WHERE m.member_id = s.member_id)
+    ON CONFLICT (member_id, type, date_recorded) DO NOTHING
+""")
+
+
+def read_readings(stream, fmt):
+    """Yield (member_id, type, value, unit, date_recorded) tuples from a text stream."""
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield tuple(row.get(field) or None for field in METRIC_FIELDS)
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                row = json.loads(line)
+                yield tuple(row.get(field) for field in METRIC_FIELDS)
+    else:
+        raise ValueError(f"Unsupported format '{fmt}' (use csv or ndjson)")
+
+
+def copy_batch(conn, batch):
+    """COPY one batch into the staging table and merge it into health_metrics."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+
+    cursor = conn.connection.dbapi_connection.cursor()
+    cursor.execute(STAGING_DDL)
+    cursor.copy_expert("COPY metric_staging FROM STDIN WITH (FORMAT csv)", buffer)
+
+    first, last = conn.execute(text("SELECT MIN(date_recorded), MAX(date_recorded) FROM metric_staging")).first()
+    if first is not None:
+        ensure_health_metric_partitions(conn, first.date(), last.date())
+    return conn.execute(MERGE_STAGING_SQL).rowcount
+
+
+def ingest_health_metrics(stream, fmt="csv", batch_size=50_000):
+    """
+    Bulk-load health readings from a CSV or NDJSON text stream.
+    Returns (rows_read, rows_inserted); the difference is duplicates and
+    readings for unknown members.
+    """
+    readings = read_readings(stream, fmt)
+    rows_read = rows_inserted = 0
+    with engine.connect() as conn:
+        while True:
+            batch = list(islice(readings, batch_size))
+            if not batch:
+                break
+            rows_inserted += copy_batch(conn, batch)
+            conn.commit()
+            rows_read += len(batch)
+    return rows_read, rows_inserted
@@ -1,13 +1,19 @@
-from datetime import datetime, date
-from sqlalchemy import func, text
-from models.database import get_session
+from bisect import bisect_left
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import func, insert, text, tuple_
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.exc import IntegrityError
+from models.database import get_session, in_unit_of_work, materialize_pt_slots, mark_pt_slots_booked, PT_SLOT_MINUTES
+from app.availability_index import get_availability_index, loaded_availability_index, reset_availability_index
+from app.reference_cache import reference_cache
 from models.schema import (
     Member, HealthMetric, FitnessGoal, PTSession, ClassRegistration, 
-    GroupClass, Availability, Room, Trainer
+    GroupClass, Availability, Room, Trainer, ResourceBooking
 )
 
 # MEMBER OPERATIONS 
 
+@in_unit_of_work
 def register_member(first_name, last_name, email, password, dob, gender):
     """
     User Registration - Creates a new member with constraint on unique email.
@@ -40,6 +46,7 @@ def register_member(first_name, last_name, email, password, dob, gender):
     finally:
         session.close()
 
+@in_unit_of_work
 def update_member_profile(member_id, new_email=None, new_metric=None, new_goal=None):
     """
     Profile Management - Update personal details|fitness goals|health metrics.
@@ -97,91 +104,177 @@ def update_member_profile(member_id, new_email=None, new_metric=None, new_goal=N
     finally:
         session.close()
 
-def get_member_dashboard(member_id):
+# Dashboard read model: the whole payload is assembled by PostgreSQL and comes
+# back as one JSON document, so a render is a single round trip with no lazy loads
+MEMBER_DASHBOARD_SQL = text("""
+    SELECT json_build_object(
+        'member_id', m.member_id,
+        'first_name', m.first_name,
+        'last_name', m.last_name,
+        'metrics', COALESCE((
+            -- Latest value per metric type plus up to :history_points recent values.
+            -- metric_types walks the distinct types with one index probe each
+            -- (idx_metric_member_type_date), so the cost does not grow with history
+            WITH RECURSIVE metric_types AS (
+                SELECT MIN(type) AS type FROM health_metrics WHERE member_id = :member_id
+                UNION ALL
+                SELECT (SELECT MIN(h.type) FROM health_metrics h
+                        WHERE h.member_id = :member_id AND h.type > mt.type)
+                FROM metric_types mt
+                WHERE mt.type IS NOT NULL
+            )
+            SELECT json_agg(json_build_object(
+                'type', mt.type, 'value', latest.value, 'unit', latest.unit,
+                'date_recorded', latest.date_recorded,
+                'history', COALESCE(history.points, '[]')
+            ) ORDER BY latest.date_recorded DESC, mt.type)
+            FROM metric_types mt
+            CROSS JOIN LATERAL (
+                SELECT h.value, h.unit, h.date_recorded FROM health_metrics h
+                WHERE h.member_id = :member_id AND h.type = mt.type
+                ORDER BY h.date_recorded DESC
+                LIMIT 1
+            ) latest
+            LEFT JOIN LATERAL (
+                SELECT json_agg(recent.value ORDER BY recent.date_recorded) AS points
+                FROM (
+                    SELECT h.value, h.date_recorded FROM health_metrics h
+                    WHERE h.member_id = :member_id AND h.type = mt.type
+                    ORDER BY h.date_recorded DESC
+                    LIMIT :history_points
+                ) recent
+            ) history ON true
+            WHERE mt.type IS NOT NULL
+        ), '[]'),
+        'goals', COALESCE((
+            SELECT json_agg(json_build_object(
+                'type', g.type, 'target_value', g.target_value, 'unit', g.unit,
+                'deadline', g.deadline
+            ) ORDER BY g.goal_id)
+            FROM fitness_goals g
+            WHERE g.member_id = m.member_id AND g.achieved = false
+        ), '[]'),
+        'stats', json_build_object(
+            'total_classes', COALESCE(st.total_classes, 0),
+            'attended_classes', COALESCE(st.attended_classes, 0),
+            -- Counted from the time-filtered list below, so it always matches it;
+            -- member_stats.upcoming_classes also counts past classes not yet marked attended
+            'upcoming_classes', json_array_length(uc.classes),
+            'pt_sessions', COALESCE(st.pt_sessions, 0)
+        ),
+        'upcoming_sessions', COALESCE((
+            SELECT json_agg(json_build_object(
+                'date', s.date, 'start_time', s.start_time, 'end_time', s.end_time,
+                'trainer_name', t.first_name || ' ' || t.last_name,
+                'room_name', r.room_name
+            ) ORDER BY s.date, s.start_time)
+            FROM pt_sessions s
+            LEFT JOIN trainers t ON t.trainer_id = s.trainer_id
+            LEFT JOIN rooms r ON r.room_id = s.room_id
+            WHERE s.member_id = m.member_id AND s.date >= :today AND s.status = 'Scheduled'
+        ), '[]'),
+        'upcoming_classes', uc.classes
+    )
+    FROM members m
+    LEFT JOIN member_stats st ON st.member_id = m.member_id
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+            'title', gc.title, 'schedule_time', gc.schedule_time,
+            'duration_minutes', gc.duration_minutes, 'room_name', r.room_name
+        ) ORDER BY gc.schedule_time), '[]') AS classes
+        FROM class_registrations cr
+        JOIN group_classes gc ON gc.class_id = cr.class_id
+        LEFT JOIN rooms r ON r.room_id = gc.room_id
+        WHERE cr.member_id = m.member_id AND gc.schedule_time >= :now AND cr.status = 'Registered'
+    ) uc
+    WHERE m.member_id = :member_id
+""")
+
+@in_unit_of_work
+def get_member_dashboard_data(member_id, history_points=0):
+    """
+    Dashboard read model - builds the whole dashboard payload in one query.
+    Returns a plain dict (member, metrics, goals, stats, upcoming sessions and
+    classes; dates as ISO strings), or None if the member does not exist.
+    metrics holds the latest reading per type, each with its last
+    history_points values (oldest first) for a sparkline.
+    """
+    session = get_session()
+    try:
+        return session.execute(MEMBER_DASHBOARD_SQL, {
+            "member_id": member_id,
+            "today": date.today(),
+            "now": datetime.now(),
+            "history_points": history_points,
+        }).scalar()
+    finally:
+        session.close()
+
+@in_unit_of_work
+def get_member_dashboard(member_id, history_points=10):
     """
     Dashboard Display - Shows latest health stats, active goals, 
     past class count, and upcoming sessions.
-    Uses the v_member_dashboard_stats view created in database.py
+    Each metric type shows its latest value and a sparkline of the last
+    history_points readings.
+    Renders the payload from get_member_dashboard_data (one database round trip);
+    total, attended and PT counts come from the trigger-maintained member_stats
+    table, the upcoming count from the upcoming class list itself.
     """
-    session = get_session()
     try:
-        # Get member info
-        member = session.query(Member).get(member_id)
-        if not member:
+        data = get_member_dashboard_data(member_id, history_points)
+        if not data:
             print("[ERROR] Member not found.")
             return
         
         print(f"\n{'='*60}")
-        print(f"   MEMBER DASHBOARD - {member.first_name} {member.last_name}")
+        print(f"   MEMBER DASHBOARD - {data['first_name']} {data['last_name']}")
         print(f"{'='*60}")
         
         # Latest health metrics
         print("\n[LATEST HEALTH METRICS]")
-        metrics = session.query(HealthMetric).filter(
-            HealthMetric.member_id == member_id
-        ).order_by(HealthMetric.date_recorded.desc()).all()
-        
-        if metrics:
-            for m in metrics:
-                unit_str = f" {m.unit}" if m.unit else ""
-                print(f"   - {m.type}: {m.value}{unit_str} (recorded {m.date_recorded.strftime('%Y-%m-%d')})")
+        if data['metrics']:
+            for m in data['metrics']:
+                unit_str = f" {m['unit']}" if m['unit'] else ""
+                print(f"   - {m['type']}: {float(m['value'])}{unit_str} (recorded {m['date_recorded'][:10]})")
+                if len(m['history']) > 1:
+                    print(f"     Trend: {sparkline(m['history'])}")
         else:
             print("   No metrics recorded yet.")
         
         # Active fitness goals
         print("\n[ACTIVE FITNESS GOALS]")
-        goals = session.query(FitnessGoal).filter(
-            FitnessGoal.member_id == member_id,
-            FitnessGoal.achieved == False
-        ).all()
-        
-        if goals:
-            for g in goals:
-                unit_str = f" {g.unit}" if g.unit else ""
-                deadline_str = f" by {g.deadline}" if g.deadline else ""
-                print(f"   - {g.type}: Target {g.target_value}{unit_str}{deadline_str}")
+        if data['goals']:
+            for g in data['goals']:
+                unit_str = f" {g['unit']}" if g['unit'] else ""
+                deadline_str = f" by {g['deadline']}" if g['deadline'] else ""
+                print(f"   - {g['type']}: Target {float(g['target_value'])}{unit_str}{deadline_str}")
         else:
             print("   No active goals.")
         
-        # Class participation count using the VIEW
-        result = session.execute(
-            text("SELECT total_classes_attended FROM v_member_dashboard_stats WHERE member_id = :mid"),
-            {"mid": member_id}
-        ).first()
-        
-        class_count = result[0] if result else 0
+        # Class participation counts
+        stats = data['stats']
         print(f"\n[CLASS PARTICIPATION]")
-        print(f"   Total Registered Classes: {class_count}")
+        print(f"   Total Registered Classes: {stats['total_classes']}")
+        print(f"   Attended: {stats['attended_classes']} | Upcoming: {stats['upcoming_classes']}")
+        print(f"   Personal Training Sessions: {stats['pt_sessions']}")
         
         # Upcoming PT Sessions
         print("\n[UPCOMING PERSONAL TRAINING SESSIONS]")
-        upcoming_sessions = session.query(PTSession).filter(
-            PTSession.member_id == member_id,
-            PTSession.date >= date.today(),
-            PTSession.status == 'Scheduled'
-        ).order_by(PTSession.date, PTSession.start_time).all()
-        
-        if upcoming_sessions:
-            for s in upcoming_sessions:
-                trainer = s.trainer
-                print(f"   - {s.date} at {s.start_time} - {s.end_time}")
-                print(f"     Trainer: {trainer.first_name} {trainer.last_name} | Room: {s.room.room_name}")
+        if data['upcoming_sessions']:
+            for s in data['upcoming_sessions']:
+                print(f"   - {s['date']} at {s['start_time']} - {s['end_time']}")
+                print(f"     Trainer: {s['trainer_name']} | Room: {s['room_name']}")
         else:
             print("   No upcoming sessions scheduled.")
         
         # Upcoming Group Classes
         print("\n[UPCOMING GROUP CLASSES]")
-        upcoming_classes = session.query(ClassRegistration).join(GroupClass).filter(
-            ClassRegistration.member_id == member_id,
-            GroupClass.schedule_time >= datetime.now(),
-            ClassRegistration.status == 'Registered'
-        ).order_by(GroupClass.schedule_time).all()
-        
-        if upcoming_classes:
-            for reg in upcoming_classes:
-                gc = reg.group_class
-                print(f"   - {gc.title}")
-                print(f"     {gc.schedule_time.strftime('%Y-%m-%d %H:%M')} | {gc.duration_minutes} min | Room: {gc.room.room_name}")
+        if data['upcoming_classes']:
+            for c in data['upcoming_classes']:
+                schedule_str = c['schedule_time'][:16].replace('T', ' ')
+                print(f"   - {c['title']}")
+                print(f"     {schedule_str} | {c['duration_minutes']} min | Room: {c['room_name']}")
         else:
             print("   No upcoming classes.")
         
@@ -189,122 +282,151 @@ def get_member_dashboard(member_id):
         
     except Exception as e:
         print(f"[ERROR] Failed to load dashboard: {e}")
-    finally:
-        session.close()
+
+# One round trip for the booking checks: trainer/room lookups and trainer
+# availability are evaluated together and returned as a single row.
+# Overlaps are not read here - the excl_pt_*_overlap constraints reject them on insert.
+# The same statement claims the session's slots in the pt_slots inventory: the
+# trainer's free slot rows are locked with SKIP LOCKED, so rows another booking
+# is holding count as taken instead of making this one wait, and the UPDATE
+# claims them for a pre-allocated session id only if all of them were free and
+# come from a single availability window. The counts tell a busy trainer apart
+# from a request the inventory does not cover (outside the horizon, off the grid).
+PT_BOOKING_CHECK_SQL = text("""
+    WITH inventory AS (
+        SELECT availability_id FROM pt_slots
+        WHERE trainer_id = :trainer_id AND slot_start >= :start AND slot_start < :end
+    ),
+    free_slots AS (
+        SELECT slot_id FROM pt_slots
+        WHERE trainer_id = :trainer_id AND slot_start >= :start AND slot_start < :end
+          AND session_id IS NULL AND class_id IS NULL
+        FOR UPDATE SKIP LOCKED
+    ),
+    new_session AS (
+        SELECT nextval(pg_get_serial_sequence('pt_sessions', 'session_id')) AS session_id
+    ),
+    claimed AS (
+        UPDATE pt_slots s SET session_id = n.session_id
+        FROM new_session n
+        WHERE :on_grid
+          AND s.slot_id IN (SELECT slot_id FROM free_slots)
+          AND (SELECT COUNT(*) FROM free_slots) = :slots
+          AND (SELECT COUNT(DISTINCT availability_id) FROM inventory) = 1
+          AND EXISTS (SELECT 1 FROM rooms WHERE room_id = :room_id)
+        RETURNING s.slot_id
+    )
+    SELECT
+        n.session_id,
+        t.first_name AS trainer_first_name,
+        t.last_name AS trainer_last_name,
+        r.room_name,
+        EXISTS (
+            SELECT 1 FROM availabilities
+            WHERE trainer_id = :trainer_id
+              AND start_time <= :start_time AND end_time >= :end_time
+              AND ((is_recurring AND day_of_week = :day_name)
+                   OR (NOT is_recurring AND specific_date = :session_date))
+        ) AS trainer_available,
+        (SELECT COUNT(*) FROM claimed) AS claimed,
+        (SELECT COUNT(*) FROM inventory) AS inventoried,
+        (SELECT COUNT(DISTINCT availability_id) FROM inventory) AS windows
+    FROM new_session n
+    LEFT JOIN trainers t ON t.trainer_id = :trainer_id
+    LEFT JOIN rooms r ON r.room_id = :room_id
+""")
 
 "This function has my index implementation for efficient conflict checking using the index defined in schema.py"
+@in_unit_of_work
 def schedule_pt_session(member_id, trainer_id, room_id, session_date, start_time, end_time):
     """
     PT Session Scheduling - Book or reschedule training with validation.
     Validates trainer availability and room conflicts.
-    Uses the idx_room_date_time index for efficient conflict checking.
+    Lookups, availability and the claim of the session's pt_slots inventory
+    rows run as one statement (PT_BOOKING_CHECK_SQL); member, trainer and
+    room overlaps are rejected by the exclusion constraints on pt_sessions
+    and resource_bookings when the insert commits.
     """
     session = get_session()
     try:
+        session_start = datetime.combine(session_date, start_time)
+        session_end = datetime.combine(session_date, end_time)
+
+        # A loaded in-process availability index predicts the outcome, but it can
+        # miss other processes' writes, so it never turns a booking away: the
+        # database decides, and a verdict the index got wrong drops it
+        # (reconcile_precheck). Booking never builds the index.
+        index = loaded_availability_index()
+        precheck = index.check_booking(trainer_id, room_id, session_start, session_end) if index else None
+
+        # Sessions on the 15-minute grid can be claimed from the slot inventory
+        slot = timedelta(minutes=PT_SLOT_MINUTES)
+        slots = (session_end - session_start) // slot
+        on_grid = (session_end > session_start and not (session_end - session_start) % slot
+                   and not (session_start - datetime.combine(session_date, time())) % slot)
+        check = session.execute(PT_BOOKING_CHECK_SQL, {
+            "member_id": member_id,
+            "trainer_id": trainer_id,
+            "room_id": room_id,
+            "session_date": session_date,
+            "start_time": start_time,
+            "end_time": end_time,
+            "day_name": session_date.strftime("%A"),
+            "start": session_start,
+            "end": session_end,
+            "slots": slots,
+            "on_grid": on_grid,
+        }).mappings().first()
+
         # Validate trainer exists
-        trainer = session.query(Trainer).get(trainer_id)
-        if not trainer:
+        if check["trainer_first_name"] is None:
+            reconcile_precheck(precheck, booked=False)
             print("[ERROR] Trainer not found.")
             return False
         
         # Validate room exists
-        room = session.query(Room).get(room_id)
-        if not room:
+        if check["room_name"] is None:
             print("[ERROR] Room not found.")
             return False
         
-        # Check for member conflicts (member can't be in two sessions at once)
-        member_conflict = session.query(PTSession).filter(
-            PTSession.member_id == member_id,
-            PTSession.date == session_date,
-            PTSession.start_time < end_time,
-            PTSession.end_time > start_time
-        ).first()
-        
-        if member_conflict:
-            print(f"[ERROR] You already have a session booked during that time.")
-            print(f"   Existing: {member_conflict.date} {member_conflict.start_time} - {member_conflict.end_time}")
+        # Trainer must have recurring or specific-date availability covering the slot
+        if not check["trainer_available"]:
+            reconcile_precheck(precheck, booked=False)
+            report_trainer_unavailable(session, trainer_id)
             return False
         
-        # Check for trainer conflicts (trainer can't be in two sessions at once)
-        trainer_conflict = session.query(PTSession).filter(
-            PTSession.trainer_id == trainer_id,
-            PTSession.date == session_date,
-            PTSession.start_time < end_time,
-            PTSession.end_time > start_time
-        ).first()
-        
-        if trainer_conflict:
-            print(f"[ERROR] Trainer already has a session booked during that time.")
-            print(f"   Existing: {trainer_conflict.date} {trainer_conflict.start_time} - {trainer_conflict.end_time}")
+        if on_grid and not check["claimed"] and check["inventoried"] == slots and check["windows"] == 1:
+            # Every slot is in the inventory, so some are booked or being claimed right now
+            session.rollback()
+            reconcile_precheck(precheck, booked=False)
+            resources = {'member': member_id, 'trainer': trainer_id, 'room': room_id}
+            report_booking_conflict(session, "excl_trainer_booking", resources, session_start,
+                                    session_end, check["room_name"])
             return False
         
-        # Check for room conflicts (uses idx_room_date_time index)
-        conflict = session.query(PTSession).filter(
-            PTSession.room_id == room_id,
-            PTSession.date == session_date,
-            PTSession.start_time < end_time,
-            PTSession.end_time > start_time
-        ).first()
-        
-        if conflict:
-            print(f"[ERROR] Room '{room.room_name}' is already booked during that time.")
+        # Create the session; claimed slots are committed together with it
+        booking = {
+            'session_id': check["session_id"],
+            'member_id': member_id,
+            'trainer_id': trainer_id,
+            'room_id': room_id,
+            'date': session_date,
+            'start_time': start_time,
+            'end_time': end_time,
+        }
+        new_session = PTSession(status='Scheduled', **booking)
+        constraint = commit_booking(session, new_session, room_id, trainer_id, session_start, session_end)
+        if constraint:
+            if constraint != 'excl_pt_member_overlap':
+                reconcile_precheck(precheck, booked=False)
+            resources = {'member': member_id, 'trainer': trainer_id, 'room': room_id}
+            report_booking_conflict(session, constraint, resources, session_start, session_end, check["room_name"])
             return False
         
-        # Check if trainer is available at the requested time
-        day_name = session_date.strftime("%A")
-        
-        # Check for recurring availability on this day of week
-        recurring_avail = session.query(Availability).filter(
-            Availability.trainer_id == trainer_id,
-            Availability.is_recurring == True,
-            Availability.day_of_week == day_name,
-            Availability.start_time <= start_time,
-            Availability.end_time >= end_time
-        ).first()
-        
-        # Check for specific date availability
-        specific_avail = session.query(Availability).filter(
-            Availability.trainer_id == trainer_id,
-            Availability.is_recurring == False,
-            Availability.specific_date == session_date,
-            Availability.start_time <= start_time,
-            Availability.end_time >= end_time
-        ).first()
-        
-        if not recurring_avail and not specific_avail:
-            all_avail = session.query(Availability).filter(
-                Availability.trainer_id == trainer_id
-            ).all()
-            
-            print(f"[ERROR] Trainer is not available at the requested time.")
-            if all_avail:
-                print(f"   Trainer's availability:")
-                for a in all_avail:
-                    if a.is_recurring:
-                        print(f"   - {a.day_of_week}s: {a.start_time.strftime('%H:%M')} - {a.end_time.strftime('%H:%M')}")
-                    else:
-                        print(f"   - {a.specific_date}: {a.start_time.strftime('%H:%M')} - {a.end_time.strftime('%H:%M')}")
-            else:
-                print(f"   Trainer has no availability set. Please ask trainer to set their schedule.")
-            return False
-        
-        # Create the session
-        new_session = PTSession(
-            member_id=member_id,
-            trainer_id=trainer_id,
-            room_id=room_id,
-            date=session_date,
-            start_time=start_time,
-            end_time=end_time,
-            status='Scheduled'
-        )
-        session.add(new_session)
-        session.commit()
-        
+        reconcile_precheck(precheck, booked=True)
         print(f"[SUCCESS] PT Session booked successfully!")
         print(f"   Date: {session_date} | Time: {start_time} - {end_time}")
-        print(f"   Trainer: {trainer.first_name} {trainer.last_name} | Room: {room.room_name}")
+        print(f"   Trainer: {check['trainer_first_name']} {check['trainer_last_name']} | Room: {check['room_name']}")
         return True
         
     except Exception as e:
@@ -314,10 +436,457 @@ def schedule_pt_session(member_id, trainer_id, room_id, session_date, start_time
     finally:
         session.close()
 
+# Trainer/room matching in one statement: candidate start times on a step grid
+# inside each day's time window, kept where one availability row covers the
+# session, the trainer, the room and the member are all free. Each (trainer, start)
+# keeps its best room - the preferred one, else the smallest free room so large
+# rooms stay open for classes. Candidates are ranked by a score in minutes:
+# distance from the requested start, plus penalties for a non-preferred trainer
+# or room, then by how busy the trainer already is that day.
+PT_MATCH_SQL = text("""
+    WITH candidates AS (
+        SELECT s AS slot_start, s + :duration AS slot_end
+        FROM generate_series(CAST(:first_day AS TIMESTAMP), CAST(:last_day AS TIMESTAMP), interval '1 day') AS d
+        CROSS JOIN LATERAL generate_series(d + :from_time, d + :to_time - :duration, :step) AS s
+    ),
+    trainer_fit AS (
+        SELECT DISTINCT a.trainer_id, c.slot_start, c.slot_end
+        FROM candidates c
+        JOIN availabilities a
+          ON a.start_time <= CAST(c.slot_start AS TIME) AND a.end_time >= CAST(c.slot_end AS TIME)
+         AND ((a.is_recurring AND a.day_of_week = (ARRAY['Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                                                         'Friday', 'Saturday', 'Sunday'])
+                                                  [extract(isodow FROM c.slot_start)])
+              OR (NOT a.is_recurring AND a.specific_date = CAST(c.slot_start AS DATE)))
+        WHERE c.slot_start >= :not_before
+          AND CAST(c.slot_start AS DATE) = CAST(c.slot_end AS DATE)
+          AND NOT EXISTS (
+              SELECT 1 FROM resource_bookings b
+              WHERE b.resource_type = 'trainer' AND b.resource_id = a.trainer_id
+                AND b.time_range && tsrange(c.slot_start, c.slot_end))
+          AND NOT EXISTS (
+              SELECT 1 FROM pt_sessions p
+              WHERE p.member_id = :member_id AND p.time_range && tsrange(c.slot_start, c.slot_end))
+    ),
+    pairs AS (
+        SELECT DISTINCT ON (tf.trainer_id, tf.slot_start)
+               tf.trainer_id, tf.slot_start, tf.slot_end, r.room_id, r.room_name
+        FROM trainer_fit tf
+        JOIN rooms r ON NOT EXISTS (
+            SELECT 1 FROM resource_bookings b
+            WHERE b.resource_type = 'room' AND b.resource_id = r.room_id
+              AND b.time_range && tsrange(tf.slot_start, tf.slot_end))
+        ORDER BY tf.trainer_id, tf.slot_start, r.room_id IS DISTINCT FROM :room_id, r.capacity, r.room_id
+    )
+    SELECT p.trainer_id, t.first_name || ' ' || t.last_name AS trainer_name,
+           p.room_id, p.room_name, p.slot_start, p.slot_end
+    FROM pairs p
+    JOIN trainers t ON t.trainer_id = p.trainer_id
+    ORDER BY abs(extract(epoch FROM p.slot_start - :anchor)) / 60
+             + CASE WHEN p.trainer_id IS DISTINCT FROM :trainer_id AND :trainer_id IS NOT NULL
+                    THEN :trainer_penalty ELSE 0 END
+             + CASE WHEN p.room_id IS DISTINCT FROM :room_id AND :room_id IS NOT NULL
+                    THEN :room_penalty ELSE 0 END,
+             (SELECT COUNT(*) FROM resource_bookings b
+              WHERE b.resource_type = 'trainer' AND b.resource_id = p.trainer_id
+                AND b.time_range && tsrange(date_trunc('day', p.slot_start), date_trunc('day', p.slot_start) + interval '1 day')),
+             p.trainer_id, p.room_id
+    LIMIT :limit
+""")
+
+@in_unit_of_work
+def find_pt_matches(member_id, first_day, last_day, from_time, to_time, duration_minutes=60,
+                    trainer_id=None, room_id=None, anchor=None, preference_minutes=10**6,
+                    step_minutes=15, limit=10):
+    """
+    Ranked trainer/room/start candidates for a PT session, best first (PT_MATCH_SQL).
+    preference_minutes is how far in time a candidate may move before a
+    non-preferred trainer or room beats it; the default keeps preferences first.
+    """
+    session = get_session()
+    try:
+        return session.execute(PT_MATCH_SQL, {
+            "member_id": member_id,
+            "first_day": first_day,
+            "last_day": last_day,
+            "from_time": timedelta(hours=from_time.hour, minutes=from_time.minute),
+            "to_time": timedelta(hours=to_time.hour, minutes=to_time.minute) if to_time != time(0) else timedelta(days=1),
+            "duration": timedelta(minutes=duration_minutes),
+            "step": timedelta(minutes=step_minutes),
+            "not_before": datetime.now(),
+            "anchor": anchor or datetime.combine(first_day, from_time),
+            "trainer_id": trainer_id,
+            "room_id": room_id,
+            "trainer_penalty": preference_minutes,
+            "room_penalty": preference_minutes,
+            "limit": limit,
+        }).mappings().all()
+    finally:
+        session.close()
+
+@in_unit_of_work
+def match_pt_session(member_id, session_date, from_time, to_time, duration_minutes=60,
+                     trainer_id=None, room_id=None, search_days=3):
+    """
+    PT Session Matching - book the best free trainer/room pair for a session of
+    duration_minutes starting between from_time and to_time on session_date.
+    trainer_id / room_id are preferences, not requirements. Candidates are tried
+    best first; if one is taken meanwhile, its overlap constraint rejects it and
+    the next is tried. When nothing fits the window, ranked alternatives from the
+    whole day and the search_days around it are shown instead.
+    """
+    latest_start = (datetime.combine(session_date, to_time) - timedelta(minutes=duration_minutes)).time()
+    if to_time <= from_time or latest_start < from_time:
+        print("[ERROR] The time window is shorter than the session.")
+        return False
+
+    candidates = find_pt_matches(member_id, session_date, session_date, from_time, to_time,
+                                 duration_minutes, trainer_id, room_id)
+    session = get_session()
+    try:
+        for c in candidates:
+            booking = PTSession(
+                member_id=member_id,
+                trainer_id=c["trainer_id"],
+                room_id=c["room_id"],
+                date=session_date,
+                start_time=c["slot_start"].time(),
+                end_time=c["slot_end"].time(),
+                status='Scheduled'
+            )
+            if commit_booking(session, booking, c["room_id"], c["trainer_id"], c["slot_start"], c["slot_end"]):
+                continue
+            print(f"[SUCCESS] PT Session booked successfully!")
+            print(f"   Date: {session_date} | Time: {booking.start_time} - {booking.end_time}")
+            print(f"   Trainer: {c['trainer_name']} | Room: {c['room_name']}")
+            if trainer_id and c["trainer_id"] != trainer_id:
+                print(f"   (Your preferred trainer was not free in that window)")
+            if room_id and c["room_id"] != room_id:
+                print(f"   (Your preferred room was not free in that window)")
+            return True
+    except Exception as e:
+        session.rollback()
+        print(f"[ERROR] Failed to book session: {e}")
+        return False
+    finally:
+        session.close()
+
+    print("[ERROR] No trainer and room are free in that window.")
+    # Alternatives: any time of day, nearby days, ranked by how far they move the
+    # session; a preferred trainer or room is worth an hour of moving
+    alternatives = find_pt_matches(
+        member_id, max(session_date - timedelta(days=search_days), date.today()),
+        session_date + timedelta(days=search_days), time(0), time(0), duration_minutes,
+        trainer_id, room_id, anchor=datetime.combine(session_date, from_time),
+        preference_minutes=60, limit=200
+    )
+    # Best start per trainer and day, so the list offers real choices
+    seen = set()
+    alternatives = [a for a in alternatives
+                    if (a["trainer_id"], a["slot_start"].date()) not in seen
+                    and not seen.add((a["trainer_id"], a["slot_start"].date()))][:5]
+    if alternatives:
+        print("   Closest alternatives:")
+        for a in alternatives:
+            print(f"   - {a['slot_start'].strftime('%Y-%m-%d %H:%M')} - {a['slot_end'].strftime('%H:%M')}"
+                  f" | {a['trainer_name']} | {a['room_name']}")
+    else:
+        print(f"   Nothing is free within {search_days} days either.")
+    return False
+
+def reconcile_precheck(precheck, booked):
+    """
+    Drops the availability index when the database's verdict on a trainer/room
+    booking differs from the index's pre-check; the next use rebuilds it.
+    """
+    if precheck is not None and (precheck == "ok") != booked:
+        reset_availability_index()
+
+def report_trainer_unavailable(session, trainer_id):
+    """Print the error for a slot outside the trainer's hours, with the hours they do have."""
+    # Only the failure path pays for listing the trainer's schedule
+    all_avail = session.query(Availability).filter(
+        Availability.trainer_id == trainer_id
+    ).all()
+    
+    print(f"[ERROR] Trainer is not available at the requested time.")
+    if all_avail:
+        print(f"   Trainer's availability:")
+        for a in all_avail:
+            if a.is_recurring:
+                print(f"   - {a.day_of_week}s: {a.start_time.strftime('%H:%M')} - {a.end_time.strftime('%H:%M')}")
+            else:
+                print(f"   - {a.specific_date}: {a.start_time.strftime('%H:%M')} - {a.end_time.strftime('%H:%M')}")
+    else:
+        print(f"   Trainer has no availability set. Please ask trainer to set their schedule.")
+
+# Overlap exclusion constraint -> (resource it guards, message shown to the user)
+BOOKING_CONSTRAINTS = {
+    'excl_pt_member_overlap': ('member', "You already have a session booked during that time."),
+    'excl_trainer_booking': ('trainer', "Trainer already has a session booked during that time."),
+    'excl_room_booking': ('room', "Room '{room_name}' is already booked during that time."),
+}
+
+def commit_booking(session, booking, room_id, trainer_id, start, end):
+    """
+    Insert a PTSession or GroupClass together with its room and trainer claims
+    in the resource_bookings ledger, take the trainer's slots out of the pt_slots
+    inventory, and commit.
+    Returns the name of the overlap constraint that rejected it, or None on success.
+    """
+    session.add(booking)
+    try:
+        session.flush()
+        is_pt = isinstance(booking, PTSession)
+        session.add_all([
+            ResourceBooking(
+                resource_type=resource_type,
+                resource_id=resource_id,
+                time_range=Range(start, end),
+                session_id=booking.session_id if is_pt else None,
+                class_id=None if is_pt else booking.class_id
+            )
+            for resource_type, resource_id in (('room', room_id), ('trainer', trainer_id))
+        ])
+        # Slots schedule_pt_session already claimed are left as they are
+        mark_pt_slots_booked(session.connection(), trainer_id, [
+            (start, end, booking.session_id if is_pt else None, None if is_pt else booking.class_id)
+        ])
+        session.commit()
+        index = loaded_availability_index()
+        if index:
+            index.add_claim('room', room_id, start, end)
+            index.add_claim('trainer', trainer_id, start, end)
+        return None
+    except IntegrityError as e:
+        session.rollback()
+        constraint = getattr(e.orig.diag, "constraint_name", None)
+        if constraint not in BOOKING_CONSTRAINTS:
+            raise
+        return constraint
+
+def report_booking_conflict(session, constraint, resources, start, end, room_name):
+    """
+    Print the error for a booking rejected by an overlap constraint.
+    resources maps 'member'/'trainer'/'room' to the ids that were being booked.
+    """
+    resource, message = BOOKING_CONSTRAINTS[constraint]
+    print(f"[ERROR] {message.format(room_name=room_name)}")
+    
+    # Error path only: look up what already holds the slot so the user can see it
+    requested = func.tsrange(start, end)
+    if resource == 'member':
+        existing = session.query(PTSession).filter(
+            PTSession.member_id == resources['member'],
+            PTSession.time_range.op('&&')(requested)
+        ).first()
+        if existing:
+            print(f"   Existing: {existing.date} {existing.start_time} - {existing.end_time}")
+        return
+    
+    claim = session.query(ResourceBooking).filter(
+        ResourceBooking.resource_type == resource,
+        ResourceBooking.resource_id == resources[resource],
+        ResourceBooking.time_range.op('&&')(requested)
+    ).first()
+    if claim and claim.pt_session:
+        existing = claim.pt_session
+        print(f"   Existing: {existing.date} {existing.start_time} - {existing.end_time}")
+    elif claim and claim.group_class:
+        existing = claim.group_class
+        print(f"   Conflict with: '{existing.title}' ({existing.schedule_time.strftime('%H:%M')} - {existing.end_time.strftime('%H:%M')})")
+
+# Free stretches of trainer time: each availability row is expanded to the
+# matching days and the trainer's ledger claims for that day (PT sessions and
+# classes) are subtracted as a multirange. Stretches never span two availability
+# rows, mirroring the single-row coverage check in PT_BOOKING_CHECK_SQL.
+# Needs PostgreSQL 14+ (multiranges).
+FREE_STRETCHES_SQL = text("""
+    WITH days AS (
+        SELECT CAST(d AS DATE) AS day,
+               (ARRAY['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+                   [extract(isodow FROM d)] AS day_name
+        FROM generate_series(CAST(:start_date AS DATE), CAST(:end_date AS DATE), interval '1 day') AS d
+    ),
+    windows AS (
+        SELECT a.trainer_id, d.day, tsrange(d.day + a.start_time, d.day + a.end_time) AS window_range
+        FROM availabilities a
+        JOIN days d ON a.is_recurring AND a.day_of_week = d.day_name
+        WHERE (CAST(:trainer_id AS INTEGER) IS NULL OR a.trainer_id = :trainer_id)
+          AND a.start_time < a.end_time
+        UNION ALL
+        SELECT a.trainer_id, d.day, tsrange(d.day + a.start_time, d.day + a.end_time)
+        FROM availabilities a
+        JOIN days d ON NOT a.is_recurring AND a.specific_date = d.day
+        WHERE (CAST(:trainer_id AS INTEGER) IS NULL OR a.trainer_id = :trainer_id)
+          AND a.start_time < a.end_time
+    ),
+    busy AS (
+        -- Claims grouped per trainer and day they touch, so each window subtracts a short multirange
+        SELECT b.resource_id AS trainer_id, CAST(touched AS DATE) AS day, range_agg(b.time_range) AS claims
+        FROM resource_bookings b
+        CROSS JOIN LATERAL generate_series(date_trunc('day', lower(b.time_range)),
+                                           upper(b.time_range) - interval '1 microsecond',
+                                           interval '1 day') AS touched
+        WHERE b.resource_type = 'trainer'
+          AND b.time_range && tsrange(CAST(:start_date AS DATE), CAST(:end_date AS DATE) + 1)
+          AND (CAST(:trainer_id AS INTEGER) IS NULL OR b.resource_id = :trainer_id)
+        GROUP BY 1, 2
+    ),
+    gaps AS (
+        SELECT w.trainer_id, unnest(multirange(w.window_range) - COALESCE(c.claims, '{}')) AS gap
+        FROM windows w
+        LEFT JOIN busy c ON c.trainer_id = w.trainer_id AND c.day = w.day
+    )
+    SELECT DISTINCT g.trainer_id, t.first_name || ' ' || t.last_name AS trainer_name,
+           lower(g.gap) AS free_from, upper(g.gap) AS free_until
+    FROM gaps g
+    JOIN trainers t ON t.trainer_id = g.trainer_id
+    WHERE upper(g.gap) - lower(g.gap) >= :slot_length
+      AND upper(g.gap) - :slot_length >= :not_before
+    ORDER BY g.trainer_id, free_from
+""")
+
+# Room claims in the search window, in time order per room
+ROOM_CLAIMS_SQL = text("""
+    SELECT r.room_id, lower(b.time_range) AS claim_start, upper(b.time_range) AS claim_end
+    FROM rooms r
+    LEFT JOIN resource_bookings b
+      ON b.resource_type = 'room' AND b.resource_id = r.room_id
+     AND b.time_range && tsrange(CAST(:start_date AS DATE), CAST(:end_date AS DATE) + 1)
+    WHERE CAST(:room_id AS INTEGER) IS NULL OR r.room_id = :room_id
+    ORDER BY r.room_id, claim_start
+""")
+
+@in_unit_of_work
+def find_free_slots(start_date, end_date, slot_minutes=60, trainer_id=None, room_id=None,
+                    with_rooms=False, step_minutes=30):
+    """
+    Trainer free-slot finder - every open slot of slot_minutes between start_date
+    and end_date (inclusive), for one trainer or all of them. Slot starts are
+    stepped every step_minutes from the start of each free stretch; slots in the
+    past are left out.
+    With with_rooms (implied by room_id), each slot also lists the rooms free for
+    it and slots with no free room are dropped.
+    Returns a list of dicts: trainer_id, trainer_name, slot_start, slot_end, free_rooms.
+    """
+    not_before = datetime.now()
+    # Grid-aligned searches inside the index horizon are answered from its bitmaps
+    slots = get_availability_index().free_slots(start_date, end_date, slot_minutes, trainer_id, room_id,
+                                                with_rooms, step_minutes, not_before)
+    if slots is not None:
+        return slots
+
+    slot_length = timedelta(minutes=slot_minutes)
+    step = timedelta(minutes=step_minutes)
+    params = {"start_date": start_date, "end_date": end_date, "trainer_id": trainer_id,
+              "room_id": room_id, "slot_length": slot_length, "not_before": not_before}
+
+    session = get_session()
+    try:
+        stretches = session.execute(FREE_STRETCHES_SQL, params).all()
+        room_claims = None
+        if with_rooms or room_id is not None:
+            room_claims = {}
+            for row in session.execute(ROOM_CLAIMS_SQL, params):
+                starts, ends = room_claims.setdefault(row.room_id, ([], []))
+                if row.claim_start is not None:
+                    starts.append(row.claim_start)
+                    ends.append(row.claim_end)
+    finally:
+        session.close()
+
+    # The database returns free stretches; cutting them into slots here keeps the
+    # result set small (one row per stretch instead of one per slot)
+    slots = []
+    last_start = {}
+    for trainer_id, trainer_name, free_from, free_until in stretches:
+        slot_start = free_from
+        if slot_start < not_before:
+            slot_start += -((slot_start - not_before) // step) * step
+        # Overlapping availability rows can yield the same slot twice
+        slot_start = max(slot_start, last_start.get(trainer_id, slot_start - step) + step)
+        while slot_start + slot_length <= free_until:
+            slot_end = slot_start + slot_length
+            free_rooms = None
+            if room_claims is not None:
+                free_rooms = [rid for rid, (starts, ends) in room_claims.items()
+                              if room_is_free(starts, ends, slot_start, slot_end)]
+            if free_rooms is None or free_rooms:
+                slots.append({"trainer_id": trainer_id, "trainer_name": trainer_name,
+                              "slot_start": slot_start, "slot_end": slot_end, "free_rooms": free_rooms})
+            last_start[trainer_id] = slot_start
+            slot_start += step
+    return slots
+
+@in_unit_of_work
+def find_free_stretches(start_date, end_date, slot_minutes=60, trainer_id=None):
+    """
+    Free stretches of trainer time between start_date and end_date (inclusive)
+    that can hold a slot of slot_minutes - one row per stretch instead of one per
+    slot, for overviews across all trainers where find_free_slots would build
+    tens of thousands of slots. A stretch that has already begun starts now.
+    Returns a list of dicts: trainer_id, trainer_name, free_from, free_until.
+    """
+    not_before = datetime.now()
+    session = get_session()
+    try:
+        stretches = session.execute(FREE_STRETCHES_SQL, {
+            "start_date": start_date, "end_date": end_date, "trainer_id": trainer_id,
+            "slot_length": timedelta(minutes=slot_minutes), "not_before": not_before,
+        }).all()
+    finally:
+        session.close()
+    return [{"trainer_id": trainer_id, "trainer_name": trainer_name,
+             "free_from": max(free_from, not_before), "free_until": free_until}
+            for trainer_id, trainer_name, free_from, free_until in stretches]
+
+@in_unit_of_work
+def list_group_classes(after=None, limit=20, start=None, end=None, trainer_id=None, room_id=None, has_seats=False):
+    """
+    Class listing - one page of classes ordered by (schedule_time, class_id),
+    with enrollment, trainer and room names fetched in the same statement.
+    Optional filters: schedule window [start, end), trainer, room, seats left.
+    Returns (rows, next_cursor); pass next_cursor back as `after` for the next
+    page, it is None on the last page.
+    """
+    session = get_session()
+    try:
+        query = session.query(
+            GroupClass.class_id, GroupClass.title, GroupClass.schedule_time,
+            GroupClass.duration_minutes, GroupClass.enrolled_count, GroupClass.capacity,
+            (Trainer.first_name + " " + Trainer.last_name).label("trainer_name"),
+            Room.room_name
+        ).outerjoin(GroupClass.trainer).outerjoin(GroupClass.room)
+
+        if start:
+            query = query.filter(GroupClass.schedule_time >= start)
+        if end:
+            query = query.filter(GroupClass.schedule_time < end)
+        if trainer_id:
+            query = query.filter(GroupClass.trainer_id == trainer_id)
+        if room_id:
+            query = query.filter(GroupClass.room_id == room_id)
+        if has_seats:
+            query = query.filter(GroupClass.enrolled_count < GroupClass.capacity)
+        if after:
+            # Keyset: continue strictly after the last row of the previous page
+            query = query.filter(tuple_(GroupClass.schedule_time, GroupClass.class_id) > tuple_(*after))
+
+        rows = query.order_by(GroupClass.schedule_time, GroupClass.class_id).limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, (rows[-1].schedule_time, rows[-1].class_id)
+        return rows, None
+    finally:
+        session.close()
+
+@in_unit_of_work
 def register_for_class(member_id, class_id):
     """
     Group Class Registration - Register for scheduled classes if capacity permits.
-    The database trigger 'check_room_capacity' enforces capacity constraints.
+    The database trigger 'trg_check_capacity' takes a seat on the class
+    (enrolled_count) and rejects the registration when the class is full.
     """
     session = get_session()
     try:
@@ -360,6 +929,24 @@ def register_for_class(member_id, class_id):
 
 # TRAINER OPERATIONS
 
+@in_unit_of_work
+def get_availability_by_trainer():
+    """
+    Every trainer's availability in one query, as {trainer_id: [rows]} with
+    is_recurring, day_of_week, specific_date, start_time and end_time.
+    """
+    session = get_session()
+    try:
+        by_trainer = {}
+        for a in session.query(Availability.trainer_id, Availability.is_recurring, Availability.day_of_week,
+                               Availability.specific_date, Availability.start_time, Availability.end_time) \
+                        .order_by(Availability.trainer_id, Availability.day_of_week):
+            by_trainer.setdefault(a.trainer_id, []).append(a)
+        return by_trainer
+    finally:
+        session.close()
+
+@in_unit_of_work
 def set_trainer_availability(trainer_id, start_time, end_time, is_recurring, day_of_week, specific_date):
     """
     Set Availability - Define time windows when available.
@@ -406,7 +993,13 @@ def set_trainer_availability(trainer_id, start_time, end_time, is_recurring, day
             specific_date=specific_date if not is_recurring else None
         )
         session.add(new_avail)
+        session.flush()
+        # Open the new window in the PT slot inventory right away
+        materialize_pt_slots(session.connection(), date.today(), trainer_id=trainer_id)
         session.commit()
+        index = loaded_availability_index()
+        if index:
+            index.add_availability(trainer_id, start_time, end_time, is_recurring, day_of_week, specific_date)
         
         if is_recurring:
             print(f"[SUCCESS] Recurring availability set for {day_of_week}s: {start_time} - {end_time}")
@@ -421,6 +1014,7 @@ def set_trainer_availability(trainer_id, start_time, end_time, is_recurring, day
     finally:
         session.close()
 
+@in_unit_of_work
 def get_trainer_schedule(trainer_id):
     """
     Schedule View - See assigned PT sessions and classes.
@@ -460,10 +1054,9 @@ def get_trainer_schedule(trainer_id):
         
         if classes:
             for c in classes:
-                enrolled = len(c.registrations)
                 print(f"   - {c.title}")
                 print(f"     {c.schedule_time.strftime('%Y-%m-%d %H:%M')} | {c.duration_minutes} min")
-                print(f"     Enrolled: {enrolled}/{c.capacity} | Room: {c.room.room_name}")
+                print(f"     Enrolled: {c.enrolled_count}/{c.capacity} | Room: {c.room.room_name}")
         else:
             print("   No upcoming classes.")
         
@@ -491,6 +1084,7 @@ def get_trainer_schedule(trainer_id):
 
 # ADMIN OPERATIONS 
 
+@in_unit_of_work
 def add_new_room(admin_id, room_name, capacity):
     """
     Room Booking - Assign rooms for sessions or classes.
@@ -504,6 +1098,10 @@ def add_new_room(admin_id, room_name, capacity):
         )
         session.add(new_room)
         session.commit()
+        reference_cache.invalidate_rooms()
+        index = loaded_availability_index()
+        if index:
+            index.add_room(new_room.room_id)
         
         print(f"[SUCCESS] Room '{room_name}' added successfully!")
         print(f"   Capacity: {capacity} | Room ID: {new_room.room_id}")
@@ -516,9 +1114,11 @@ def add_new_room(admin_id, room_name, capacity):
     finally:
         session.close()
 
+@in_unit_of_work
 def create_group_class(admin_id, trainer_id, room_id, title, capacity, schedule_time, duration_minutes, description=None):
     """
     Class Management - Define new classes, assign trainers/rooms/time.
+    The room and trainer must be free of other classes and PT sessions.
     """
     session = get_session()
     try:
@@ -537,19 +1137,8 @@ def create_group_class(admin_id, trainer_id, room_id, title, capacity, schedule_
             print(f"   Maximum allowed: {room.capacity}")
             return False
                 
-        from datetime import timedelta
         new_end_time = schedule_time + timedelta(minutes=duration_minutes)
-        
-        existing_classes = session.query(GroupClass).filter(
-            GroupClass.room_id == room_id
-        ).all()
-        
-        for existing in existing_classes:
-            existing_end = existing.schedule_time + timedelta(minutes=existing.duration_minutes)
-            if existing.schedule_time < new_end_time and existing_end > schedule_time:
-                print(f"[ERROR] Room '{room.room_name}' is already booked during that time.")
-                print(f"   Conflict with: '{existing.title}' ({existing.schedule_time.strftime('%H:%M')} - {existing_end.strftime('%H:%M')})")
-                return False
+        room_name = room.room_name
         
         new_class = GroupClass(
             admin_id=admin_id,
@@ -561,8 +1150,13 @@ def create_group_class(admin_id, trainer_id, room_id, title, capacity, schedule_
             duration_minutes=duration_minutes,
             capacity=capacity
         )
-        session.add(new_class)
-        session.commit()
+        # Room and trainer conflicts (with classes or PT sessions) are rejected
+        # by the resource_bookings exclusion constraints
+        constraint = commit_booking(session, new_class, room_id, trainer_id, schedule_time, new_end_time)
+        if constraint:
+            resources = {'trainer': trainer_id, 'room': room_id}
+            report_booking_conflict(session, constraint, resources, schedule_time, new_end_time, room_name)
+            return False
         
         print(f"[SUCCESS] Class '{title}' created successfully!")
         print(f"   Trainer: {trainer.first_name} {trainer.last_name}")
@@ -577,26 +1171,211 @@ def create_group_class(admin_id, trainer_id, room_id, title, capacity, schedule_
     finally:
         session.close()
 
+# Existing room and trainer claims overlapping any occurrence of a series, one
+# row per clash, with what holds the claim
+SERIES_CONFLICTS_SQL = text("""
+    SELECT o.n - 1 AS occurrence, b.resource_type,
+           COALESCE(g.title, 'a PT session') AS taken_by,
+           lower(b.time_range) AS taken_from, upper(b.time_range) AS taken_until
+    FROM unnest(CAST(:starts AS TIMESTAMP[])) WITH ORDINALITY AS o(slot_start, n)
+    JOIN resource_bookings b
+      ON b.time_range && tsrange(o.slot_start, o.slot_start + :duration)
+     AND ((b.resource_type = 'room' AND b.resource_id = :room_id)
+          OR (b.resource_type = 'trainer' AND b.resource_id = :trainer_id))
+    LEFT JOIN group_classes g ON g.class_id = b.class_id
+    ORDER BY o.n, b.resource_type
+""")
+
+def series_occurrences(first_time, weeks, weekdays=None):
+    """
+    Start times of a weekly series: every weekday in `weekdays` (0 = Monday,
+    default: the weekday of first_time) for `weeks` weeks, from first_time on.
+    """
+    if weekdays is None:
+        weekdays = [first_time.weekday()]
+    week_start = first_time - timedelta(days=first_time.weekday())
+    starts = [
+        week_start + timedelta(weeks=week, days=day)
+        for week in range(weeks)
+        for day in sorted(set(weekdays))
+    ]
+    return [start for start in starts if start >= first_time]
+
+@in_unit_of_work
+def create_class_series(admin_id, trainer_id, room_id, title, capacity, first_time, duration_minutes,
+                        weeks, weekdays=None, description=None):
+    """
+    Class Management - a weekly series of classes in one go. Every occurrence
+    is checked against the room's and trainer's existing claims in a single
+    query (SERIES_CONFLICTS_SQL); the free ones are bulk-inserted with their
+    ledger claims in one transaction.
+    Returns a report with one dict per occurrence - schedule_time, class_id
+    (None if skipped) and conflict (None or a reason) - or None on failure.
+    """
+    session = get_session()
+    try:
+        trainer = session.query(Trainer).get(trainer_id)
+        if not trainer:
+            print("[ERROR] Trainer not found.")
+            return None
+        
+        room = session.query(Room).get(room_id)
+        if not room:
+            print("[ERROR] Room not found.")
+            return None
+        
+        if capacity > room.capacity:
+            print(f"[ERROR] Class capacity ({capacity}) exceeds room capacity ({room.capacity}).")
+            print(f"   Maximum allowed: {room.capacity}")
+            return None
+        
+        starts = series_occurrences(first_time, weeks, weekdays)
+        duration = timedelta(minutes=duration_minutes)
+        report = [{"schedule_time": start, "class_id": None, "conflict": None} for start in starts]
+        if not starts:
+            print("[ERROR] The series has no occurrences.")
+            return None
+        
+        for clash in session.execute(SERIES_CONFLICTS_SQL, {
+            "starts": starts, "duration": duration, "room_id": room_id, "trainer_id": trainer_id
+        }):
+            entry = report[clash.occurrence]
+            if entry["conflict"] is None:
+                who = room.room_name if clash.resource_type == 'room' else "The trainer"
+                entry["conflict"] = (f"{who} is taken by {clash.taken_by} "
+                                     f"({clash.taken_from.strftime('%H:%M')} - {clash.taken_until.strftime('%H:%M')})")
+        
+        free = [entry for entry in report if entry["conflict"] is None]
+        if free:
+            class_ids = session.scalars(
+                insert(GroupClass).returning(GroupClass.class_id, sort_by_parameter_order=True),
+                [{
+                    "admin_id": admin_id,
+                    "trainer_id": trainer_id,
+                    "room_id": room_id,
+                    "title": title,
+                    "description": description,
+                    "schedule_time": entry["schedule_time"],
+                    "duration_minutes": duration_minutes,
+                    "capacity": capacity,
+                } for entry in free]
+            ).all()
+            session.execute(insert(ResourceBooking), [
+                {
+                    "resource_type": resource_type,
+                    "resource_id": resource_id,
+                    "time_range": Range(entry["schedule_time"], entry["schedule_time"] + duration),
+                    "class_id": class_id,
+                }
+                for entry, class_id in zip(free, class_ids)
+                for resource_type, resource_id in (('room', room_id), ('trainer', trainer_id))
+            ])
+            mark_pt_slots_booked(session.connection(), trainer_id, [
+                (entry["schedule_time"], entry["schedule_time"] + duration, None, class_id)
+                for entry, class_id in zip(free, class_ids)
+            ])
+            try:
+                session.commit()
+            except IntegrityError as e:
+                # Someone booked the room or trainer after the conflict check
+                session.rollback()
+                if getattr(e.orig.diag, "constraint_name", None) not in BOOKING_CONSTRAINTS:
+                    raise
+                print("[ERROR] The room or trainer was booked while the series was being created. No classes were created; please try again.")
+                return None
+            for entry, class_id in zip(free, class_ids):
+                entry["class_id"] = class_id
+            index = loaded_availability_index()
+            if index:
+                for entry in free:
+                    index.add_claim('room', room_id, entry["schedule_time"], entry["schedule_time"] + duration)
+                    index.add_claim('trainer', trainer_id, entry["schedule_time"], entry["schedule_time"] + duration)
+        
+        skipped = len(report) - len(free)
+        if free:
+            print(f"[SUCCESS] Created {len(free)} of {len(report)} '{title}' classes.")
+            print(f"   Trainer: {trainer.first_name} {trainer.last_name}")
+            print(f"   Room: {room.room_name} | Capacity: {capacity} | Duration: {duration_minutes} min")
+        else:
+            print(f"[ERROR] None of the {len(report)} classes could be scheduled.")
+        if skipped:
+            print(f"   Skipped {skipped} because of conflicts:")
+            for entry in report:
+                if entry["conflict"]:
+                    print(f"   - {entry['schedule_time'].strftime('%Y-%m-%d %H:%M')}: {entry['conflict']}")
+        return report
+        
+    except Exception as e:
+        session.rollback()
+        print(f"[ERROR] Failed to create class series: {e}")
+        return None
+    finally:
+        session.close()
+
 # HELPER FUNCTIONS
 
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def sparkline(values):
+    """Render a list of numbers as a one-line unicode sparkline."""
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[len(SPARK_CHARS) // 2] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((v - low) * scale)] for v in values)
+
+def room_is_free(starts, ends, slot_start, slot_end):
+    """
+    True if no claim overlaps [slot_start, slot_end). starts/ends are one room's
+    claims in time order; they never overlap each other (excl_room_booking), so
+    only the last claim starting before slot_end can collide.
+    """
+    i = bisect_left(starts, slot_end)
+    return i == 0 or ends[i - 1] <= slot_start
+
+# REFERENCE DATA (served from the reference cache, see reference_cache.py)
+
+def list_rooms():
+    """All rooms as (room_id, room_name, capacity) rows, by id."""
+    return reference_cache.get(("rooms",), load_rooms)
+
+def list_trainers():
+    """All trainers as (trainer_id, first_name, last_name, email) rows, by id."""
+    return reference_cache.get(("trainers",), load_trainers)
+
 def get_member_name(member_id):
     """Get member's full name by ID"""
+    name = reference_cache.get(("member_name", member_id), lambda: load_full_name(Member, member_id))
+    return name or "Unknown Member"
+
+def get_trainer_name(trainer_id):
+    """Get trainer's full name by ID"""
+    name = reference_cache.get(("trainer_name", trainer_id), lambda: load_full_name(Trainer, trainer_id))
+    return name or "Unknown Trainer"
+
+@in_unit_of_work
+def load_rooms():
     session = get_session()
     try:
-        member = session.query(Member).get(member_id)
-        if member:
-            return f"{member.first_name} {member.last_name}"
-        return "Unknown Member"
+        return session.query(Room.room_id, Room.room_name, Room.capacity).order_by(Room.room_id).all()
     finally:
         session.close()
 
-def get_trainer_name(trainer_id):
-    """Get trainer's full name by ID"""
+@in_unit_of_work
+def load_trainers():
     session = get_session()
     try:
-        trainer = session.query(Trainer).get(trainer_id)
-        if trainer:
-            return f"{trainer.first_name} {trainer.last_name}"
-        return "Unknown Trainer"
+        return session.query(Trainer.trainer_id, Trainer.first_name, Trainer.last_name, Trainer.email) \
+                      .order_by(Trainer.trainer_id).all()
+    finally:
+        session.close()
+
+@in_unit_of_work
+def load_full_name(model, person_id):
+    """'First Last' of a Member or Trainer, or None if there is none with that id."""
+    session = get_session()
+    try:
+        person = session.get(model, person_id)
+        return f"{person.first_name} {person.last_name}" if person else None
     finally:
         session.close()
\ No newline at end of file
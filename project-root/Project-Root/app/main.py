@@ -1,21 +1,56 @@
 import sys
-from datetime import datetime
-from tabulate import tabulate
-from app.logic import (
-    register_member, update_member_profile, get_member_dashboard, schedule_pt_session,
-    register_for_class, set_trainer_availability, get_trainer_schedule,
-    add_new_room, create_group_class, get_member_name, get_trainer_name
-)
-from models.database import engine, Base, get_session, my_helper_sql_features
-from models.schema import Room, GroupClass, Trainer, Member
-
-# Initialize database with View, Trigger, Index
+import time
+from datetime import datetime, timedelta
+
+# Cold start: SQLAlchemy, the models, app.logic and tabulate are imported inside
+# the functions that use them, so the main menu appears before any of them load
+# and the engine is only created (and connected) once a portal is opened.
+
+db_ready = False
+
+# Check the schema (tables, Triggers, Indexes and Constraints) is current;
+# applying it is an explicit step (python3 manage.py migrate)
 def init_db():
+    global db_ready
+    if db_ready:
+        return
+    from models.database import schema_is_current
     print("Initializing Database...")
-    Base.metadata.create_all(engine)
-    my_helper_sql_features()  # Create View and Trigger
+    if not schema_is_current():
+        print_error("The database schema is missing or out of date. Run: python3 manage.py migrate")
+        sys.exit(1)
+    # Other processes' writes reach the reference cache and the availability index
+    from app.reference_cache import listen_for_invalidations
+    from app.availability_index import listen_for_invalidations as listen_for_availability_changes
+    listen_for_invalidations()
+    listen_for_availability_changes()
+    db_ready = True
     print("Database Ready.\n")
 
+def startup_profile():
+    """
+    --startup-profile: times each cold-start step in order (the later imports
+    reuse what the earlier ones loaded) and prints the breakdown.
+    Run in a fresh process; python3 -X importtime gives the per-module detail.
+    """
+    steps = [
+        ("import models.database (SQLAlchemy core + ORM, dotenv, engine)", lambda: __import__("models.database")),
+        ("import models.schema (ORM models)", lambda: __import__("models.schema")),
+        ("import app.logic", lambda: __import__("app.logic")),
+        ("import tabulate", lambda: __import__("tabulate")),
+        ("connect + schema version check", lambda: __import__("models.database").database.schema_is_current()),
+    ]
+    rows = []
+    total = 0.0
+    for label, step in steps:
+        t0 = time.perf_counter()
+        step()
+        elapsed = (time.perf_counter() - t0) * 1000
+        total += elapsed
+        rows.append([label, f"{elapsed:.1f}"])
+    rows.append(["total (deferred until a portal is opened)", f"{total:.1f}"])
+    print_table(rows, ["Startup step", "ms"])
+
 # MY VISUALIZATION HELPERS
 def print_header(text):
     print("\n" + "="*60)
@@ -27,8 +62,29 @@ def print_table(data, headers):
     if not data:
         print("\n(No data available)")
     else:
+        from tabulate import tabulate
         print("\n" + tabulate(data, headers=headers, tablefmt="grid"))
 
+CLASS_PAGE_SIZE = 20
+
+def class_rows(classes):
+    """Table rows for a page from list_group_classes."""
+    return [[
+        c.class_id,
+        c.title,
+        c.schedule_time.strftime("%Y-%m-%d %H:%M"),
+        c.duration_minutes,
+        f"{c.enrolled_count}/{c.capacity}",
+        c.trainer_name or "-",
+        c.room_name or "-"
+    ] for c in classes]
+
+def in_one_connection(action, *args):
+    """Runs a menu interaction that makes several logic calls in one unit of work (one pooled connection)."""
+    from models.database import unit_of_work
+    with unit_of_work():
+        return action(*args)
+
 def print_success(msg):
     print(f"\n[SUCCESS] {msg}")
 
@@ -38,7 +94,6 @@ def print_error(msg):
 # MENU FUNCTIONS 
 
 def main_menu():
-    init_db()
     while True:
         print_header("Health & Fitness Club Management System")
         print("1. MEMBER PORTAL")
@@ -48,6 +103,9 @@ def main_menu():
         
         choice = input("\nSelect an option (1-4): ").strip()
 
+        if choice in ('1', '2', '3'):
+            init_db()
+
         if choice == '1': 
             member_menu()
         elif choice == '2': 
@@ -79,6 +137,7 @@ def member_menu():
 
 def register_new_member():
     """Member Registration - Requirement: User Registration"""
+    from app.logic import register_member
     print_header("New Member Registration")
     try:
         fname = input("First Name: ").strip()
@@ -101,6 +160,7 @@ def register_new_member():
 
 def member_login():
     """Member Login"""
+    from app.logic import get_member_name
     print_header("Member Login")
     try:
         mid_input = input("Enter your Member ID: ").strip()
@@ -119,6 +179,7 @@ def member_login():
 
 def member_dashboard_menu(mid, member_name):
     """Member's main operations menu"""
+    from app.logic import get_member_dashboard
     while True:
         print_header(f"Member Dashboard - {member_name} (ID: {mid})")
         print("1. VIEW DASHBOARD (Health Stats & Progress)")
@@ -150,11 +211,11 @@ def member_dashboard_menu(mid, member_name):
             
         elif choice == '5':
             # Group Class Registration
-            register_member_for_class(mid)
+            in_one_connection(register_member_for_class, mid)
             
         elif choice == '6':
             # PT Session Scheduling
-            book_pt_session(mid)
+            in_one_connection(book_pt_session, mid)
             
         elif choice == '7':
             print("\nLogging out...")
@@ -164,6 +225,7 @@ def member_dashboard_menu(mid, member_name):
 
 def update_profile(mid):
     """Update member profile information"""
+    from app.logic import update_member_profile
     print_header("Update Profile Information")
     email = input("New Email (press Enter to skip): ").strip() or None
     
@@ -177,6 +239,7 @@ def update_profile(mid):
 
 def add_health_metric(mid):
     """Add health metric with timestamp - supports historical tracking"""
+    from app.logic import update_member_profile
     print_header("Record Health Metric")
     print("Examples: Weight, Height, Heart Rate, Blood Pressure, Body Fat %")
     
@@ -194,6 +257,7 @@ def add_health_metric(mid):
 
 def add_fitness_goal(mid):
     """Add fitness goal with target"""
+    from app.logic import update_member_profile
     print_header("Set Fitness Goal")
     print("Examples: Weight Loss, Muscle Gain, Endurance Improvement")
     
@@ -216,36 +280,31 @@ def add_fitness_goal(mid):
 
 def register_member_for_class(mid):
     """Register for group fitness class with capacity validation"""
+    from app.logic import list_group_classes, register_for_class
     print_header("Group Class Registration")
     
-    session = get_session()
     try:
-        # Show upcoming classes
-        upcoming_classes = session.query(GroupClass).filter(
-            GroupClass.schedule_time >= datetime.now()
-        ).order_by(GroupClass.schedule_time).all()
-        
-        if not upcoming_classes:
-            print("\nNo upcoming classes available.")
-            return
-        
-        class_data = []
-        for gc in upcoming_classes:
-            current_registrations = len(gc.registrations)
-            class_data.append([
-                gc.class_id,
-                gc.title,
-                gc.schedule_time.strftime("%Y-%m-%d %H:%M"),
-                gc.duration_minutes,
-                f"{current_registrations}/{gc.capacity}",
-                gc.trainer.first_name + " " + gc.trainer.last_name,
-                gc.room.room_name
-            ])
-        
-        print("\n[UPCOMING CLASSES]")
-        print_table(class_data, ["ID", "Title", "Date/Time", "Duration", "Registered/Capacity", "Trainer", "Room"])
-        
-        class_id = int(input("\nEnter Class ID to register (0 to cancel): ").strip())
+        # Show upcoming classes, one page at a time
+        cursor = None
+        while True:
+            upcoming_classes, next_cursor = list_group_classes(
+                after=cursor, limit=CLASS_PAGE_SIZE, start=datetime.now()
+            )
+            if not upcoming_classes:
+                print("\nNo upcoming classes available.")
+                return
+
+            print("\n[UPCOMING CLASSES]")
+            print_table(class_rows(upcoming_classes), ["ID", "Title", "Date/Time", "Duration", "Registered/Capacity", "Trainer", "Room"])
+
+            more = ", N for next page" if next_cursor else ""
+            choice = input(f"\nEnter Class ID to register{more} (0 to cancel): ").strip()
+            if next_cursor and choice.lower() == "n":
+                cursor = next_cursor
+                continue
+            break
+
+        class_id = int(choice)
         
         if class_id == 0:
             return
@@ -256,21 +315,17 @@ def register_member_for_class(mid):
         print_error("Invalid input.")
     except Exception as e:
         print_error(f"Registration failed: {e}")
-    finally:
-        session.close()
     
     input("\nPress Enter to continue...")
 
 def book_pt_session(mid):
     """Schedule personal training session with trainer availability validation"""
+    from app.logic import schedule_pt_session, list_trainers, list_rooms, get_availability_by_trainer
     print_header("Schedule Personal Training Session")
     
-    session = get_session()
     try:
-        from models.schema import Availability
-        
         # Show available trainers with their availability
-        trainers = session.query(Trainer).all()
+        trainers = list_trainers()
         if not trainers:
             print("\nNo trainers available.")
             return
@@ -278,14 +333,12 @@ def book_pt_session(mid):
         print("\n[TRAINERS & AVAILABILITY]")
         print("=" * 70)
         
+        # Every trainer's availability in one query
+        availability = get_availability_by_trainer()
         for t in trainers:
             print(f"\n  TRAINER ID: {t.trainer_id} | {t.first_name} {t.last_name} ({t.email})")
             
-            # Get trainer's availability
-            availabilities = session.query(Availability).filter(
-                Availability.trainer_id == t.trainer_id
-            ).order_by(Availability.day_of_week).all()
-            
+            availabilities = availability.get(t.trainer_id, [])
             if availabilities:
                 print("  AVAILABLE TIMES:")
                 for a in availabilities:
@@ -299,36 +352,73 @@ def book_pt_session(mid):
         print("\n" + "=" * 70)
         
         # Show available rooms
-        rooms = session.query(Room).all()
+        rooms = list_rooms()
         room_data = [[r.room_id, r.room_name, r.capacity] for r in rooms]
         print("\n[ROOMS]")
         print_table(room_data, ["ID", "Room Name", "Capacity"])
         
-        tid = int(input("\nEnter Trainer ID: "))
-        rid = int(input("Enter Room ID: "))
-        date_str = input("Session Date (YYYY-MM-DD): ")
-        session_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        if input("\nLet the club pick a trainer and room? (y/N): ").strip().lower() == "y":
+            auto_match_pt_session(mid)
+        else:
+            tid = int(input("Enter Trainer ID: "))
+            if input("Show this trainer's open slots first? (y/N): ").strip().lower() == "y":
+                show_open_slots(tid)
+            rid = int(input("Enter Room ID: "))
+            date_str = input("Session Date (YYYY-MM-DD): ")
+            session_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         
-        # Show what day of week the selected date is
-        day_name = session_date.strftime("%A")
-        print(f"   -> {date_str} is a {day_name}")
+            # Show what day of week the selected date is
+            day_name = session_date.strftime("%A")
+            print(f"   -> {date_str} is a {day_name}")
         
-        start = datetime.strptime(input("Start Time (HH:MM): "), "%H:%M").time()
-        end = datetime.strptime(input("End Time (HH:MM): "), "%H:%M").time()
+            start = datetime.strptime(input("Start Time (HH:MM): "), "%H:%M").time()
+            end = datetime.strptime(input("End Time (HH:MM): "), "%H:%M").time()
         
-        schedule_pt_session(mid, tid, rid, session_date, start, end)
+            schedule_pt_session(mid, tid, rid, session_date, start, end)
         
     except ValueError:
         print_error("Invalid input format.")
     except Exception as e:
         print_error(f"Booking failed: {e}")
-    finally:
-        session.close()
     
     input("\nPress Enter to continue...")
 
+def auto_match_pt_session(mid):
+    """PT matching: any free trainer and room inside a time window, preferences optional"""
+    from app.logic import match_pt_session
+    session_date = datetime.strptime(input("Session Date (YYYY-MM-DD): "), "%Y-%m-%d").date()
+    print(f"   -> {session_date} is a {session_date.strftime('%A')}")
+    from_time = datetime.strptime(input("Earliest Start (HH:MM): "), "%H:%M").time()
+    to_time = datetime.strptime(input("Latest End (HH:MM): "), "%H:%M").time()
+    length = int(input("Session length in minutes [60]: ").strip() or 60)
+    tid = input("Preferred Trainer ID (press Enter for any): ").strip()
+    rid = input("Preferred Room ID (press Enter for any): ").strip()
+    
+    match_pt_session(mid, session_date, from_time, to_time, length,
+                     trainer_id=int(tid) if tid else None, room_id=int(rid) if rid else None)
+
+def show_open_slots(tid):
+    """Free-slot finder: open slots for one trainer, with the rooms free for each"""
+    from app.logic import find_free_slots
+    from_str = input("From date (YYYY-MM-DD, blank for today): ").strip()
+    from_date = datetime.strptime(from_str, "%Y-%m-%d").date() if from_str else datetime.now().date()
+    days = int(input("Days to search [7]: ").strip() or 7)
+    length = int(input("Session length in minutes [60]: ").strip() or 60)
+
+    slots = find_free_slots(from_date, from_date + timedelta(days=days - 1), slot_minutes=length,
+                            trainer_id=tid, with_rooms=True)
+    slot_data = [[
+        s["slot_start"].strftime("%Y-%m-%d (%a)"),
+        s["slot_start"].strftime("%H:%M"),
+        s["slot_end"].strftime("%H:%M"),
+        ", ".join(str(r) for r in s["free_rooms"])
+    ] for s in slots]
+    print("\n[OPEN SLOTS]")
+    print_table(slot_data, ["Date", "Start", "End", "Free Room IDs"])
+
 def trainer_menu():
     """Trainer Portal Entry"""
+    from app.logic import get_trainer_name
     print_header("Trainer Portal")
     try:
         tid_input = input("Enter your Trainer ID: ").strip()
@@ -347,6 +437,7 @@ def trainer_menu():
 
 def trainer_dashboard_menu(tid, trainer_name):
     """Trainer's main operations menu"""
+    from app.logic import get_trainer_schedule
     while True:
         print_header(f"Trainer Dashboard - {trainer_name} (ID: {tid})")
         print("1. SET/UPDATE AVAILABILITY")
@@ -372,6 +463,7 @@ def trainer_dashboard_menu(tid, trainer_name):
 
 def set_availability(tid):
     """Set trainer availability - prevents overlapping slots"""
+    from app.logic import set_trainer_availability
     print_header("Set Availability")
     print("Define when you're available for sessions and classes")
     
@@ -417,14 +509,17 @@ def admin_menu():
 
 def admin_dashboard_menu(aid):
     """Admin's main operations menu"""
+    from app.logic import list_rooms, list_trainers
+    from models.database import get_session
+    from models.schema import GroupClass, Member
     while True:
-        # Show current system stats
+        # Show current system stats (rooms and trainers come from the reference cache)
         session = get_session()
-        room_count = session.query(Room).count()
         class_count = session.query(GroupClass).count()
         member_count = session.query(Member).count()
-        trainer_count = session.query(Trainer).count()
         session.close()
+        room_count = len(list_rooms())
+        trainer_count = len(list_trainers())
         
         print_header(f"Admin Dashboard (ID: {aid})")
         print("[SYSTEM STATUS]")
@@ -446,7 +541,7 @@ def admin_dashboard_menu(aid):
             
         elif choice == '2':
             # Requirement: Class Management
-            manage_classes(aid)
+            in_one_connection(manage_classes, aid)
             
         elif choice == '3':
             view_all_rooms()
@@ -462,6 +557,7 @@ def admin_dashboard_menu(aid):
 
 def manage_rooms(aid):
     """Room management - add new rooms"""
+    from app.logic import add_new_room
     print_header("Room Management")
     print("1. ADD NEW ROOM")
     print("2. BACK")
@@ -485,18 +581,19 @@ def manage_rooms(aid):
 
 def manage_classes(aid):
     """Class management - create new group classes"""
+    from app.logic import create_group_class, create_class_series, list_trainers, list_rooms
     print_header("Class Management")
     print("1. CREATE NEW GROUP CLASS")
-    print("2. BACK")
+    print("2. CREATE WEEKLY CLASS SERIES")
+    print("3. BACK")
     
     choice = input("\nChoice: ").strip()
     
-    if choice == '1':
-        session = get_session()
+    if choice in ('1', '2'):
         try:
             # Show available trainers and rooms
-            trainers = session.query(Trainer).all()
-            rooms = session.query(Room).all()
+            trainers = list_trainers()
+            rooms = list_rooms()
             
             print("\n[AVAILABLE TRAINERS]")
             print_table([[t.trainer_id, f"{t.first_name} {t.last_name}"] for t in trainers], ["ID", "Name"])
@@ -508,59 +605,53 @@ def manage_classes(aid):
             desc = input("Description (optional): ").strip() or None
             tid = int(input("Trainer ID: "))
             rid = int(input("Room ID: "))
-            time_str = input("Schedule (YYYY-MM-DD HH:MM): ")
+            time_str = input("Schedule (YYYY-MM-DD HH:MM): " if choice == '1' else "First Class (YYYY-MM-DD HH:MM): ")
             time_val = datetime.strptime(time_str, "%Y-%m-%d %H:%M")
             cap = int(input("Class Capacity: "))
             dur = int(input("Duration (minutes): "))
             
-            create_group_class(aid, tid, rid, title, cap, time_val, dur, desc)
+            if choice == '1':
+                create_group_class(aid, tid, rid, title, cap, time_val, dur, desc)
+            else:
+                weeks = int(input("Number of Weeks: "))
+                days_str = input(f"Days (e.g. Mon,Wed,Fri; press Enter for {time_val.strftime('%A')}s only): ").strip()
+                weekdays = None
+                if days_str:
+                    names = [d.strip()[:3].capitalize() for d in days_str.split(",")]
+                    weekdays = [["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"].index(n) for n in names]
+                create_class_series(aid, tid, rid, title, cap, time_val, dur, weeks, weekdays, desc)
             
         except ValueError:
             print_error("Invalid input format.")
         except Exception as e:
             print_error(f"Failed to create class: {e}")
-        finally:
-            session.close()
     
     input("\nPress Enter to continue...")
 
 def view_all_rooms():
     """Display all rooms in the system"""
+    from app.logic import list_rooms
     print_header("All Rooms")
-    session = get_session()
-    try:
-        rooms = session.query(Room).all()
-        room_data = [[r.room_id, r.room_name, r.capacity] for r in rooms]
-        print_table(room_data, ["ID", "Room Name", "Capacity"])
-    finally:
-        session.close()
+    room_data = [[r.room_id, r.room_name, r.capacity] for r in list_rooms()]
+    print_table(room_data, ["ID", "Room Name", "Capacity"])
     
     input("\nPress Enter to continue...")
 
 def view_all_classes():
     """Display all scheduled classes"""
+    from app.logic import list_group_classes
     print_header("All Scheduled Classes")
-    session = get_session()
-    try:
-        classes = session.query(GroupClass).order_by(GroupClass.schedule_time).all()
-        class_data = []
-        for c in classes:
-            current = len(c.registrations)
-            class_data.append([
-                c.class_id,
-                c.title,
-                c.schedule_time.strftime("%Y-%m-%d %H:%M"),
-                c.duration_minutes,
-                f"{current}/{c.capacity}",
-                c.trainer.first_name + " " + c.trainer.last_name,
-                c.room.room_name
-            ])
-        
-        print_table(class_data, ["ID", "Title", "Date/Time", "Duration", "Enrolled", "Trainer", "Room"])
-    finally:
-        session.close()
+    cursor = None
+    while True:
+        classes, cursor = list_group_classes(after=cursor, limit=CLASS_PAGE_SIZE)
+        print_table(class_rows(classes), ["ID", "Title", "Date/Time", "Duration", "Enrolled", "Trainer", "Room"])
+        if not cursor or input("\nPress Enter for the next page (q to stop): ").strip().lower() == "q":
+            break
     
     input("\nPress Enter to continue...")
 
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    if "--startup-profile" in sys.argv[1:]:
+        startup_profile()
+    else:
+        main_menu()
\ No newline at end of file
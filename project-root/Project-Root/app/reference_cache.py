@@ -0,0 +1,141 @@
+"""
+Reference-data cache - rooms, trainers and name lookups change rarely but are
+read on almost every screen, so they are kept in process with a TTL and LRU
+eviction instead of being re-queried each time.
+
+Entries are keyed by (namespace, ...) tuples, e.g. ("rooms",) or
+("member_name", 3). Writes made through app.logic invalidate the keys they
+touch; app.logic only writes rooms, so trainers and names rely on the
+notifications below or the TTL. Writes from other processes arrive as cache_invalidation
+notifications once listen_for_invalidations() is running, which lets entries
+live for REFERENCE_CACHE_LISTEN_TTL seconds (default 3600) while the listener
+is connected; otherwise they become visible when the entry expires
+(REFERENCE_CACHE_TTL, default 300).
+"""
+import os
+import threading
+import time as timer
+from collections import Counter, OrderedDict
+
+
+class ReferenceCache:
+    """
+    TTL + LRU cache with per-namespace hit / miss / eviction counters. A value
+    loaded while its key was being invalidated is returned but not stored, so
+    an invalidation can never be overwritten by the read it raced with.
+    """
+    def __init__(self, ttl=300.0, maxsize=1024):
+        self.ttl = ttl
+        # Used instead of ttl while listening() says invalidations are arriving
+        self.listen_ttl = None
+        self.listening = None
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> (loaded_at, value), least recently used first
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = Counter()
+
+    def get(self, key, load):
+        """The cached value for key, or load() stored under it. None is never cached."""
+        now = timer.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.current_ttl():
+                self._entries.move_to_end(key)
+                self.hits[key[0]] += 1
+                return entry[1]
+            self.misses[key[0]] += 1
+            generation = self._generation
+
+        value = load()
+        if value is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self.evictions[evicted[0]] += 1
+        return value
+
+    def current_ttl(self):
+        """listen_ttl while the invalidation listener is connected, ttl otherwise."""
+        if self.listening is not None and self.listening():
+            return self.listen_ttl
+        return self.ttl
+
+    def invalidate(self, namespace, *key):
+        """Drops one key, or every key in the namespace when no key is given."""
+        with self._lock:
+            self._generation += 1
+            if key:
+                self._entries.pop((namespace,) + key, None)
+            else:
+                for k in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[k]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Per-namespace hits, misses, evictions and hit rate, plus the current size."""
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            return {
+                "size": len(self._entries),
+                "namespaces": {
+                    ns: {
+                        "hits": self.hits[ns],
+                        "misses": self.misses[ns],
+                        "evictions": self.evictions[ns],
+                        "hit_rate": round(self.hits[ns] / (self.hits[ns] + self.misses[ns]), 3),
+                    }
+                    for ns in namespaces
+                },
+            }
+
+    # Write-through invalidation: app.logic writes rooms (add_new_room); it has no
+    # write path for trainers or member names, which change only through other
+    # processes (apply_invalidation) or expire with the TTL
+
+    def invalidate_rooms(self):
+        self.invalidate("rooms")
+
+
+reference_cache = ReferenceCache(
+    ttl=float(os.getenv("REFERENCE_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("REFERENCE_CACHE_SIZE", "1024")),
+)
+
+
+def apply_invalidation(payload):
+    """Drops the entries a cache_invalidation notification (see database.py) covers."""
+    table = payload.get("table")
+    if table == "*":
+        reference_cache.clear()
+    elif table == "rooms":
+        reference_cache.invalidate_rooms()
+    elif table == "trainers":
+        reference_cache.invalidate("trainers")
+        if payload.get("trainer_id") is None:
+            reference_cache.invalidate("trainer_name")
+        else:
+            reference_cache.invalidate("trainer_name", payload["trainer_id"])
+    elif table == "members":
+        if payload.get("member_id") is None:
+            reference_cache.invalidate("member_name")
+        else:
+            reference_cache.invalidate("member_name", payload["member_id"])
+
+
+def listen_for_invalidations():
+    """Applies other processes' writes through LISTEN/NOTIFY, with the long TTL while it is connected."""
+    from models.database import start_cache_listener, cache_listener_connected
+    reference_cache.listen_ttl = float(os.getenv("REFERENCE_CACHE_LISTEN_TTL", "3600"))
+    reference_cache.listening = cache_listener_connected
+    start_cache_listener(apply_invalidation)
@@ -0,0 +1,103 @@
+"""
+Health metric trends computed from metric_rollups with NumPy, for many members
+in one batch. NumPy is only needed here and is imported on first use.
+"""
+from sqlalchemy import text
+from models.database import engine
+
+# One row per member holding its bucket means in time order; shipping arrays
+# instead of one row per bucket keeps the fetch cheap for thousands of members
+ROLLUP_SERIES_SQL = text("""
+    SELECT member_id,
+           array_agg(bucket - DATE '2000-01-01' ORDER BY bucket) AS days,
+           array_agg(mean_value ORDER BY bucket) AS means
+    FROM metric_rollups
+    WHERE type = :type AND grain = :grain
+      AND (CAST(:member_ids AS INTEGER[]) IS NULL OR member_id = ANY(:member_ids))
+      AND (CAST(:since AS DATE) IS NULL OR bucket >= :since)
+    GROUP BY member_id
+    ORDER BY member_id
+""")
+
+# Goal types are free text ("Weight gain" for a "Weight" metric), so a goal matches
+# on its first words; the open goal with the nearest deadline wins
+GOAL_TARGETS_SQL = text("""
+    SELECT DISTINCT ON (member_id) member_id, target_value
+    FROM fitness_goals
+    WHERE (type ILIKE :type OR type ILIKE :type || ' %') AND achieved IS NOT TRUE
+      AND (CAST(:member_ids AS INTEGER[]) IS NULL OR member_id = ANY(:member_ids))
+    ORDER BY member_id, deadline NULLS LAST, goal_id
+""")
+
+
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        print("[ERROR] Trend analysis needs NumPy (pip install numpy).")
+        return None
+    return numpy
+
+
+def compute_metric_trends(metric_type, member_ids=None, grain="day", since=None, window=7):
+    """
+    Trend per member for one metric type, from the daily or weekly rollups.
+    Returns a list of dicts (member_id, points, latest, slope, moving_avg,
+    goal_target, goal_progress), or None if NumPy is missing.
+
+    slope is the least-squares change per day, moving_avg is the mean of the last
+    `window` buckets, and goal_progress is the percent of the way from the first
+    value to the open FitnessGoal target (None without a goal).
+    """
+    np = load_numpy()
+    if np is None:
+        return None
+
+    params = {"type": metric_type, "grain": grain, "since": since,
+              "member_ids": list(member_ids) if member_ids is not None else None}
+    with engine.connect() as conn:
+        rows = conn.execute(ROLLUP_SERIES_SQL, params).all()
+        targets = dict(conn.execute(GOAL_TARGETS_SQL, params).all())
+    if not rows:
+        return []
+
+    # All series laid end to end; group maps each point back to its member
+    members = np.array([row.member_id for row in rows])
+    counts = np.array([len(row.days) for row in rows])
+    x = np.concatenate([row.days for row in rows]).astype(float)
+    y = np.concatenate([row.means for row in rows]).astype(float)
+    ends = np.cumsum(counts) - 1
+    starts = ends - counts + 1
+    group = np.repeat(np.arange(len(rows)), counts)
+
+    def per_member(weights):
+        return np.bincount(group, weights=weights, minlength=len(rows))
+
+    # Centre x per member so the normal equations stay well conditioned
+    x = x - x[starts][group]
+    n, sx, sy = counts.astype(float), per_member(x), per_member(y)
+    sxx, sxy = per_member(x * x), per_member(x * y)
+    denom = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom, np.nan)
+
+    in_window = (ends[group] - np.arange(len(x))) < window
+    moving_avg = per_member(y * in_window) / per_member(in_window.astype(float))
+
+    first, latest = y[starts], y[ends]
+    target = np.array([targets.get(m, np.nan) for m in members], dtype=float)
+    distance = first - target
+    with np.errstate(divide="ignore", invalid="ignore"):
+        progress = np.where(distance != 0, (first - latest) / distance * 100,
+                            np.where(latest == target, 100.0, 0.0))
+    progress[np.isnan(target)] = np.nan
+
+    def value(v):
+        return None if np.isnan(v) else round(float(v), 3)
+
+    return [
+        {"member_id": int(members[i]), "points": int(counts[i]), "latest": value(latest[i]),
+         "slope": value(slope[i]), "moving_avg": value(moving_avg[i]),
+         "goal_target": value(target[i]), "goal_progress": value(progress[i])}
+        for i in range(len(rows))
+    ]
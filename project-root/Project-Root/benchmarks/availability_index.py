@@ -0,0 +1,105 @@
+"""
+Availability index benchmark - rebuild time and memory of the in-process
+bitmap index (app.availability_index) for many trainers over a one-year
+horizon, and pre-check / free-slot latency against the SQL paths.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.availability_index --trainers 1000 --days 365
+
+Uses the same scratch trainers as benchmarks.free_slots (weekday availability
+and two classes every other day), deleted again when the run finishes.
+"""
+import argparse
+import time as timer
+import tracemalloc
+from datetime import date, datetime, timedelta
+from models.database import engine, get_session
+from app.availability_index import AvailabilityIndex
+from app.logic import PT_BOOKING_CHECK_SQL, FREE_STRETCHES_SQL
+from benchmarks.free_slots import CREATE_TRAINERS_SQL, EMAIL_DOMAIN, ADMIN_ID, cleanup
+from sqlalchemy import text
+
+
+def per_call_us(fn, calls):
+    t0 = timer.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (timer.perf_counter() - t0) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trainers", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    first_day = date.today() + timedelta(days=7 - date.today().weekday())  # next Monday
+
+    cleanup()
+    try:
+        with engine.connect() as conn:
+            conn.execute(CREATE_TRAINERS_SQL, {"n": args.trainers, "domain": EMAIL_DOMAIN, "days": args.days,
+                                               "first_day": first_day, "admin_id": ADMIN_ID})
+            conn.execute(text("ANALYZE trainers, availabilities, group_classes, resource_bookings"))
+            conn.commit()
+            trainer_ids = conn.execute(text("SELECT trainer_id FROM trainers WHERE email LIKE '%@' || :domain"),
+                                       {"domain": EMAIL_DOMAIN}).scalars().all()
+
+        t0 = timer.perf_counter()
+        with engine.connect() as conn:
+            index = AvailabilityIndex(first_day, args.days).build(conn)
+        build_s = timer.perf_counter() - t0
+
+        # Separate traced build for the footprint (tracing slows the build down)
+        tracemalloc.start()
+        with engine.connect() as conn:
+            traced = AvailabilityIndex(first_day, args.days).build(conn)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del traced
+        print(f"build: {build_s:.2f}s | footprint {retained / 2**20:.1f} MiB | {len(index.busy)} busy bitmaps")
+
+        # Probes on weekday mornings: a mix of free, taken (09:00 class days) and unavailable (weekend) slots
+        def probe(i):
+            day = first_day + timedelta(days=i % args.days)
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+            return trainer_ids[i % len(trainer_ids)], day, start, start + timedelta(hours=1)
+
+        def index_check(i):
+            trainer_id, _, start, end = probe(i)
+            index.check_booking(trainer_id, None, start, end)
+
+        session = get_session()
+        def sql_check(i):
+            trainer_id, day, start, end = probe(i)
+            session.execute(PT_BOOKING_CHECK_SQL, {
+                "trainer_id": trainer_id, "room_id": None, "session_date": day,
+                "start_time": start.time(), "end_time": end.time(), "day_name": day.strftime("%A"),
+                "start": start, "end": end, "slots": 4, "on_grid": False,
+            }).first()
+            session.execute(text("""
+                SELECT 1 FROM resource_bookings WHERE resource_type = 'trainer' AND resource_id = :t
+                  AND time_range && tsrange(:s, :e) LIMIT 1
+            """), {"t": trainer_id, "s": start, "e": end}).first()
+
+        print(f"pre-check: index {per_call_us(index_check, args.calls):.1f} us | "
+              f"sql {per_call_us(sql_check, min(args.calls, 500)):.1f} us")
+
+        last_day = first_day + timedelta(days=89)
+        def index_search(i):
+            index.free_slots(first_day, last_day, 60, trainer_ids[i % len(trainer_ids)])
+        def sql_search(i):
+            session.execute(FREE_STRETCHES_SQL, {
+                "start_date": first_day, "end_date": last_day, "trainer_id": trainer_ids[i % len(trainer_ids)],
+                "room_id": None, "slot_length": timedelta(hours=1), "not_before": datetime.now(),
+            }).all()
+        print(f"90-day free slots, one trainer: index {per_call_us(index_search, 200) / 1000:.2f} ms | "
+              f"sql {per_call_us(sql_search, 200) / 1000:.2f} ms")
+        session.close()
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Group class creation benchmark - measures create_group_class latency while a
+room's class history grows, to show the conflict check stays a bounded probe
+on the resource_bookings exclusion index instead of a scan of the history.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.class_conflict --sizes 100 10000 1000000
+
+A scratch room and trainer are created for the run and deleted afterwards
+together with their classes.
+"""
+import argparse
+import contextlib
+import io
+import time as timer
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models.database import get_session
+from models.schema import GroupClass, Room, Trainer
+from app.logic import create_group_class
+
+ADMIN_ID = 1
+HISTORY_START = datetime(2000, 1, 1, 6, 0)
+PROBE_START = datetime(2099, 1, 1, 9, 0)
+
+# One 60-minute class per hour, back to back, going back from HISTORY_START,
+# with the matching room and trainer claims in the booking ledger
+GROW_HISTORY_SQL = text("""
+    WITH new_classes AS (
+        INSERT INTO group_classes (title, schedule_time, duration_minutes, capacity, trainer_id, room_id, admin_id)
+        SELECT 'History class', :origin - n * interval '1 hour', 60, 10, :trainer_id, :room_id, :admin_id
+        FROM generate_series(:first, :last) AS n
+        RETURNING class_id, room_id, trainer_id, time_range
+    )
+    INSERT INTO resource_bookings (resource_type, resource_id, time_range, class_id)
+    SELECT 'room', room_id, time_range, class_id FROM new_classes
+    UNION ALL
+    SELECT 'trainer', trainer_id, time_range, class_id FROM new_classes
+""")
+
+
+def grow_history(room_id, trainer_id, current, target):
+    session = get_session()
+    try:
+        session.execute(GROW_HISTORY_SQL, {
+            "origin": HISTORY_START, "first": current, "last": target - 1,
+            "trainer_id": trainer_id, "room_id": room_id, "admin_id": ADMIN_ID,
+        })
+        session.commit()
+        session.execute(text("ANALYZE group_classes, resource_bookings"))
+        session.commit()
+    finally:
+        session.close()
+
+
+def time_creates(room_id, trainer_id, calls):
+    """Half the calls conflict with an earlier one, half create a new class."""
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(calls):
+            start = PROBE_START + timedelta(hours=i // 2)
+            t0 = timer.perf_counter()
+            create_group_class(ADMIN_ID, trainer_id, room_id, "Probe class", 10, start, 60)
+            latencies.append((timer.perf_counter() - t0) * 1000)
+
+    session = get_session()
+    try:
+        session.query(GroupClass).filter(
+            GroupClass.room_id == room_id,
+            GroupClass.schedule_time >= PROBE_START
+        ).delete()
+        session.commit()
+    finally:
+        session.close()
+
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--calls", type=int, default=100)
+    args = parser.parse_args()
+
+    session = get_session()
+    room = Room(room_name="Benchmark Room", capacity=100, admin_id=ADMIN_ID)
+    trainer = Trainer(first_name="Benchmark", last_name="Trainer", email="benchmark.trainer@gym.com", password="pass")
+    session.add_all([room, trainer])
+    session.commit()
+    room_id, trainer_id = room.room_id, trainer.trainer_id
+    session.close()
+
+    try:
+        current = 0
+        print(f"{'history':>10} | {'p50 ms':>8} | {'p95 ms':>8}")
+        for size in sorted(args.sizes):
+            grow_history(room_id, trainer_id, current, size)
+            current = size
+            p50, p95 = time_creates(room_id, trainer_id, args.calls)
+            print(f"{size:>10,} | {p50:>8.2f} | {p95:>8.2f}")
+    finally:
+        session = get_session()
+        session.query(GroupClass).filter(GroupClass.room_id == room_id).delete()
+        session.query(Room).filter(Room.room_id == room_id).delete()
+        session.query(Trainer).filter(Trainer.trainer_id == trainer_id).delete()
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Class series benchmark - builds the same weekly timetable with one
+create_group_class call per occurrence and with a single create_class_series
+call, and compares wall time and round trips.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.class_series --weeks 52 --days 5
+
+A scratch room and trainer are created for the run; every other week of the
+timetable is pre-booked so both paths have conflicts to report. They are
+deleted again with their classes when the run finishes.
+"""
+import argparse
+import contextlib
+import io
+import time as timer
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models.database import engine, get_session
+from models.schema import GroupClass, Room, Trainer
+from app.logic import create_group_class, create_class_series, series_occurrences
+
+ADMIN_ID = 1
+FIRST_CLASS = datetime(2099, 1, 5, 9, 0)  # a Monday
+
+
+def count_statements():
+    counter = {"n": 0}
+
+    def before_cursor_execute(*args):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return counter, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def clear_classes(room_id, title):
+    session = get_session()
+    try:
+        session.query(GroupClass).filter(GroupClass.room_id == room_id, GroupClass.title == title).delete()
+        session.commit()
+    finally:
+        session.close()
+
+
+def timed(label, call):
+    counter, stop = count_statements()
+    t0 = timer.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        created = call()
+    elapsed = (timer.perf_counter() - t0) * 1000
+    stop()
+    print(f"{label:<24} | {created:>8,} | {elapsed:>10.1f} | {counter['n']:>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--days", type=int, default=5, help="classes per week, Monday onwards")
+    args = parser.parse_args()
+
+    session = get_session()
+    room = Room(room_name="Series Benchmark Room", capacity=100, admin_id=ADMIN_ID)
+    trainer = Trainer(first_name="Series", last_name="Benchmark", email="series.benchmark@gym.com", password="pass")
+    session.add_all([room, trainer])
+    session.commit()
+    room_id, trainer_id = room.room_id, trainer.trainer_id
+    session.close()
+
+    weekdays = list(range(args.days))
+    starts = series_occurrences(FIRST_CLASS, args.weeks, weekdays)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_class_series(ADMIN_ID, trainer_id, room_id, "Blocker", 10, FIRST_CLASS + timedelta(minutes=30),
+                                60, args.weeks, [0])
+
+        def one_by_one():
+            return sum(bool(create_group_class(ADMIN_ID, trainer_id, room_id, "Series class", 10, start, 60))
+                       for start in starts)
+
+        def as_series():
+            report = create_class_series(ADMIN_ID, trainer_id, room_id, "Series class", 10, FIRST_CLASS, 60,
+                                         args.weeks, weekdays)
+            return sum(entry["class_id"] is not None for entry in report)
+
+        print(f"{len(starts):,} occurrences, {args.weeks:,} of them conflicting")
+        print(f"{'path':<24} | {'created':>8} | {'ms':>10} | {'statements':>10}")
+        timed("create_group_class x N", one_by_one)
+        clear_classes(room_id, "Series class")
+        timed("create_class_series", as_series)
+    finally:
+        session = get_session()
+        session.query(GroupClass).filter(GroupClass.room_id == room_id).delete()
+        session.query(Room).filter(Room.room_id == room_id).delete()
+        session.query(Trainer).filter(Trainer.trainer_id == trainer_id).delete()
+        session.commit()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Dashboard statement check - renders get_member_dashboard for a set of members,
+counts the statements each render sends to the database and fails (exit
+status 1) when any render takes more than the budget (one statement: the
+MEMBER_DASHBOARD_SQL read model).
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.dashboard_statements --members 50
+"""
+import argparse
+import contextlib
+import io
+import sys
+from sqlalchemy import event, func
+from models.database import engine, get_session
+from models.schema import Member, HealthMetric, ClassRegistration, PTSession
+from app.logic import get_member_dashboard
+
+MAX_STATEMENTS = 1
+
+
+def busiest_members(limit):
+    """Members with the most metrics, registrations and PT sessions, so every dashboard section has rows."""
+    session = get_session()
+    try:
+        activity = {}
+        for model in (HealthMetric, ClassRegistration, PTSession):
+            for member_id, n in session.query(model.member_id, func.count()).group_by(model.member_id):
+                if member_id is not None:
+                    activity[member_id] = activity.get(member_id, 0) + n
+        busiest = sorted(activity, key=lambda m: -activity[m])[:limit]
+        if len(busiest) < limit:
+            busiest += [m for (m,) in session.query(Member.member_id).order_by(Member.member_id).limit(limit)
+                        if m not in busiest][:limit - len(busiest)]
+        return busiest
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--history-points", type=int, default=10)
+    parser.add_argument("--max-statements", type=int, default=MAX_STATEMENTS)
+    args = parser.parse_args()
+
+    member_ids = busiest_members(args.members)
+    counter = {"n": 0}
+
+    def before_cursor_execute(*args):
+        counter["n"] += 1
+
+    per_render = {}
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for member_id in member_ids:
+            counter["n"] = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                get_member_dashboard(member_id, args.history_points)
+            per_render[member_id] = counter["n"]
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    over = {m: n for m, n in per_render.items() if n > args.max_statements}
+    print(f"dashboard renders: {len(per_render)} | statements per render: "
+          f"min {min(per_render.values())}, max {max(per_render.values())} (budget {args.max_statements})")
+    if over:
+        for member_id, n in sorted(over.items()):
+            print(f"   member {member_id}: {n} statements")
+        print("[FAIL] Dashboard renders over the statement budget.")
+        sys.exit(1)
+    print("[SUCCESS] Every dashboard render fits the statement budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Free-slot finder benchmark - times find_free_slots over a 90-day window for
+all trainers and for a single trainer, and find_free_stretches for all trainers.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.free_slots --trainers 100 --days 90
+
+Scratch trainers get weekday availability (08:00-12:00, 13:00-18:00) and two
+60-minute classes on every other day, so the finder has claims to subtract.
+They are deleted again with their classes when the run finishes.
+"""
+import argparse
+import time as timer
+from datetime import date, timedelta
+from sqlalchemy import text
+from models.database import engine
+from app.logic import find_free_slots, find_free_stretches
+
+EMAIL_DOMAIN = "slot-bench.invalid"
+ADMIN_ID = 1
+
+CREATE_TRAINERS_SQL = text("""
+    WITH new_trainers AS (
+        INSERT INTO trainers (first_name, last_name, email, password)
+        SELECT 'Bench', 'Trainer ' || i, 'trainer' || i || '@' || :domain, 'pass'
+        FROM generate_series(1, :n) AS i
+        RETURNING trainer_id
+    ),
+    new_availability AS (
+        INSERT INTO availabilities (trainer_id, start_time, end_time, is_recurring, day_of_week)
+        SELECT t.trainer_id, w.start_time, w.end_time, TRUE, d.day_name
+        FROM new_trainers t
+        CROSS JOIN (VALUES (TIME '08:00', TIME '12:00'), (TIME '13:00', TIME '18:00')) AS w(start_time, end_time)
+        CROSS JOIN (VALUES ('Monday'), ('Tuesday'), ('Wednesday'), ('Thursday'), ('Friday')) AS d(day_name)
+    ),
+    new_classes AS (
+        INSERT INTO group_classes (title, schedule_time, duration_minutes, capacity, trainer_id, admin_id)
+        SELECT 'Bench class', CAST(:first_day AS DATE) + n * 2 + h, 60, 10, t.trainer_id, :admin_id
+        FROM new_trainers t
+        CROSS JOIN generate_series(0, :days / 2) AS n
+        CROSS JOIN (VALUES (interval '9 hours'), (interval '15 hours')) AS hours(h)
+        RETURNING class_id, trainer_id, time_range
+    )
+    INSERT INTO resource_bookings (resource_type, resource_id, time_range, class_id)
+    SELECT 'trainer', trainer_id, time_range, class_id FROM new_classes
+""")
+
+
+def cleanup():
+    with engine.connect() as conn:
+        scratch = "SELECT trainer_id FROM trainers WHERE email LIKE '%@' || :domain"
+        for table in ("group_classes", "availabilities"):
+            conn.execute(text(f"DELETE FROM {table} WHERE trainer_id IN ({scratch})"), {"domain": EMAIL_DOMAIN})
+        conn.execute(text(f"DELETE FROM trainers WHERE trainer_id IN ({scratch})"), {"domain": EMAIL_DOMAIN})
+        conn.commit()
+
+
+def time_finder(runs, finder=find_free_slots, **kwargs):
+    latencies = []
+    for _ in range(runs):
+        t0 = timer.perf_counter()
+        slots = finder(**kwargs)
+        latencies.append((timer.perf_counter() - t0) * 1000)
+    latencies.sort()
+    return len(slots), latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trainers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    first_day = date.today() + timedelta(days=7 - date.today().weekday())  # next Monday
+    last_day = first_day + timedelta(days=args.days - 1)
+
+    cleanup()
+    try:
+        with engine.connect() as conn:
+            conn.execute(CREATE_TRAINERS_SQL, {"n": args.trainers, "domain": EMAIL_DOMAIN, "days": args.days,
+                                               "first_day": first_day, "admin_id": ADMIN_ID})
+            conn.execute(text("ANALYZE trainers, availabilities, group_classes, resource_bookings"))
+            conn.commit()
+
+        one_trainer = None
+        with engine.connect() as conn:
+            one_trainer = conn.execute(text("SELECT MIN(trainer_id) FROM trainers WHERE email LIKE '%@' || :domain"),
+                                       {"domain": EMAIL_DOMAIN}).scalar()
+
+        print(f"{'query':<23} | {'rows':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+        for label, kwargs in (
+            ("all trainers", {}),
+            ("all trainers, stretches", {"finder": find_free_stretches}),
+            ("one trainer", {"trainer_id": one_trainer}),
+            ("one trainer + rooms", {"trainer_id": one_trainer, "with_rooms": True}),
+        ):
+            slots, p50, p95 = time_finder(args.runs, start_date=first_day, end_date=last_day, **kwargs)
+            print(f"{label:<23} | {slots:>8,} | {p50:>8.2f} | {p95:>8.2f}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
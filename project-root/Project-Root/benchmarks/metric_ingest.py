@@ -0,0 +1,73 @@
+"""
+Health metric ingest benchmark - rows/sec of the per-row path
+(update_member_profile, one session and commit per reading) against the
+batched COPY path in app.ingest.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.metric_ingest --rows 2000 --bulk-rows 200000
+
+Readings are recorded for member 1 under a scratch metric type and are
+deleted again when the run finishes.
+"""
+import argparse
+import contextlib
+import io
+import time as timer
+from datetime import datetime, timedelta
+from models.database import get_session
+from models.schema import HealthMetric
+from app.logic import update_member_profile
+from app.ingest import ingest_health_metrics
+
+MEMBER_ID = 1
+METRIC_TYPE = "Benchmark Heart Rate"
+FIRST_READING = datetime(2024, 1, 1)
+
+
+def cleanup():
+    session = get_session()
+    try:
+        session.query(HealthMetric).filter(HealthMetric.type == METRIC_TYPE).delete()
+        session.commit()
+    finally:
+        session.close()
+
+
+def device_export(n):
+    """One reading per minute, as a device CSV export."""
+    lines = ["member_id,type,value,unit,date_recorded"]
+    for i in range(n):
+        lines.append(f"{MEMBER_ID},{METRIC_TYPE},{60 + i % 40},bpm,{FIRST_READING + timedelta(minutes=i)}")
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def report(label, n, elapsed):
+    print(f"{label:<10} {n} rows in {elapsed:.2f}s | {n / elapsed:,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="Readings for the per-row path")
+    parser.add_argument("--bulk-rows", type=int, default=200_000, help="Readings for the COPY path")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    cleanup()
+    try:
+        t0 = timer.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.rows):
+                update_member_profile(MEMBER_ID, new_metric=(METRIC_TYPE, 60 + i % 40, "bpm"))
+        report("per-row", args.rows, timer.perf_counter() - t0)
+        cleanup()
+
+        stream = device_export(args.bulk_rows)
+        t0 = timer.perf_counter()
+        rows_read, rows_inserted = ingest_health_metrics(stream, "csv", args.batch_size)
+        report("copy", rows_inserted, timer.perf_counter() - t0)
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
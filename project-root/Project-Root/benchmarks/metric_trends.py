@@ -0,0 +1,114 @@
+"""
+Metric trend benchmark - NumPy batch trends (app.trends) against a plain
+Python loop that fits each member's series separately.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.metric_trends --members 5000 --days 90
+
+Scratch members and their readings are created through the bulk ingest path
+(so the rollup triggers fill metric_rollups) and deleted again afterwards.
+"""
+import argparse
+import io
+import random
+import time as timer
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models.database import engine
+from app.ingest import ingest_health_metrics
+from app.trends import compute_metric_trends
+
+METRIC_TYPE = "Benchmark Weight"
+EMAIL_DOMAIN = "trend-bench.invalid"
+FIRST_DAY = datetime(2024, 1, 1)
+
+
+def create_members(n):
+    with engine.connect() as conn:
+        ids = conn.execute(text("""
+            INSERT INTO members (first_name, last_name, email, password)
+            SELECT 'Bench', 'Member ' || i, 'member' || i || '@' || :domain, 'pass'
+            FROM generate_series(1, :n) AS i
+            RETURNING member_id
+        """), {"n": n, "domain": EMAIL_DOMAIN}).scalars().all()
+        conn.execute(text("""
+            INSERT INTO fitness_goals (member_id, type, target_value, unit, achieved)
+            SELECT member_id, :type || ' loss', 150, 'lbs', FALSE
+            FROM members WHERE email LIKE '%@' || :domain
+        """), {"type": METRIC_TYPE, "domain": EMAIL_DOMAIN})
+        conn.commit()
+    return ids
+
+
+def cleanup():
+    with engine.connect() as conn:
+        scratch = "SELECT member_id FROM members WHERE email LIKE '%@' || :domain"
+        for table in ("health_metrics", "fitness_goals", "metric_rollups", "member_stats"):
+            conn.execute(text(f"DELETE FROM {table} WHERE member_id IN ({scratch})"), {"domain": EMAIL_DOMAIN})
+        conn.execute(text(f"DELETE FROM members WHERE member_id IN ({scratch})"), {"domain": EMAIL_DOMAIN})
+        conn.commit()
+
+
+def readings(member_ids, days):
+    """A noisy downward weight series per member, one reading per day."""
+    rng = random.Random(3005)
+    lines = ["member_id,type,value,unit,date_recorded"]
+    for member_id in member_ids:
+        start, drift = rng.uniform(160, 220), rng.uniform(-0.2, 0.05)
+        for day in range(days):
+            value = start + drift * day + rng.gauss(0, 0.8)
+            lines.append(f"{member_id},{METRIC_TYPE},{value:.2f},lbs,{FIRST_DAY + timedelta(days=day)}")
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def python_trends(member_ids, window):
+    """Per-member least squares and moving average in plain Python (one query per member)."""
+    results = []
+    with engine.connect() as conn:
+        for member_id in member_ids:
+            series = conn.execute(text("""
+                SELECT bucket - DATE '2000-01-01', mean_value FROM metric_rollups
+                WHERE member_id = :m AND type = :type AND grain = 'day' ORDER BY bucket
+            """), {"m": member_id, "type": METRIC_TYPE}).all()
+            n = len(series)
+            mean_x = sum(x for x, _ in series) / n
+            mean_y = sum(y for _, y in series) / n
+            sxx = sum((x - mean_x) ** 2 for x, _ in series)
+            slope = sum((x - mean_x) * (y - mean_y) for x, y in series) / sxx if sxx else None
+            recent = [y for _, y in series[-window:]]
+            results.append((member_id, slope, sum(recent) / len(recent)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--window", type=int, default=7)
+    args = parser.parse_args()
+
+    cleanup()
+    try:
+        member_ids = create_members(args.members)
+        ingest_health_metrics(readings(member_ids, args.days))
+
+        t0 = timer.perf_counter()
+        expected = python_trends(member_ids, args.window)
+        loop_time = timer.perf_counter() - t0
+
+        t0 = timer.perf_counter()
+        trends = compute_metric_trends(METRIC_TYPE, member_ids, window=args.window)
+        batch_time = timer.perf_counter() - t0
+
+        mismatches = sum(
+            abs(t["slope"] - slope) > 1e-3 or abs(t["moving_avg"] - avg) > 1e-3
+            for t, (_, slope, avg) in zip(trends, expected)
+        )
+        print(f"python loop {loop_time:.2f}s | numpy batch {batch_time:.2f}s | "
+              f"{args.members} members x {args.days} days | mismatches: {mismatches}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
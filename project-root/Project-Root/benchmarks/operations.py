@@ -0,0 +1,314 @@
+"""
+Operations benchmark - runs the ten app/logic.py operations headlessly against
+generated datasets and reports throughput, p50/p95/p99 latency, SQL
+statements and connection pool checkouts per call.
+
+Run from project-root (each size REPLACES the database with generated data):
+    python3 -m benchmarks.operations --sizes small medium large --iterations 200
+    python3 -m benchmarks.operations --sizes small --output before.json
+    python3 -m benchmarks.operations --sizes small --compare before.json
+
+--no-generate measures whatever is in the database instead (size "current").
+--reuse-templates saves each generated dataset as a template database
+(fitness_club_bench_<size>) and restores it on later runs instead of
+generating it again. Results are written as JSON to --output (default
+benchmarks/results/operations-<timestamp>.json) so runs can be compared.
+
+Write operations use a scratch trainer, benchmark rooms and members, and
+dates in 2099; everything they create is deleted when each size finishes.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import event, func
+from models.database import engine, get_session
+from models.schema import (
+    Member, Trainer, Room, GroupClass, PTSession, ClassRegistration, Availability
+)
+from app.reference_cache import reference_cache
+from app.logic import (
+    register_member, update_member_profile, get_member_dashboard, schedule_pt_session,
+    register_for_class, set_trainer_availability, get_trainer_schedule, add_new_room,
+    create_group_class, get_member_name, get_trainer_name
+)
+
+ADMIN_ID = 1
+FIRST_DAY = date(2099, 1, 5)        # PT availability and bookings start here
+FIRST_CLASS_DAY = date(2100, 1, 4)  # classes start here, clear of the PT bookings
+PT_HOURS = range(8, 20)             # hourly PT bookings within the 08:00-20:00 availability
+BENCH_ROOMS = 10
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# generate_data.py arguments per dataset size
+SIZES = {
+    "small": ["--members", "1000", "--trainers", "20", "--months", "3"],
+    "medium": ["--members", "20000", "--trainers", "100", "--months", "12"],
+    "large": ["--members", "200000", "--trainers", "500", "--months", "12"],
+}
+
+# Run order matters: later operations use the members, rooms, availability and classes earlier ones created
+OPERATIONS = [
+    "register_member", "update_member_profile", "get_member_dashboard", "add_new_room",
+    "set_trainer_availability", "schedule_pt_session", "create_group_class", "register_for_class",
+    "get_trainer_schedule", "name_lookups",
+]
+
+# Operations that signal failure with None rather than False
+CHECKED = {"register_member"}
+
+
+class Workload:
+    """Builds the calls for each operation and remembers what they created."""
+    def __init__(self, rng, iterations):
+        self.rng = rng
+        self.n = iterations
+        self.tag = datetime.now().strftime("%Y%m%d%H%M%S")
+        session = get_session()
+        try:
+            self.max_member = session.query(func.max(Member.member_id)).scalar() or 0
+            self.max_trainer = session.query(func.max(Trainer.trainer_id)).scalar() or 0
+            trainer = Trainer(first_name="Operations", last_name="Benchmark",
+                              email=f"ops.benchmark.{self.tag}@gym.com", password="pass")
+            session.add(trainer)
+            session.commit()
+            self.trainer_id = trainer.trainer_id
+        finally:
+            session.close()
+        self.member_ids = []
+        self.room_ids = []
+        self.class_ids = []
+
+    def random_member(self):
+        return self.rng.randint(1, self.max_member)
+
+    def random_trainer(self):
+        return self.rng.randint(1, self.max_trainer)
+
+    def register(self, i):
+        member_id = register_member("Bench", f"Member{i}", f"bench.{self.tag}.{i}@example.com", "pass",
+                                    date(1990, 1, 1), "Other")
+        self.member_ids.append(member_id)
+        return member_id
+
+    def calls(self, operation):
+        """Zero-argument callables for one operation, one per iteration."""
+        n = self.n
+        if operation == "register_member":
+            return [lambda i=i: self.register(i) for i in range(n)]
+        if operation == "update_member_profile":
+            self.member_ids = [m for m in self.member_ids if m]
+            return [lambda i=i: update_member_profile(
+                        self.member_ids[i % len(self.member_ids)],
+                        new_email=f"bench.{self.tag}.{i}.updated@example.com") for i in range(n)]
+        if operation == "get_member_dashboard":
+            return [lambda m=self.random_member(): get_member_dashboard(m) for _ in range(n)]
+        if operation == "add_new_room":
+            return [lambda i=i: add_new_room(ADMIN_ID, f"Benchmark Room {self.tag} {i}", 30) for i in range(n)]
+        if operation == "set_trainer_availability":
+            self.room_ids = room_ids(f"Benchmark Room {self.tag} %")[:BENCH_ROOMS]
+            return [lambda i=i: set_trainer_availability(
+                        self.trainer_id, time(PT_HOURS.start), time(PT_HOURS.stop), False, None,
+                        FIRST_DAY + timedelta(days=i)) for i in range(n)]
+        if operation == "schedule_pt_session":
+            calls = []
+            for i in range(n):
+                day, hour = divmod(i, len(PT_HOURS))
+                calls.append(lambda i=i, day=day, hour=PT_HOURS[hour]: schedule_pt_session(
+                    self.member_ids[i % len(self.member_ids)], self.trainer_id,
+                    self.room_ids[i % len(self.room_ids)], FIRST_DAY + timedelta(days=day),
+                    time(hour), time(hour + 1)))
+            return calls
+        if operation == "create_group_class":
+            return [lambda i=i: create_group_class(
+                        ADMIN_ID, self.trainer_id, self.room_ids[i % len(self.room_ids)], "Benchmark class", 20,
+                        datetime.combine(FIRST_CLASS_DAY + timedelta(days=i), time(10)), 60) for i in range(n)]
+        if operation == "register_for_class":
+            self.class_ids = class_ids(self.room_ids)
+            return [lambda i=i: register_for_class(self.member_ids[i % len(self.member_ids)],
+                                                   self.class_ids[i % len(self.class_ids)]) for i in range(n)]
+        if operation == "get_trainer_schedule":
+            return [lambda t=self.random_trainer(): get_trainer_schedule(t) for _ in range(n)]
+        if operation == "name_lookups":
+            return [lambda i=i, m=self.random_member(), t=self.random_trainer():
+                    get_member_name(m) if i % 2 == 0 else get_trainer_name(t) for i in range(n)]
+        raise ValueError(operation)
+
+    def cleanup(self):
+        session = get_session()
+        try:
+            rooms = room_ids(f"Benchmark Room {self.tag} %")
+            classes = class_ids(rooms)
+            session.query(ClassRegistration).filter(ClassRegistration.class_id.in_(classes)).delete()
+            session.query(GroupClass).filter(GroupClass.class_id.in_(classes)).delete()
+            session.query(PTSession).filter(PTSession.trainer_id == self.trainer_id).delete()
+            session.query(Availability).filter(Availability.trainer_id == self.trainer_id).delete()
+            session.query(Room).filter(Room.room_id.in_(rooms)).delete()
+            session.query(Trainer).filter(Trainer.trainer_id == self.trainer_id).delete()
+            session.query(Member).filter(Member.email.like(f"bench.{self.tag}.%")).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+
+def room_ids(name_pattern):
+    session = get_session()
+    try:
+        return [r for (r,) in session.query(Room.room_id).filter(Room.room_name.like(name_pattern))
+                                     .order_by(Room.room_id)]
+    finally:
+        session.close()
+
+
+def class_ids(rooms):
+    session = get_session()
+    try:
+        return [c for (c,) in session.query(GroupClass.class_id).filter(GroupClass.room_id.in_(rooms))
+                                     .order_by(GroupClass.class_id)]
+    finally:
+        session.close()
+
+
+def count_statements():
+    """Counts statements and pool checkouts until the returned stop() is called."""
+    counter = {"n": 0, "checkouts": 0}
+
+    def before_cursor_execute(*args):
+        counter["n"] += 1
+
+    def checkout(*args):
+        counter["checkouts"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "checkout", checkout)
+
+    def stop():
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(engine, "checkout", checkout)
+    return counter, stop
+
+
+def percentile(latencies, q):
+    """Nearest-rank percentile of a sorted list."""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+def measure(calls, checked):
+    counter, stop = count_statements()
+    latencies = []
+    ok = 0
+    started = timer.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for call in calls:
+            t0 = timer.perf_counter()
+            result = call()
+            latencies.append((timer.perf_counter() - t0) * 1000)
+            ok += result is not False and not (result is None and checked)
+    elapsed = timer.perf_counter() - started
+    stop()
+    latencies.sort()
+    return {
+        "calls": len(calls),
+        "ok": ok,
+        "throughput_per_s": round(len(calls) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "statements_per_call": round(counter["n"] / len(calls), 2),
+        "checkouts_per_call": round(counter["checkouts"] / len(calls), 2),
+    }
+
+
+def prepare(size, reuse_templates):
+    """Loads the dataset for a size, from its template database when reuse_templates is set."""
+    from generate_data import build_parser, generate
+    from seed_data import restore_template, save_template
+    template = f"fitness_club_bench_{size}"
+    if reuse_templates:
+        with contextlib.redirect_stdout(io.StringIO()):
+            restored = restore_template(template)
+        if restored:
+            print(f"Restored {size} dataset from {template}")
+            return
+    print(f"Generating {size} dataset...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate(build_parser().parse_args(SIZES[size]))
+    if reuse_templates:
+        save_template(template)
+
+
+def run_size(size, iterations, seed):
+    reference_cache.clear()
+    workload = Workload(random.Random(seed), iterations)
+    results = {}
+    print(f"\n[{size}] {workload.max_member:,} members, {workload.max_trainer:,} trainers, "
+          f"{iterations} calls per operation")
+    print(f"{'operation':<26} | {'ok':>5} | {'ops/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | "
+          f"{'p99 ms':>8} | {'stmts':>6} | {'conns':>5}")
+    try:
+        for operation in OPERATIONS:
+            r = results[operation] = measure(workload.calls(operation), operation in CHECKED)
+            print(f"{operation:<26} | {r['ok']:>5} | {r['throughput_per_s']:>8.1f} | {r['p50_ms']:>8.2f} | "
+                  f"{r['p95_ms']:>8.2f} | {r['p99_ms']:>8.2f} | {r['statements_per_call']:>6.1f} | "
+                  f"{r['checkouts_per_call']:>5.1f}")
+    finally:
+        workload.cleanup()
+    return {"members": workload.max_member, "trainers": workload.max_trainer, "operations": results,
+            "reference_cache": reference_cache.stats()}
+
+
+def compare(previous, current):
+    """Prints the p50/p95 and statement changes against an earlier results file."""
+    print(f"\nCompared with {previous['started']}:")
+    print(f"{'size / operation':<34} | {'p50':>8} | {'p95':>8} | {'stmts':>11}")
+    for size, data in current["sizes"].items():
+        before = previous["sizes"].get(size)
+        if not before:
+            continue
+        for operation, r in data["operations"].items():
+            b = before["operations"].get(operation)
+            if not b:
+                continue
+            change = lambda key: f"{(r[key] - b[key]) / b[key] * 100:+.0f}%" if b[key] else "-"
+            print(f"{size + ' / ' + operation:<34} | {change('p50_ms'):>8} | {change('p95_ms'):>8} | "
+                  f"{b['statements_per_call']:>4.1f} -> {r['statements_per_call']:<4.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small"])
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-generate", action="store_true", help="Use the data already in the database")
+    parser.add_argument("--reuse-templates", action="store_true",
+                        help="Restore each size from a saved template database instead of generating it")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/operations-<timestamp>.json)")
+    parser.add_argument("--compare", metavar="PATH", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    report = {"started": started.isoformat(timespec="seconds"), "iterations": args.iterations,
+              "seed": args.seed, "sizes": {}}
+    for size in (["current"] if args.no_generate else args.sizes):
+        if not args.no_generate:
+            prepare(size, args.reuse_templates)
+        report["sizes"][size] = run_size(size, args.iterations, args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"operations-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+PT booking benchmark - compares the old one-query-per-check validation in
+schedule_pt_session with the single combined statement (PT_BOOKING_CHECK_SQL).
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.pt_booking --bookings 200
+
+Bookings are made for trainer 1 (Mon 08:00-12:00 in the seed data) on Mondays
+far in the future and are deleted again when the run finishes.
+"""
+import argparse
+import contextlib
+import io
+import time as timer
+from datetime import date, time, timedelta
+from sqlalchemy import event
+from models.database import engine, get_session
+from models.schema import PTSession, Trainer, Room, Availability
+from app.logic import schedule_pt_session
+
+TRAINER_ID = 1
+ROOM_ID = 4
+FIRST_MONDAY = date(2099, 1, 5)
+SLOTS = [(time(h, 0), time(h + 1, 0)) for h in range(8, 12)]
+
+
+class RoundTripCounter:
+    """Counts statements and commits sent over the engine's connections."""
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def _on_commit(self, conn):
+        self.count += 1
+
+
+def legacy_schedule_pt_session(member_id, trainer_id, room_id, session_date, start_time, end_time):
+    """The pre-combined validation path: one query per check, then the insert."""
+    session = get_session()
+    try:
+        if not session.get(Trainer, trainer_id):
+            return False
+        if not session.get(Room, room_id):
+            return False
+        for column, value in ((PTSession.member_id, member_id),
+                              (PTSession.trainer_id, trainer_id),
+                              (PTSession.room_id, room_id)):
+            conflict = session.query(PTSession).filter(
+                column == value,
+                PTSession.date == session_date,
+                PTSession.start_time < end_time,
+                PTSession.end_time > start_time
+            ).first()
+            if conflict:
+                return False
+        recurring_avail = session.query(Availability).filter(
+            Availability.trainer_id == trainer_id,
+            Availability.is_recurring == True,
+            Availability.day_of_week == session_date.strftime("%A"),
+            Availability.start_time <= start_time,
+            Availability.end_time >= end_time
+        ).first()
+        specific_avail = session.query(Availability).filter(
+            Availability.trainer_id == trainer_id,
+            Availability.is_recurring == False,
+            Availability.specific_date == session_date,
+            Availability.start_time <= start_time,
+            Availability.end_time >= end_time
+        ).first()
+        if not recurring_avail and not specific_avail:
+            return False
+        session.add(PTSession(member_id=member_id, trainer_id=trainer_id, room_id=room_id,
+                              date=session_date, start_time=start_time, end_time=end_time,
+                              status='Scheduled'))
+        session.commit()
+        return True
+    finally:
+        session.close()
+
+
+def booking_slots(n):
+    for i in range(n):
+        week, slot = divmod(i, len(SLOTS))
+        yield FIRST_MONDAY + timedelta(weeks=week), SLOTS[slot]
+
+
+def cleanup():
+    session = get_session()
+    try:
+        session.query(PTSession).filter(PTSession.date >= FIRST_MONDAY).delete()
+        session.commit()
+    finally:
+        session.close()
+
+
+def run(label, book, n, counter):
+    cleanup()
+    latencies = []
+    counter.count = 0
+    booked = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for session_date, (start, end) in booking_slots(n):
+            t0 = timer.perf_counter()
+            booked += bool(book(1, TRAINER_ID, ROOM_ID, session_date, start, end))
+            latencies.append((timer.perf_counter() - t0) * 1000)
+    round_trips = counter.count / n
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<10} booked {booked}/{n} | round trips/booking: {round_trips:.1f} | "
+          f"p50: {p50:.2f} ms | p95: {p95:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=200)
+    args = parser.parse_args()
+
+    counter = RoundTripCounter()
+    try:
+        run("before", legacy_schedule_pt_session, args.bookings, counter)
+        run("after", schedule_pt_session, args.bookings, counter)
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
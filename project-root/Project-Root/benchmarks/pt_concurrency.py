@@ -0,0 +1,109 @@
+"""
+PT booking concurrency stress test - fires many overlapping schedule_pt_session
+calls in parallel and checks that no member, trainer or room ends up
+double-booked (the excl_pt_*_overlap constraints must win every race).
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.pt_concurrency --bookings 500 --workers 50 [--inventory]
+
+Bookings land on one Monday far in the future and are deleted afterwards.
+With --inventory that day is materialised into pt_slots first, so bookings
+take the SKIP LOCKED slot-claim path instead of the full validation.
+"""
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from sqlalchemy import create_engine, text
+from models.database import SessionLocal, database_url, engine, get_session, materialize_pt_slots
+from models.schema import PTSession, PTSlot, Member, Room
+
+TRAINER_ID = 1            # Mon 08:00-12:00 in the seed data
+SESSION_DATE = date(2099, 1, 5)
+
+DOUBLE_BOOKINGS_SQL = text("""
+    SELECT COUNT(*) FROM pt_sessions a
+    JOIN pt_sessions b ON a.session_id < b.session_id
+     AND a.time_range && b.time_range
+     AND (a.member_id = b.member_id OR a.trainer_id = b.trainer_id OR a.room_id = b.room_id)
+    WHERE a.date = :d AND b.date = :d
+""")
+
+
+def random_booking(rng, member_ids, room_ids):
+    start_minute = 8 * 60 + rng.randrange(0, 14) * 15
+    length = rng.choice([15, 30, 45, 60])
+    end_minute = min(start_minute + length, 12 * 60)
+    return (rng.choice(member_ids), TRAINER_ID, rng.choice(room_ids), SESSION_DATE,
+            time(*divmod(start_minute, 60)), time(*divmod(end_minute, 60)))
+
+
+def cleanup():
+    session = get_session()
+    try:
+        session.query(PTSession).filter(PTSession.date == SESSION_DATE).delete()
+        session.query(PTSlot).filter(PTSlot.slot_start >= SESSION_DATE).delete()
+        session.commit()
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--inventory", action="store_true", help="Book through the pt_slots inventory")
+    args = parser.parse_args()
+
+    # One connection per worker so the bookings really do run concurrently
+    SessionLocal.configure(bind=create_engine(database_url, pool_size=args.workers, max_overflow=0))
+    from app.logic import schedule_pt_session
+
+    session = get_session()
+    member_ids = [m for (m,) in session.query(Member.member_id)]
+    room_ids = [r for (r,) in session.query(Room.room_id)]
+    session.close()
+
+    rng = random.Random(args.seed)
+    bookings = [random_booking(rng, member_ids, room_ids) for _ in range(args.bookings)]
+
+    def timed_booking(booking):
+        t0 = timer.perf_counter()
+        booked = schedule_pt_session(*booking)
+        return booked, (timer.perf_counter() - t0) * 1000
+
+    cleanup()
+    try:
+        if args.inventory:
+            with engine.connect() as conn:
+                materialize_pt_slots(conn, SESSION_DATE, days=1, trainer_id=TRAINER_ID)
+                conn.commit()
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                results, latencies = zip(*pool.map(timed_booking, bookings))
+
+        session = get_session()
+        double_bookings = session.execute(DOUBLE_BOOKINGS_SQL, {"d": SESSION_DATE}).scalar()
+        stored = session.query(PTSession).filter(PTSession.date == SESSION_DATE).count()
+        session.close()
+    finally:
+        cleanup()
+
+    print(f"attempted: {len(bookings)} | booked: {sum(results)} | stored: {stored} | "
+          f"double-bookings: {double_bookings}")
+    latencies = sorted(latencies)
+    print(f"latency p50: {latencies[len(latencies) // 2]:.1f} ms | "
+          f"p95: {latencies[int(len(latencies) * 0.95)]:.1f} ms | max: {latencies[-1]:.1f} ms")
+    if double_bookings or stored != sum(results):
+        print("[FAIL] overlapping PT sessions were committed")
+        sys.exit(1)
+    print("[OK] no double-bookings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Reference cache benchmark - renders the screens that list rooms and trainers
+or look up names (PT booking, class management, room list, admin status,
+logins) with the reference cache off (TTL 0) and on, and compares statements
+and time per screen.
+
+Run against a seeded database (python3 seed_data.py) from project-root:
+    python3 -m benchmarks.reference_cache --renders 500
+"""
+import argparse
+import random
+import time as timer
+from sqlalchemy import event, func
+from models.database import engine, get_session
+from models.schema import GroupClass, Member, Trainer
+from app.reference_cache import reference_cache
+from app.logic import list_rooms, list_trainers, get_member_name, get_trainer_name, get_availability_by_trainer
+
+
+def count_statements():
+    counter = {"n": 0}
+
+    def before_cursor_execute(*args):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return counter, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def admin_status():
+    session = get_session()
+    try:
+        session.query(GroupClass).count()
+        session.query(Member).count()
+    finally:
+        session.close()
+    len(list_rooms())
+    len(list_trainers())
+
+
+def screens(rng, max_member, max_trainer):
+    """One front-desk round: each screen's reads (reference data and the rest), in menu order."""
+    return [
+        ("member login", lambda: get_member_name(rng.randint(1, max_member))),
+        ("trainer login", lambda: get_trainer_name(rng.randint(1, max_trainer))),
+        ("book PT session", lambda: (list_trainers(), get_availability_by_trainer(), list_rooms())),
+        ("class management", lambda: (list_trainers(), list_rooms())),
+        ("view all rooms", list_rooms),
+        ("admin status", admin_status),
+    ]
+
+
+def run(label, ttl, renders, seed, max_member, max_trainer):
+    reference_cache.ttl = ttl
+    reference_cache.clear()
+    rng = random.Random(seed)
+    round_ = screens(rng, max_member, max_trainer)
+    counter, stop = count_statements()
+    t0 = timer.perf_counter()
+    for i in range(renders):
+        round_[i % len(round_)][1]()
+    elapsed = (timer.perf_counter() - t0) * 1000
+    stop()
+    print(f"{label:<10} | {counter['n'] / renders:>12.2f} | {elapsed / renders:>10.3f}")
+    return counter["n"] / renders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    session = get_session()
+    max_member = session.query(func.max(Member.member_id)).scalar()
+    max_trainer = session.query(func.max(Trainer.trainer_id)).scalar()
+    session.close()
+
+    print(f"{'cache':<10} | {'stmts/screen':>12} | {'ms/screen':>10}")
+    ttl = reference_cache.ttl
+    before = run("off", 0, args.renders, args.seed, max_member, max_trainer)
+    after = run("on", ttl, args.renders, args.seed, max_member, max_trainer)
+    print(f"\nDatabase statements per screen cut by {(1 - after / before) * 100:.0f}%")
+    for namespace, s in reference_cache.stats()["namespaces"].items():
+        print(f"   {namespace:<13} hits {s['hits']:>6} | misses {s['misses']:>5} | hit rate {s['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
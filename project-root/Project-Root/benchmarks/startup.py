@@ -0,0 +1,64 @@
+"""
+Cold-start budget check - launches python3 -m app.main in fresh processes,
+goes straight from the main menu to EXIT, and fails (exit status 1) when the
+median time to that point is over budget or when the menu pulled in any of
+the layers that are meant to load lazily.
+
+Run from project-root (no database needed for the budget check):
+    python3 -m benchmarks.startup --runs 10 --budget-ms 250
+    python3 -m benchmarks.startup --profile   # also print --startup-profile (needs the database)
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time as timer
+
+# Must not be imported before a portal is opened
+LAZY_MODULES = ["sqlalchemy", "tabulate", "dotenv", "models.database", "models.schema", "app.logic"]
+
+EAGER_IMPORTS_CHECK = (
+    "import sys, app.main; "
+    f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+)
+
+
+def time_to_menu_exit():
+    t0 = timer.perf_counter()
+    subprocess.run([sys.executable, "-m", "app.main"], input="4\n", text=True,
+                   stdout=subprocess.DEVNULL, check=True)
+    return (timer.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="Median start-to-exit time allowed")
+    parser.add_argument("--profile", action="store_true", help="Also run app.main --startup-profile")
+    args = parser.parse_args()
+
+    failed = False
+    eager = subprocess.run([sys.executable, "-c", EAGER_IMPORTS_CHECK], text=True,
+                           capture_output=True, check=True).stdout.strip()
+    if eager:
+        print(f"[FAIL] Imported before the first menu: {eager}")
+        failed = True
+
+    times = sorted(time_to_menu_exit() for _ in range(args.runs))
+    median = statistics.median(times)
+    print(f"start -> main menu -> exit over {args.runs} runs: median {median:.0f} ms, "
+          f"min {times[0]:.0f} ms, max {times[-1]:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if median > args.budget_ms:
+        print("[FAIL] Cold start is over budget.")
+        failed = True
+
+    if args.profile:
+        subprocess.run([sys.executable, "-m", "app.main", "--startup-profile"], check=True)
+
+    if failed:
+        sys.exit(1)
+    print("[SUCCESS] Cold start within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Synthetic data generator - replaces all data with a reproducible, realistically
+distributed dataset of any size, for seeing how the queries behave at scale.
+
+Usage (from project-root):
+    python3 generate_data.py --members 1_000_000 --trainers 2_000 --months 24 --seed 42
+
+The same --seed and --end-date always produce the same rows. Rows are generated
+as a stream and loaded with COPY in batches of --batch-size rows, one
+transaction per batch, so memory stays flat however large the dataset is.
+Bookings never overlap (the exclusion constraints stay valid) and every class
+and PT session gets its room and trainer claims in resource_bookings. The
+counter-cache and rollup triggers are switched off during the load and their
+tables are rebuilt in bulk at the end with the manage.py repair commands.
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import time as timer
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+from sqlalchemy import text
+from models.database import (
+    engine, ensure_health_metric_partitions, rebuild_member_stats, recount_enrollment,
+    rebuild_metric_rollups, refresh_pt_slots, notify_all_caches
+)
+from seed_data import reset_database
+
+FIRST_NAMES = ["James", "Mary", "Wei", "Priya", "Omar", "Sofia", "Liam", "Chloe", "Minh", "Aisha",
+               "Noah", "Emma", "Hiro", "Fatima", "Lucas", "Olivia", "Mateo", "Ava", "Ivan", "Zara"]
+LAST_NAMES = ["Smith", "Nguyen", "Patel", "Garcia", "Kim", "Brown", "Chen", "Martin", "Singh", "Lopez",
+              "Wilson", "Tran", "Khan", "Lee", "Walker", "Rossi", "Silva", "Cohen", "Murphy", "Dubois"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# (title, description, duration in minutes, usual class size)
+CLASS_TYPES = [
+    ("Morning Yoga", "Start your day with inner peace", 60, 20),
+    ("HIIT Blast", "High intensity interval training", 45, 15),
+    ("Spin Class", "Cardio cycling workout", 45, 15),
+    ("Pilates Core", "Core strength and posture", 60, 12),
+    ("Boxing Fit", "Bag work and conditioning", 60, 16),
+    ("Strength Circuit", "Full body resistance circuit", 60, 20),
+    ("Zumba", "Dance cardio party", 60, 30),
+    ("Stretch & Recover", "Mobility and recovery", 45, 25),
+]
+# Trainer shifts (start hour, end hour) and how common each one is
+SHIFTS = [((6, 12), 3), ((9, 15), 2), ((12, 18), 2), ((15, 21), 4)]
+# How busy the club is by hour of day: classes and PT fill up before and after work
+HOUR_DEMAND = {6: 0.9, 7: 1.1, 8: 0.9, 9: 0.7, 10: 0.6, 11: 0.6, 12: 0.8, 13: 0.6, 14: 0.5,
+               15: 0.6, 16: 0.8, 17: 1.3, 18: 1.4, 19: 1.2, 20: 0.8}
+# (type, unit, share of a member's readings)
+METRIC_TYPES = [("Weight", "lbs", 0.5), ("Heart Rate", "bpm", 0.3), ("Body Fat", "%", 0.2)]
+
+# COPY order respects the foreign keys; each batch loads every table in this order
+TABLE_COLUMNS = {
+    "admins": ("admin_id", "first_name", "last_name", "email", "password"),
+    "members": ("member_id", "first_name", "last_name", "email", "password", "gender", "dob", "join_date"),
+    "trainers": ("trainer_id", "first_name", "last_name", "email", "password"),
+    "rooms": ("room_id", "room_name", "capacity", "admin_id"),
+    "availabilities": ("trainer_id", "start_time", "end_time", "is_recurring", "day_of_week"),
+    "fitness_goals": ("member_id", "type", "target_value", "unit", "deadline", "achieved"),
+    "group_classes": ("class_id", "title", "description", "schedule_time", "duration_minutes", "capacity",
+                      "trainer_id", "room_id", "admin_id"),
+    "pt_sessions": ("session_id", "date", "start_time", "end_time", "status", "member_id", "trainer_id", "room_id"),
+    "resource_bookings": ("resource_type", "resource_id", "time_range", "session_id", "class_id"),
+    "class_registrations": ("member_id", "class_id", "registration_date", "status"),
+    "health_metrics": ("member_id", "type", "value", "unit", "date_recorded"),
+}
+# Loaded with explicit ids, so their sequences are moved past the generated rows
+EXPLICIT_IDS = [("admins", "admin_id"), ("members", "member_id"), ("trainers", "trainer_id"),
+                ("rooms", "room_id"), ("group_classes", "class_id"), ("pt_sessions", "session_id")]
+# Row triggers that would fire per generated row; their tables are rebuilt in bulk instead
+BULK_REBUILT_TRIGGERS = ["class_registrations", "pt_sessions", "health_metrics"]
+# Tables whose only row triggers send cache notifications; one "drop everything" is sent at the end
+QUIET_TRIGGERS = ["members", "trainers", "rooms", "availabilities", "resource_bookings"]
+
+
+class BatchLoader:
+    """Buffers generated rows per table and COPYs them, one transaction per batch."""
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLE_COLUMNS}
+        self.buffered = 0
+        self.loaded = dict.fromkeys(TABLE_COLUMNS, 0)
+
+    def add(self, table, row):
+        self.buffers[table].append(row)
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        cursor = self.conn.connection.dbapi_connection.cursor()
+        for table, rows in self.buffers.items():
+            if not rows:
+                continue
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN WITH (FORMAT csv)", buffer)
+            self.loaded[table] += len(rows)
+            rows.clear()
+        self.conn.commit()
+        self.buffered = 0
+
+
+def tsrange(start, end):
+    return f"[{start},{end})"
+
+
+def weighted_picker(rng, weights):
+    """Returns pick(k): k ids (1-based, with repeats) drawn in proportion to weights."""
+    cumulative = array("d", accumulate(weights))
+    total = cumulative[-1]
+    return lambda k: [bisect_left(cumulative, rng.random() * total) + 1 for _ in range(k)]
+
+
+def generate_members(rng, loader, args, first_day):
+    """Members with their goals and health readings; returns each member's activity weight."""
+    span_days = (args.end_date - first_day).days
+    activity = []
+    for member_id in range(1, args.members + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        gender = rng.choices(["Male", "Female", "Other"], [48, 48, 4])[0]
+        dob = date(1950, 1, 1) + timedelta(days=rng.randrange(55 * 365))
+        join_date = datetime.combine(first_day, time(10)) - timedelta(days=rng.randrange(3 * 365))
+        loader.add("members", (member_id, first, last, f"{first}.{last}.{member_id}@example.com".lower(),
+                               "pass", gender, dob, join_date))
+
+        # A few members are regulars, most come now and then
+        weight = rng.lognormvariate(0, 0.9)
+        activity.append(weight)
+
+        weight_lbs = rng.gauss(175 if gender == "Male" else 150, 25)
+        for _ in range(rng.choices([0, 1, 2], [40, 45, 15])[0]):
+            goal = rng.choice(["Weight Loss", "Weight Gain", "Body Fat Reduction", "Endurance"])
+            target, unit = {
+                "Weight Loss": (round(weight_lbs - rng.uniform(5, 30), 1), "lbs"),
+                "Weight Gain": (round(weight_lbs + rng.uniform(5, 20), 1), "lbs"),
+                "Body Fat Reduction": (round(rng.uniform(12, 25), 1), "%"),
+                "Endurance": (float(rng.choice([5, 10, 21])), "km"),
+            }[goal]
+            loader.add("fitness_goals", (member_id, goal, target, unit,
+                                         args.end_date + timedelta(days=rng.randrange(30, 365)), False))
+
+        # Readings on distinct days, mostly in the morning, drifting slowly over time
+        readings = min(span_days, round(rng.expovariate(1) * args.metrics_per_month * args.months * min(weight, 3)))
+        days = sorted(rng.sample(range(span_days), readings))
+        heart_rate = rng.gauss(68, 8)
+        body_fat = rng.gauss(24 if gender == "Female" else 19, 5)
+        drift = rng.gauss(-0.02, 0.05)
+        for day in days:
+            metric, unit, _ = rng.choices(METRIC_TYPES, [share for _, _, share in METRIC_TYPES])[0]
+            value = {
+                "Weight": weight_lbs + drift * day + rng.gauss(0, 1.5),
+                "Heart Rate": heart_rate + rng.gauss(0, 4),
+                "Body Fat": body_fat + drift * day / 10 + rng.gauss(0, 0.8),
+            }[metric]
+            recorded = datetime.combine(first_day + timedelta(days=day), time(rng.choice([6, 7, 7, 8, 12, 19]),
+                                                                              rng.randrange(60)))
+            loader.add("health_metrics", (member_id, metric, round(value, 1), unit, recorded))
+    return activity
+
+
+def generate_staff(rng, loader, args):
+    """
+    Admins, trainers with weekly shifts, and rooms. Returns the shifts by
+    trainer, studio capacities by room, the PT room ids and the admin count.
+    """
+    admins = max(1, args.trainers // 200)
+    for admin_id in range(1, admins + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        loader.add("admins", (admin_id, first, last, f"admin{admin_id}@gym.example", "pass"))
+
+    shifts = {}
+    for trainer_id in range(1, args.trainers + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        loader.add("trainers", (trainer_id, first, last, f"trainer{trainer_id}@gym.example", "pass"))
+        (start_hour, end_hour), = rng.choices([s for s, _ in SHIFTS], [w for _, w in SHIFTS])
+        workdays = sorted(rng.sample(range(7), rng.choice([3, 4, 4, 5, 5, 6])))
+        for weekday in workdays:
+            loader.add("availabilities", (trainer_id, time(start_hour), time(end_hour), True, WEEKDAYS[weekday]))
+        shifts[trainer_id] = (start_hour, end_hour, set(workdays))
+
+    rooms = args.rooms or max(4, args.trainers // 4)
+    studios, pt_rooms = {}, []
+    for room_id in range(1, rooms + 1):
+        if room_id <= max(1, rooms * 2 // 5):
+            studios[room_id] = rng.choice([15, 20, 25, 30, 40, 50])
+            loader.add("rooms", (room_id, f"Studio {len(studios)}", studios[room_id], rng.randint(1, admins)))
+        else:
+            pt_rooms.append(room_id)
+            loader.add("rooms", (room_id, f"PT Room {len(pt_rooms)}", rng.choice([2, 3, 4, 5]),
+                                 rng.randint(1, admins)))
+    return shifts, studios, pt_rooms, admins
+
+
+def generate_schedule(rng, loader, args, first_day, shifts, studios, pt_rooms, admins, activity):
+    """
+    Classes, registrations and PT sessions hour by hour. Every trainer hour is
+    inside their shift and used at most once, rooms come from a per-hour pool
+    and members book at most one PT session per hour, so nothing overlaps.
+    """
+    pick_members = weighted_picker(rng, activity)
+    class_id = session_id = 0
+    now = datetime.combine(args.end_date, time())
+    last_day = args.end_date + timedelta(weeks=args.future_weeks)
+
+    day = first_day
+    while day < last_day:
+        weekday = day.weekday()
+        working = [(tid, s, e) for tid, (s, e, days) in shifts.items() if weekday in days]
+        weekend = 0.8 if weekday >= 5 else 1.0
+        for hour in sorted(HOUR_DEMAND):
+            free_studios = rng.sample(sorted(studios), len(studios))
+            free_pt_rooms = rng.sample(pt_rooms, len(pt_rooms))
+            members_booked = set()
+            demand = HOUR_DEMAND[hour] * weekend
+            start = datetime.combine(day, time(hour))
+            for trainer_id, shift_start, shift_end in working:
+                if not shift_start <= hour < shift_end:
+                    continue
+                roll = rng.random()
+                if roll < args.class_rate * demand and free_studios:
+                    room_id = free_studios.pop()
+                    title, description, duration, size = rng.choice(CLASS_TYPES)
+                    class_id += 1
+                    capacity = min(size, studios[room_id])
+                    end = start + timedelta(minutes=duration)
+                    loader.add("group_classes", (class_id, title, description, start, duration, capacity,
+                                                 trainer_id, room_id, rng.randint(1, admins)))
+                    loader.add("resource_bookings", ("room", room_id, tsrange(start, end), None, class_id))
+                    loader.add("resource_bookings", ("trainer", trainer_id, tsrange(start, end), None, class_id))
+                    fill = min(1.0, rng.betavariate(2, 2) * demand)
+                    enrolled = set(pick_members(math.ceil(capacity * fill)))
+                    for member_id in sorted(enrolled)[:capacity]:
+                        if start < now:
+                            status = "Attended" if rng.random() < 0.85 else "Cancelled"
+                        else:
+                            status = "Registered"
+                        loader.add("class_registrations", (member_id, class_id,
+                                                           start - timedelta(hours=rng.randrange(2, 336)), status))
+                elif roll < (args.class_rate + args.pt_rate) * demand and (free_pt_rooms or free_studios):
+                    member_id = pick_members(1)[0]
+                    if member_id in members_booked:
+                        continue
+                    members_booked.add(member_id)
+                    room_id = (free_pt_rooms or free_studios).pop()
+                    session_id += 1
+                    end = start + timedelta(minutes=rng.choice([30, 45, 60, 60]))
+                    if start < now:
+                        status = "Completed" if rng.random() < 0.9 else "Cancelled"
+                    else:
+                        status = "Scheduled"
+                    loader.add("pt_sessions", (session_id, day, start.time(), end.time(), status,
+                                               member_id, trainer_id, room_id))
+                    loader.add("resource_bookings", ("room", room_id, tsrange(start, end), session_id, None))
+                    loader.add("resource_bookings", ("trainer", trainer_id, tsrange(start, end), session_id, None))
+        day += timedelta(days=1)
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    first_day = args.end_date - timedelta(days=round(args.months * 30.44))
+    started = timer.perf_counter()
+
+    reset_database()
+    with engine.connect() as conn:
+        ensure_health_metric_partitions(conn, first_day, args.end_date)
+        for table in BULK_REBUILT_TRIGGERS + QUIET_TRIGGERS:
+            conn.execute(text(f"ALTER TABLE {table} DISABLE TRIGGER USER"))
+        conn.commit()
+
+        loader = BatchLoader(conn, args.batch_size)
+        print("Generating staff and rooms...")
+        shifts, studios, pt_rooms, admins = generate_staff(rng, loader, args)
+        print("Generating members, goals and health metrics...")
+        activity = generate_members(rng, loader, args, first_day)
+        print("Generating classes, registrations and PT sessions...")
+        generate_schedule(rng, loader, args, first_day, shifts, studios, pt_rooms, admins, activity)
+        loader.flush()
+
+        for table, column in EXPLICIT_IDS:
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                              f"COALESCE((SELECT MAX({column}) FROM {table}), 0) + 1, false)"))
+        for table in BULK_REBUILT_TRIGGERS + QUIET_TRIGGERS:
+            conn.execute(text(f"ALTER TABLE {table} ENABLE TRIGGER USER"))
+        notify_all_caches(conn)
+        conn.commit()
+
+    print("Rebuilding counters and rollups...")
+    recount_enrollment()
+    rebuild_member_stats()
+    rebuild_metric_rollups()
+    refresh_pt_slots()
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+
+    elapsed = timer.perf_counter() - started
+    total = sum(loader.loaded.values())
+    print("\n" + "=" * 50)
+    print(f"Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s), seed {args.seed}")
+    print("=" * 50)
+    for table, count in loader.loaded.items():
+        print(f"   • {table}: {count:,}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--trainers", type=int, default=50)
+    parser.add_argument("--rooms", type=int, help="Default: a quarter of the trainers, at least 4")
+    parser.add_argument("--months", type=int, default=12, help="History to generate, ending at --end-date")
+    parser.add_argument("--future-weeks", type=int, default=4, help="Bookings to generate after --end-date")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--metrics-per-month", type=float, default=2.0, help="Average readings per member")
+    parser.add_argument("--class-rate", type=float, default=0.12, help="Share of trainer hours spent teaching")
+    parser.add_argument("--pt-rate", type=float, default=0.3, help="Share of trainer hours with a PT session")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    return parser
+
+
+def main():
+    generate(build_parser().parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Maintenance commands for the fitness club database.
+
+Usage (from project-root):
+    python3 manage.py migrate
+    python3 manage.py backfill-bookings
+    python3 manage.py recount-enrollment
+    python3 manage.py rebuild-member-stats
+    python3 manage.py ingest-metrics readings.csv [--format ndjson] [--batch-size 50000]
+    python3 manage.py rebuild-metric-rollups
+    python3 manage.py metric-trends Weight [--grain week] [--window 7] [--member 1]
+    python3 manage.py refresh-pt-slots [--days 28]
+"""
+import argparse
+import sys
+import time
+from tabulate import tabulate
+from models.database import (
+    migrate, backfill_resource_bookings, recount_enrollment, rebuild_member_stats, rebuild_metric_rollups,
+    refresh_pt_slots, PT_SLOT_HORIZON_DAYS
+)
+from app.ingest import ingest_health_metrics
+from app.trends import compute_metric_trends
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitness club database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Create missing tables, install the triggers and stamp the schema version")
+    commands.add_parser("backfill-bookings", help="Rebuild the resource_bookings ledger from PT sessions and classes")
+    commands.add_parser("recount-enrollment", help="Repair group_classes.enrolled_count from class registrations")
+    commands.add_parser("rebuild-member-stats", help="Rebuild the member_stats dashboard counters from scratch")
+    ingest = commands.add_parser("ingest-metrics", help="Bulk-load health readings from a CSV or NDJSON file")
+    ingest.add_argument("path")
+    ingest.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    ingest.add_argument("--batch-size", type=int, default=50_000)
+    commands.add_parser("rebuild-metric-rollups", help="Rebuild the daily/weekly health metric rollups from scratch")
+    trends = commands.add_parser("metric-trends", help="Slope, moving average and goal progress per member")
+    trends.add_argument("type", help="Metric type, e.g. Weight")
+    trends.add_argument("--grain", choices=["day", "week"], default="day")
+    trends.add_argument("--window", type=int, default=7, help="Buckets in the moving average")
+    trends.add_argument("--member", type=int, action="append", help="Limit to these member ids")
+    slots = commands.add_parser("refresh-pt-slots", help="Roll the bookable PT slot inventory forward (run nightly)")
+    slots.add_argument("--days", type=int, default=PT_SLOT_HORIZON_DAYS, help="Horizon in days from today")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        if not migrate():
+            sys.exit(1)
+    elif args.command == "backfill-bookings":
+        backfill_resource_bookings()
+    elif args.command == "recount-enrollment":
+        recount_enrollment()
+    elif args.command == "rebuild-member-stats":
+        rebuild_member_stats()
+    elif args.command == "ingest-metrics":
+        fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+        started = time.perf_counter()
+        with open(args.path, newline="") as stream:
+            rows_read, rows_inserted = ingest_health_metrics(stream, fmt, args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"[SUCCESS] {rows_inserted} of {rows_read} readings ingested in {elapsed:.1f}s "
+              f"({rows_read / elapsed if elapsed else 0:,.0f} rows/s).")
+        if rows_inserted < rows_read:
+            print(f"   {rows_read - rows_inserted} skipped (duplicates or unknown members).")
+    elif args.command == "rebuild-metric-rollups":
+        rebuild_metric_rollups()
+    elif args.command == "metric-trends":
+        results = compute_metric_trends(args.type, args.member, args.grain, window=args.window)
+        if results is None:
+            return
+        if not results:
+            print(f"[ERROR] No '{args.type}' readings found.")
+            return
+        print(tabulate(results, headers="keys", tablefmt="grid", missingval="-"))
+    elif args.command == "refresh-pt-slots":
+        refresh_pt_slots(args.days)
+
+
+if __name__ == "__main__":
+    main()
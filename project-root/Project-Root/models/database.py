@@ -1,7 +1,19 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, text, event, DDL
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.schema import CreateIndex, CreateTable
 from dotenv import load_dotenv
+from models.instrumentation import instrument_from_env
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
+import functools
+import hashlib
+import json
 import os
+import select
+import threading
 
  # Loads the .env file and assigns environment variables
 load_dotenv() 
@@ -9,72 +21,862 @@ database_url = os.getenv("DATABASE_URL")
 
 
 
-engine = create_engine(database_url)
+# Pool sizing for many short CLI/kiosk processes sharing one server; recycle
+# retires old connections. Pre-ping (opt-in) replaces connections the server
+# dropped while idle, at the cost of one extra round trip per checkout
+engine = create_engine(
+    database_url,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "0").lower() not in ("0", "false", "no"),
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+)
+# Opt-in per-operation statement counts, DB time and N+1 detection (SQL_PROFILE=1 or =path.json)
+sql_profile = instrument_from_env(engine)
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
+# The PT session and booking ledger exclusion constraints mix "=" on integer ids with "&&" on
+# time ranges in one GiST index, which needs the btree_gist extension
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+
+class SharedSession(Session):
+    """
+    Session of a unit_of_work. Every transaction runs on one connection,
+    checked out from its engine on first use, so a pool timeout or an outage
+    surfaces inside the caller's own error handling. The code sharing it calls
+    close() as usual when it is done; in the outermost logic call that only
+    ends the current transaction, in a nested one it does nothing (the caller
+    may have changes it has not committed yet), and the unit closes the
+    session (and returns the connection) when it exits.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shared_connection = None
+        self.logic_calls = 0    # in_unit_of_work calls running on this session
+
+    def get_bind(self, *args, **kwargs):
+        if self.shared_connection is None:
+            self.shared_connection = super().get_bind(*args, **kwargs).connect()
+        return self.shared_connection
+
+    def close(self):
+        if self.logic_calls <= 1 and self.in_transaction():
+            self.rollback()
+
+    def release(self):
+        super().close()
+        if self.shared_connection is not None:
+            self.shared_connection.close()
+            self.shared_connection = None
+
+SharedSessionLocal = sessionmaker(class_=SharedSession)
+
+# Session of the unit of work active in this thread / task, if any
+active_session = ContextVar("active_session", default=None)
+
 def get_session():
-    return SessionLocal()
+    """The active unit of work's session, or a new session of its own."""
+    return active_session.get() or SessionLocal()
+
+@contextmanager
+def unit_of_work(session=None):
+    """
+    Shares one session, bound to one pooled connection, with every
+    get_session() call inside the block, so a whole interaction or batch
+    checks out a single connection however many logic calls and commits it
+    makes. A unit already active is reused; a session passed in by the
+    caller becomes the active one and is left open for the caller.
+    """
+    if session is None:
+        session = active_session.get()
+    if session is not None:
+        token = active_session.set(session)
+        try:
+            yield session
+        finally:
+            active_session.reset(token)
+        return
+
+    # Same engine as SessionLocal, so SessionLocal.configure(bind=...) applies to units too
+    session = SharedSessionLocal(bind=SessionLocal.kw["bind"])
+    token = active_session.set(session)
+    try:
+        yield session
+    finally:
+        active_session.reset(token)
+        session.release()
+
+def in_unit_of_work(func):
+    """Runs each call of func inside unit_of_work()."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with unit_of_work() as session:
+            if not isinstance(session, SharedSession):
+                return func(*args, **kwargs)
+            session.logic_calls += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                session.logic_calls -= 1
+    return wrapper
+
+# SQL features installed by my_helper_sql_features, in order (see the comments there)
+SUPERSEDED_OVERLAP_CHECKS_SQL = text("""
+    ALTER TABLE pt_sessions DROP CONSTRAINT IF EXISTS excl_pt_room_overlap;
+    ALTER TABLE pt_sessions DROP CONSTRAINT IF EXISTS excl_pt_trainer_overlap;
+    DROP INDEX IF EXISTS idx_room_date_time;
+    DROP INDEX IF EXISTS idx_class_room_time_range;
+""")
+
+MEMBER_STATS_TRIGGERS_SQL = text("""
+    DROP VIEW IF EXISTS v_member_dashboard_stats;
+
+    CREATE OR REPLACE FUNCTION apply_member_stats_delta(
+        p_member_id INTEGER, d_total INTEGER, d_attended INTEGER,
+        d_upcoming INTEGER, d_pt INTEGER)
+    RETURNS VOID AS $$
+    BEGIN
+        IF p_member_id IS NULL THEN
+            RETURN;
+        END IF;
+
+        INSERT INTO member_stats (member_id, total_classes, attended_classes, upcoming_classes, pt_sessions)
+        VALUES (p_member_id, d_total, d_attended, d_upcoming, d_pt)
+        ON CONFLICT (member_id) DO UPDATE SET
+            total_classes = member_stats.total_classes + EXCLUDED.total_classes,
+            attended_classes = member_stats.attended_classes + EXCLUDED.attended_classes,
+            upcoming_classes = member_stats.upcoming_classes + EXCLUDED.upcoming_classes,
+            pt_sessions = member_stats.pt_sessions + EXCLUDED.pt_sessions;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION track_member_class_stats()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM apply_member_stats_delta(OLD.member_id,
+                -(CASE WHEN OLD.status IS DISTINCT FROM 'Cancelled' THEN 1 ELSE 0 END),
+                -(CASE WHEN OLD.status = 'Attended' THEN 1 ELSE 0 END),
+                -(CASE WHEN OLD.status = 'Registered' THEN 1 ELSE 0 END),
+                0);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM apply_member_stats_delta(NEW.member_id,
+                CASE WHEN NEW.status IS DISTINCT FROM 'Cancelled' THEN 1 ELSE 0 END,
+                CASE WHEN NEW.status = 'Attended' THEN 1 ELSE 0 END,
+                CASE WHEN NEW.status = 'Registered' THEN 1 ELSE 0 END,
+                0);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION track_member_pt_stats()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM apply_member_stats_delta(OLD.member_id, 0, 0, 0,
+                -(CASE WHEN OLD.status IS DISTINCT FROM 'Cancelled' THEN 1 ELSE 0 END));
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM apply_member_stats_delta(NEW.member_id, 0, 0, 0,
+                CASE WHEN NEW.status IS DISTINCT FROM 'Cancelled' THEN 1 ELSE 0 END);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_member_class_stats ON class_registrations;
+
+    CREATE TRIGGER trg_member_class_stats
+    AFTER INSERT OR DELETE OR UPDATE OF status, member_id ON class_registrations
+    FOR EACH ROW
+    EXECUTE FUNCTION track_member_class_stats();
+
+    DROP TRIGGER IF EXISTS trg_member_pt_stats ON pt_sessions;
+
+    CREATE TRIGGER trg_member_pt_stats
+    AFTER INSERT OR DELETE OR UPDATE OF status, member_id ON pt_sessions
+    FOR EACH ROW
+    EXECUTE FUNCTION track_member_pt_stats();
+""")
+
+RESERVE_SEAT_FUNCTION_SQL = text("""
+    CREATE OR REPLACE FUNCTION reserve_class_seat()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE group_classes
+        SET enrolled_count = enrolled_count + 1
+        WHERE class_id = NEW.class_id
+          AND enrolled_count < capacity;
+
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Class capacity exceeded for this class.';
+        END IF;
+        
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+""")
+
+RELEASE_SEAT_FUNCTION_SQL = text("""
+    CREATE OR REPLACE FUNCTION release_class_seat()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE group_classes
+        SET enrolled_count = enrolled_count - 1
+        WHERE class_id = OLD.class_id;
+        
+        RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+""")
+
+CAPACITY_TRIGGERS_SQL = text("""
+    DROP TRIGGER IF EXISTS trg_check_capacity ON class_registrations;
+    DROP FUNCTION IF EXISTS check_room_capacity();
+    
+    CREATE TRIGGER trg_check_capacity
+    BEFORE INSERT ON class_registrations
+    FOR EACH ROW
+    EXECUTE FUNCTION reserve_class_seat();
+
+    DROP TRIGGER IF EXISTS trg_release_seat ON class_registrations;
+
+    CREATE TRIGGER trg_release_seat
+    AFTER DELETE ON class_registrations
+    FOR EACH ROW
+    EXECUTE FUNCTION release_class_seat();
+""")
+
+DEFAULT_METRIC_PARTITION_SQL = text("""
+    CREATE TABLE IF NOT EXISTS health_metrics_default
+    PARTITION OF health_metrics DEFAULT;
+""")
+
+METRIC_ROLLUP_TRIGGERS_SQL = text("""
+    CREATE OR REPLACE FUNCTION rollup_new_metrics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO metric_rollups (member_id, type, grain, bucket, min_value, max_value,
+                                    sum_value, count, last_value, last_recorded)
+        SELECT n.member_id, n.type, g.grain,
+               CASE g.grain WHEN 'day' THEN n.date_recorded::date
+                            ELSE date_trunc('week', n.date_recorded)::date END,
+               MIN(n.value), MAX(n.value), SUM(n.value), COUNT(*),
+               (array_agg(n.value ORDER BY n.date_recorded DESC))[1], MAX(n.date_recorded)
+        FROM new_metrics n
+        CROSS JOIN (VALUES ('day'), ('week')) AS g(grain)
+        WHERE n.member_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (member_id, type, grain, bucket) DO UPDATE SET
+            min_value = LEAST(metric_rollups.min_value, EXCLUDED.min_value),
+            max_value = GREATEST(metric_rollups.max_value, EXCLUDED.max_value),
+            sum_value = metric_rollups.sum_value + EXCLUDED.sum_value,
+            count = metric_rollups.count + EXCLUDED.count,
+            last_value = CASE WHEN EXCLUDED.last_recorded >= metric_rollups.last_recorded
+                              THEN EXCLUDED.last_value ELSE metric_rollups.last_value END,
+            last_recorded = GREATEST(metric_rollups.last_recorded, EXCLUDED.last_recorded);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_deleted_metrics()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        DELETE FROM metric_rollups r
+        USING old_metrics o
+        WHERE r.member_id = o.member_id AND r.type = o.type
+          AND r.bucket = CASE r.grain WHEN 'day' THEN o.date_recorded::date
+                                      ELSE date_trunc('week', o.date_recorded)::date END;
+
+        INSERT INTO metric_rollups (member_id, type, grain, bucket, min_value, max_value,
+                                    sum_value, count, last_value, last_recorded)
+        SELECT t.member_id, t.type, t.grain, t.bucket,
+               MIN(h.value), MAX(h.value), SUM(h.value), COUNT(*),
+               (array_agg(h.value ORDER BY h.date_recorded DESC))[1], MAX(h.date_recorded)
+        FROM (
+            SELECT DISTINCT o.member_id, o.type, g.grain,
+                   CASE g.grain WHEN 'day' THEN o.date_recorded::date
+                                ELSE date_trunc('week', o.date_recorded)::date END AS bucket
+            FROM old_metrics o
+            CROSS JOIN (VALUES ('day'), ('week')) AS g(grain)
+        ) t
+        JOIN health_metrics h
+          ON h.member_id = t.member_id AND h.type = t.type
+         AND h.date_recorded >= t.bucket
+         AND h.date_recorded < t.bucket + CASE t.grain WHEN 'day' THEN 1 ELSE 7 END
+        GROUP BY 1, 2, 3, 4;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_metric_rollups_insert ON health_metrics;
+    CREATE TRIGGER trg_metric_rollups_insert
+    AFTER INSERT ON health_metrics
+    REFERENCING NEW TABLE AS new_metrics
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_new_metrics();
+
+    DROP TRIGGER IF EXISTS trg_metric_rollups_delete ON health_metrics;
+    CREATE TRIGGER trg_metric_rollups_delete
+    AFTER DELETE ON health_metrics
+    REFERENCING OLD TABLE AS old_metrics
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_deleted_metrics();
+""")
+
+# Cache invalidation: every committed change to these tables is announced on
+# CACHE_CHANNEL with the listed columns of the old and/or new row, e.g.
+# {"table": "resource_bookings", "row": "new", "booking_id": 7, "resource_type": "room",
+#  "resource_id": 4, "time_range": "[...)"}; a TRUNCATE sends just {"table": ...}.
+# Identical payloads in one transaction are delivered once (the primary keys keep
+# a row deleted and inserted again in one transaction apart). Only tables an
+# in-process cache holds are listed (reference_cache.py, availability_index.py):
+# each NOTIFY takes a queue lock at commit, which serialises notifying commits.
+CACHE_CHANNEL = "cache_invalidation"
+CACHE_NOTIFY_TABLES = {
+    "rooms": ["room_id"],
+    "trainers": ["trainer_id"],
+    "members": ["member_id"],
+    "availabilities": ["availability_id", "trainer_id", "start_time", "end_time", "is_recurring", "day_of_week", "specific_date"],
+    "resource_bookings": ["booking_id", "resource_type", "resource_id", "time_range"],
+}
+
+# Tables that had notify triggers before and no longer have a listener
+RETIRED_NOTIFY_TABLES = ["group_classes", "class_registrations", "pt_sessions"]
+
+CACHE_NOTIFY_TRIGGERS_SQL = text(f"""
+    CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        payload JSONB;
+        rec JSONB;
+        side TEXT;
+        i INTEGER;
+    BEGIN
+        IF TG_LEVEL = 'STATEMENT' THEN
+            PERFORM pg_notify('{CACHE_CHANNEL}', jsonb_build_object('table', TG_TABLE_NAME)::text);
+            RETURN NULL;
+        END IF;
+        FOREACH side IN ARRAY ARRAY['old', 'new'] LOOP
+            rec := CASE side WHEN 'old' THEN to_jsonb(OLD) ELSE to_jsonb(NEW) END;
+            CONTINUE WHEN rec IS NULL;
+            payload := jsonb_build_object('table', TG_TABLE_NAME, 'row', side);
+            FOR i IN 0 .. TG_NARGS - 1 LOOP
+                payload := payload || jsonb_build_object(TG_ARGV[i], rec -> TG_ARGV[i]);
+            END LOOP;
+            PERFORM pg_notify('{CACHE_CHANNEL}', payload::text);
+        END LOOP;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""" + "".join(f"""
+    DROP TRIGGER IF EXISTS trg_notify_{table} ON {table};
+    CREATE TRIGGER trg_notify_{table}
+    AFTER INSERT OR UPDATE OR DELETE ON {table}
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_invalidation({", ".join(f"'{c}'" for c in columns)});
+
+    DROP TRIGGER IF EXISTS trg_notify_{table}_truncate ON {table};
+    CREATE TRIGGER trg_notify_{table}_truncate
+    AFTER TRUNCATE ON {table}
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_cache_invalidation();
+""" for table, columns in CACHE_NOTIFY_TABLES.items()) + "".join(f"""
+    DROP TRIGGER IF EXISTS trg_notify_{table} ON {table};
+    DROP TRIGGER IF EXISTS trg_notify_{table}_truncate ON {table};
+""" for table in RETIRED_NOTIFY_TABLES))
+
+# Everything my_helper_sql_features runs; part of the schema checksum
+SQL_FEATURES = [
+    SUPERSEDED_OVERLAP_CHECKS_SQL, MEMBER_STATS_TRIGGERS_SQL, RESERVE_SEAT_FUNCTION_SQL, RELEASE_SEAT_FUNCTION_SQL,
+    CAPACITY_TRIGGERS_SQL, DEFAULT_METRIC_PARTITION_SQL, METRIC_ROLLUP_TRIGGERS_SQL,
+    CACHE_NOTIFY_TRIGGERS_SQL,
+]
 
 # Create SQL Objects 
 def my_helper_sql_features():
     """
-    Creates the required View and Trigger using raw SQL.
+    Creates the required Triggers (member stats, class capacity, metric rollups,
+    cache notifications) and the health_metrics partitions using raw SQL.
     Must be run AFTER Base.metadata.create_all(engine).
     """
     with engine.connect() as conn:
-        # 1. CREATE VIEW: Member Dashboard Stats
-        # Aggregates class counts for the dashboard requirement 
-        conn.execute(text("""
-            CREATE OR REPLACE VIEW v_member_dashboard_stats AS
-            SELECT 
-                m.member_id,
-                m.first_name,
-                m.last_name,
-                COUNT(cr.registration_id) as total_classes_attended
-            FROM members m
-            LEFT JOIN class_registrations cr ON m.member_id = cr.member_id
-            GROUP BY m.member_id;
-        """))
-
-        # 2. CREATE TRIGGER FUNCTION: Enforce Room Capacity
-        # "ensuring that room capacities are not exceeded" 
-        conn.execute(text("""
-            CREATE OR REPLACE FUNCTION check_room_capacity()
-            RETURNS TRIGGER AS $$
-            DECLARE
-                current_count INTEGER;
-                max_capacity INTEGER;
-            BEGIN
-                -- Get the room capacity
-                SELECT capacity INTO max_capacity 
-                FROM rooms 
-                WHERE room_id = (SELECT room_id FROM group_classes WHERE class_id = NEW.class_id);
-
-                -- Get current registrations for this class
-                SELECT COUNT(*) INTO current_count 
-                FROM class_registrations 
-                WHERE class_id = NEW.class_id;
-
-                IF current_count >= max_capacity THEN
-                    RAISE EXCEPTION 'Room capacity exceeded for this class.';
-                END IF;
-                
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql;
-        """))
-
-        # 3. CREATE TRIGGER: Bind function to table
-        # Checks before a member registers for a class
-        conn.execute(text("""
-            DROP TRIGGER IF EXISTS trg_check_capacity ON class_registrations;
-            
-            CREATE TRIGGER trg_check_capacity
-            BEFORE INSERT ON class_registrations
-            FOR EACH ROW
-            EXECUTE FUNCTION check_room_capacity();
-        """))
+        # 0. SUPERSEDED OVERLAP CHECKS
+        # The resource_bookings ledger rejects room and trainer overlaps for PT sessions
+        # and classes alike; the older per-table GiST indexes only slowed inserts down
+        conn.execute(SUPERSEDED_OVERLAP_CHECKS_SQL)
+
+        # 1. MEMBER STATS TRIGGERS: Member Dashboard Stats
+        # member_stats replaces the v_member_dashboard_stats view; every change to
+        # class_registrations or pt_sessions applies a +/- delta to the member's row
+        conn.execute(MEMBER_STATS_TRIGGERS_SQL)
+
+        # 2. CREATE TRIGGER FUNCTIONS: Enforce Class Capacity
+        # "ensuring that room capacities are not exceeded" - class capacity is
+        # already capped at the room's capacity by create_group_class.
+        # group_classes.enrolled_count is a counter cache: taking a seat is one
+        # conditional UPDATE, whose row lock serialises concurrent registrations
+        conn.execute(RESERVE_SEAT_FUNCTION_SQL)
+
+        conn.execute(RELEASE_SEAT_FUNCTION_SQL)
+
+        # 3. CREATE TRIGGERS: Bind functions to table
+        # Takes a seat before a member registers, gives it back on delete
+        conn.execute(CAPACITY_TRIGGERS_SQL)
         
+        # 4. HEALTH METRIC PARTITIONS
+        # A DEFAULT partition catches readings outside the monthly partitions
+        conn.execute(DEFAULT_METRIC_PARTITION_SQL)
+        today = date.today()
+        ensure_health_metric_partitions(
+            conn,
+            date(today.year - 2, today.month, 1),
+            date(today.year + 1, today.month, 1)
+        )
+
+        # 5. HEALTH METRIC ROLLUPS
+        # Statement-level triggers see the whole batch as a transition table, so a bulk
+        # ingest folds into metric_rollups with one upsert instead of one per reading.
+        # Deletes are rare, so the touched buckets are simply recomputed from raw rows.
+        conn.execute(METRIC_ROLLUP_TRIGGERS_SQL)
+
+        # 6. CACHE INVALIDATION NOTIFICATIONS
+        # Other processes' caches drop the rows that changed (see InvalidationListener)
+        conn.execute(CACHE_NOTIFY_TRIGGERS_SQL)
+
         conn.commit()
-        print("[SUCCESS] SQL View and Trigger created successfully.")
\ No newline at end of file
+        print("[SUCCESS] SQL Triggers created successfully.")
+
+def schema_checksum():
+    """
+    SHA-256 over the PostgreSQL DDL of every ORM table and index plus the SQL
+    features. Any model or trigger change gives a new checksum.
+    """
+    import models.schema  # registers every table on Base.metadata
+    dialect = postgresql.dialect()
+    digest = hashlib.sha256()
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    for statement in SQL_FEATURES:
+        digest.update(statement.text.encode())
+    return digest.hexdigest()
+
+def schema_is_current():
+    """
+    True if the latest schema_version row matches schema_checksum(). One
+    query; a database that was never migrated counts as out of date.
+    """
+    try:
+        with engine.connect() as conn:
+            applied = conn.execute(text(
+                "SELECT checksum FROM schema_version ORDER BY version_id DESC LIMIT 1")).scalar()
+    except ProgrammingError:
+        return False
+    return applied == schema_checksum()
+
+def stamp_schema_version(conn):
+    """Records the current checksum on the given connection; the caller commits."""
+    conn.execute(text("INSERT INTO schema_version (checksum, applied_at) VALUES (:checksum, now())"),
+                 {"checksum": schema_checksum()})
+
+# Live column names per table
+LIVE_COLUMNS_SQL = text("""
+    SELECT table_name, array_agg(column_name::text)
+    FROM information_schema.columns
+    WHERE table_schema = 'public'
+    GROUP BY table_name
+""")
+
+def column_differences(conn):
+    """
+    {table: (missing columns, extra columns)} for every model table whose live
+    columns differ from the model; a table that does not exist lacks them all.
+    """
+    import models.schema  # registers every table on Base.metadata
+    live = {name: set(columns) for name, columns in conn.execute(LIVE_COLUMNS_SQL)}
+    differences = {}
+    for table in Base.metadata.sorted_tables:
+        expected, actual = set(table.columns.keys()), live.get(table.name, set())
+        if expected != actual:
+            differences[table.name] = (sorted(expected - actual), sorted(actual - expected))
+    return differences
+
+def migrate():
+    """
+    Applies the schema: creates missing tables, re-installs the SQL features
+    (which also rolls the health_metrics partitions forward) and stamps
+    schema_version. Safe to re-run. Existing tables are not altered, so when
+    their columns differ from the models nothing is stamped and False is returned.
+    """
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        differences = column_differences(conn)
+    if differences:
+        print("[ERROR] Existing tables differ from the models; migrate does not alter tables:")
+        for table, (missing, extra) in differences.items():
+            if missing:
+                print(f"   {table}: missing {', '.join(missing)}")
+            if extra:
+                print(f"   {table}: no longer in the model: {', '.join(extra)}")
+        print("   Rebuild the database with: python3 seed_data.py --full")
+        return False
+    my_helper_sql_features()
+    with engine.connect() as conn:
+        stamp_schema_version(conn)
+        notify_all_caches(conn)
+        conn.commit()
+    print("[SUCCESS] Schema migrated and stamped.")
+    return True
+
+def notify_all_caches(conn):
+    """Tells every listening process to drop all cached entries; sent when the caller commits."""
+    conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                 {"channel": CACHE_CHANNEL, "payload": json.dumps({"table": "*"})})
+
+
+class InvalidationListener:
+    """
+    LISTENs on CACHE_CHANNEL in a daemon thread over its own connection (taken
+    out of the pool) and passes each payload, decoded to a dict, to every
+    subscriber. Notifications sent while the listener was not connected are
+    lost, so subscribers get {"table": "*"} (drop everything) on every
+    (re)connect. `connected` is True only while it is listening; subscribers
+    check it before relying on notifications instead of their short TTL.
+    """
+    def __init__(self, channel=CACHE_CHANNEL, reconnect_delay=5.0):
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.subscribers = []
+        self.thread = None
+        self.connected = False
+        self._stop = threading.Event()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _dispatch(self, payload):
+        for callback in self.subscribers:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"[ERROR] Cache invalidation handler failed: {e}")
+
+    def _receive(self, text_payload):
+        try:
+            payload = json.loads(text_payload)
+        except ValueError:
+            # Nothing tells which entries it was about
+            print(f"[ERROR] Malformed cache invalidation payload: {text_payload!r}")
+            payload = {"table": "*"}
+        self._dispatch(payload)
+
+    def _run(self):
+        last_error = None
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = engine.raw_connection()
+                conn.detach()
+                dbapi = conn.driver_connection
+                dbapi.autocommit = True
+                dbapi.cursor().execute(f"LISTEN {self.channel}")
+                self.connected = True
+                if last_error is not None:
+                    print("[SUCCESS] Cache invalidation listener reconnected.")
+                    last_error = None
+                self._dispatch({"table": "*"})
+                while not self._stop.is_set():
+                    if select.select([dbapi], [], [], 1.0)[0]:
+                        dbapi.poll()
+                        while dbapi.notifies:
+                            self._receive(dbapi.notifies.pop(0).payload)
+            except Exception as e:
+                self.connected = False
+                # Reported once per distinct failure, not on every retry
+                if repr(e) != last_error:
+                    print(f"[ERROR] Cache invalidation listener failed, caches fall back to their "
+                          f"short TTL and it retries every {self.reconnect_delay:g}s: {e!r}")
+                    last_error = repr(e)
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    conn.close()
+
+cache_listener = None
+
+def cache_listener_connected():
+    """True while the process-wide InvalidationListener is LISTENing."""
+    return cache_listener is not None and cache_listener.connected
+
+def start_cache_listener(*subscribers):
+    """
+    Subscribes the callbacks to the process-wide InvalidationListener and
+    starts it on first call, so no notification arrives before they are in.
+    """
+    global cache_listener
+    if cache_listener is None:
+        cache_listener = InvalidationListener()
+    for callback in subscribers:
+        cache_listener.subscribe(callback)
+    return cache_listener.start()
+
+def backfill_resource_bookings():
+    """
+    Rebuilds the resource_bookings ledger from pt_sessions and group_classes
+    in bulk. Claims that overlap an earlier one are skipped and counted.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("TRUNCATE resource_bookings RESTART IDENTITY"))
+        candidates = conn.execute(text("""
+            SELECT (SELECT COUNT(*) FROM pt_sessions) + (SELECT COUNT(*) FROM group_classes)
+        """)).scalar() * 2
+        # ON CONFLICT DO NOTHING also applies to exclusion constraints
+        inserted = conn.execute(text("""
+            INSERT INTO resource_bookings (resource_type, resource_id, time_range, session_id, class_id)
+            SELECT 'room', room_id, time_range, session_id, NULL::integer FROM pt_sessions WHERE room_id IS NOT NULL
+            UNION ALL
+            SELECT 'trainer', trainer_id, time_range, session_id, NULL::integer FROM pt_sessions WHERE trainer_id IS NOT NULL
+            UNION ALL
+            SELECT 'room', room_id, time_range, NULL::integer, class_id FROM group_classes WHERE room_id IS NOT NULL
+            UNION ALL
+            SELECT 'trainer', trainer_id, time_range, NULL::integer, class_id FROM group_classes WHERE trainer_id IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)).rowcount
+        conn.commit()
+        print(f"[SUCCESS] Booking ledger rebuilt: {inserted} claims inserted.")
+        if inserted < candidates:
+            print(f"   {candidates - inserted} claims skipped (missing room/trainer or overlapping an existing claim).")
+
+
+def recount_enrollment():
+    """
+    Repairs the group_classes.enrolled_count counter cache from
+    class_registrations in one statement.
+    """
+    with engine.connect() as conn:
+        updated = conn.execute(text("""
+            WITH counts AS (
+                SELECT g.class_id, COUNT(cr.registration_id) AS n
+                FROM group_classes g
+                LEFT JOIN class_registrations cr ON cr.class_id = g.class_id
+                GROUP BY g.class_id
+            )
+            UPDATE group_classes gc
+            SET enrolled_count = counts.n
+            FROM counts
+            WHERE gc.class_id = counts.class_id
+              AND gc.enrolled_count <> counts.n
+        """)).rowcount
+        conn.commit()
+        print(f"[SUCCESS] Enrollment counts recounted: {updated} classes corrected.")
+
+
+def rebuild_member_stats():
+    """
+    Full rebuild of member_stats from class_registrations and pt_sessions,
+    for repair. Runs in one transaction; the TRUNCATE lock makes concurrent
+    trigger updates wait and then apply on top of the rebuilt rows.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("TRUNCATE member_stats"))
+        rebuilt = conn.execute(text("""
+            INSERT INTO member_stats (member_id, total_classes, attended_classes, upcoming_classes, pt_sessions)
+            SELECT m.member_id,
+                   COALESCE(c.total, 0), COALESCE(c.attended, 0), COALESCE(c.upcoming, 0),
+                   COALESCE(p.sessions, 0)
+            FROM members m
+            LEFT JOIN (
+                SELECT member_id,
+                       COUNT(*) FILTER (WHERE status IS DISTINCT FROM 'Cancelled') AS total,
+                       COUNT(*) FILTER (WHERE status = 'Attended') AS attended,
+                       COUNT(*) FILTER (WHERE status = 'Registered') AS upcoming
+                FROM class_registrations
+                GROUP BY member_id
+            ) c ON c.member_id = m.member_id
+            LEFT JOIN (
+                SELECT member_id, COUNT(*) FILTER (WHERE status IS DISTINCT FROM 'Cancelled') AS sessions
+                FROM pt_sessions
+                GROUP BY member_id
+            ) p ON p.member_id = m.member_id
+            WHERE c.member_id IS NOT NULL OR p.member_id IS NOT NULL
+        """)).rowcount
+        conn.commit()
+        print(f"[SUCCESS] Member stats rebuilt for {rebuilt} members.")
+
+def rebuild_metric_rollups():
+    """
+    Recomputes metric_rollups from health_metrics in bulk, for repair after
+    the triggers were disabled or readings were updated in place.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("TRUNCATE metric_rollups"))
+        rebuilt = conn.execute(text("""
+            INSERT INTO metric_rollups (member_id, type, grain, bucket, min_value, max_value,
+                                        sum_value, count, last_value, last_recorded)
+            SELECT h.member_id, h.type, g.grain,
+                   CASE g.grain WHEN 'day' THEN h.date_recorded::date
+                                ELSE date_trunc('week', h.date_recorded)::date END,
+                   MIN(h.value), MAX(h.value), SUM(h.value), COUNT(*),
+                   (array_agg(h.value ORDER BY h.date_recorded DESC))[1], MAX(h.date_recorded)
+            FROM health_metrics h
+            CROSS JOIN (VALUES ('day'), ('week')) AS g(grain)
+            WHERE h.member_id IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        """)).rowcount
+        conn.commit()
+        print(f"[SUCCESS] Metric rollups rebuilt ({rebuilt} buckets).")
+
+
+# Slot length and rolling horizon of the pt_slots inventory
+PT_SLOT_MINUTES = 15
+PT_SLOT_HORIZON_DAYS = 28
+
+# Slots fully inside each availability window for every day of the horizon,
+# starting on the slot grid; slots that already exist are kept as they are
+INSERT_PT_SLOTS_SQL = text("""
+    INSERT INTO pt_slots (trainer_id, slot_start, availability_id)
+    SELECT a.trainer_id, s, a.availability_id
+    FROM generate_series(CAST(:first_day AS TIMESTAMP), CAST(:last_day AS TIMESTAMP), interval '1 day') AS d
+    JOIN availabilities a
+      ON (a.is_recurring AND a.day_of_week = (ARRAY['Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                                                    'Friday', 'Saturday', 'Sunday'])[extract(isodow FROM d)])
+      OR (NOT a.is_recurring AND a.specific_date = CAST(d AS DATE))
+    CROSS JOIN LATERAL generate_series(
+        d + :slot * ceil(extract(epoch FROM a.start_time) / extract(epoch FROM :slot)),
+        d + a.end_time - :slot, :slot) AS s
+    WHERE (CAST(:trainer_id AS INTEGER) IS NULL OR a.trainer_id = :trainer_id)
+    ON CONFLICT (trainer_id, slot_start) DO NOTHING
+""")
+
+# Free slots the trainer is already booked for through the ledger (bookings
+# made outside the inventory, classes) are marked with their session or class
+MARK_BOOKED_PT_SLOTS_SQL = text("""
+    UPDATE pt_slots s
+    SET session_id = b.session_id, class_id = b.class_id
+    FROM resource_bookings b
+    WHERE b.resource_type = 'trainer' AND b.resource_id = s.trainer_id
+      AND b.time_range && tsrange(s.slot_start, s.slot_start + :slot)
+      AND s.session_id IS NULL AND s.class_id IS NULL
+      AND s.slot_start >= :first_day
+      AND (CAST(:trainer_id AS INTEGER) IS NULL OR s.trainer_id = :trainer_id)
+""")
+
+# Free slots of one trainer overlapping new bookings, marked with the booking's
+# session or class in the same transaction. Slots another booking is claiming
+# right now are skipped rather than waited for (it marks them itself)
+MARK_NEW_BOOKINGS_PT_SLOTS_SQL = text("""
+    UPDATE pt_slots s
+    SET session_id = b.session_id, class_id = b.class_id
+    FROM unnest(CAST(:starts AS TIMESTAMP[]), CAST(:ends AS TIMESTAMP[]),
+                CAST(:session_ids AS INTEGER[]), CAST(:class_ids AS INTEGER[]))
+         AS b(booked_from, booked_until, session_id, class_id)
+    WHERE s.slot_id IN (
+              SELECT slot_id FROM pt_slots
+              WHERE trainer_id = :trainer_id AND session_id IS NULL AND class_id IS NULL
+                AND slot_start < :last_end AND slot_start + :slot > :first_start
+              FOR UPDATE SKIP LOCKED)
+      AND s.slot_start < b.booked_until AND s.slot_start + :slot > b.booked_from
+""")
+
+def mark_pt_slots_booked(conn, trainer_id, bookings):
+    """
+    Takes the trainer's free pt_slots overlapping each (start, end, session_id,
+    class_id) booking out of the inventory, on the given connection; the caller
+    commits. Returns the number of slots marked.
+    """
+    if not bookings or trainer_id is None:
+        return 0
+    starts, ends, session_ids, class_ids = (list(column) for column in zip(*bookings))
+    return conn.execute(MARK_NEW_BOOKINGS_PT_SLOTS_SQL, {
+        "trainer_id": trainer_id,
+        "starts": starts,
+        "ends": ends,
+        "session_ids": session_ids,
+        "class_ids": class_ids,
+        "first_start": min(starts),
+        "last_end": max(ends),
+        "slot": timedelta(minutes=PT_SLOT_MINUTES),
+    }).rowcount
+
+def materialize_pt_slots(conn, first_day, days=PT_SLOT_HORIZON_DAYS, trainer_id=None):
+    """
+    Expands availability into pt_slots for first_day and the days after it
+    (one trainer or all) on the given connection; the caller commits.
+    Returns (slots added, slots marked booked).
+    """
+    params = {
+        "first_day": first_day,
+        "last_day": first_day + timedelta(days=days - 1),
+        "slot": timedelta(minutes=PT_SLOT_MINUTES),
+        "trainer_id": trainer_id,
+    }
+    added = conn.execute(INSERT_PT_SLOTS_SQL, params).rowcount
+    marked = conn.execute(MARK_BOOKED_PT_SLOTS_SQL, params).rowcount
+    return added, marked
+
+def refresh_pt_slots(days=PT_SLOT_HORIZON_DAYS):
+    """
+    Nightly job for the PT slot inventory: drops slots from past days and
+    materialises the rolling horizon from today.
+    """
+    with engine.connect() as conn:
+        removed = conn.execute(text("DELETE FROM pt_slots WHERE slot_start < :today"),
+                               {"today": date.today()}).rowcount
+        added, marked = materialize_pt_slots(conn, date.today(), days)
+        conn.commit()
+        print(f"[SUCCESS] PT slot inventory refreshed for {days} days: "
+              f"{added} added, {marked} marked booked, {removed} past slots removed.")
+
+
+def next_month(day):
+    """First day of the month after the given date."""
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+def ensure_health_metric_partitions(conn, start, end):
+    """
+    Creates the monthly health_metrics partitions (health_metrics_YYYY_MM)
+    covering start..end on the given connection; the caller commits.
+    Readings that already landed in the DEFAULT partition for a new month
+    are moved into it before it is attached.
+    """
+    existing = set(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'health_metrics'::regclass
+    """)).scalars())
+
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        upper = next_month(month)
+        name = f"health_metrics_{month:%Y_%m}"
+        if name not in existing:
+            conn.execute(text(f"CREATE TABLE {name} (LIKE health_metrics INCLUDING DEFAULTS)"))
+            conn.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM health_metrics_default
+                    WHERE date_recorded >= :lower AND date_recorded < :upper
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """), {"lower": month, "upper": upper})
+            conn.execute(text(f"""
+                ALTER TABLE health_metrics ATTACH PARTITION {name}
+                FOR VALUES FROM ('{month}') TO ('{upper}')
+            """))
+        month = upper
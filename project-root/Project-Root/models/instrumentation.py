@@ -0,0 +1,199 @@
+"""
+SQL instrumentation - opt-in engine event hooks that record, per app/logic.py
+operation, how many statements ran, the total database time, the slowest
+statements and identical statements repeated within one call (N+1 loads).
+
+Statements are attributed to the outermost app.logic function on the stack, so
+helpers such as commit_booking count towards the operation that called them;
+anything else (menus in app.main, scripts) is grouped under OUTSIDE_LOGIC.
+Turned on for the whole process by the SQL_PROFILE environment variable
+(see instrument_from_env), or with SQLInstrumentation(engine).enable().
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time as timer
+from collections import Counter, defaultdict
+from sqlalchemy import event
+
+LOGIC_MODULE = "app.logic"
+OUTSIDE_LOGIC = "(outside app.logic)"
+# A thread's current call before its first statement and after report(); not
+# None, which is the frame recorded for statements outside app.logic
+NO_CALL = object()
+
+
+def one_line(statement, width=None):
+    """Statement text on one line, optionally cut to width characters."""
+    flat = " ".join(statement.split())
+    return flat if not width or len(flat) <= width else flat[:width - 3] + "..."
+
+
+class SQLInstrumentation:
+    """
+    Records statements sent through an engine. An identical statement text run
+    repeat_threshold times or more within a single operation call is reported
+    as a likely N+1 pattern; the `slowest` slowest statements are kept.
+    """
+    def __init__(self, engine, repeat_threshold=5, slowest=10):
+        self.engine = engine
+        self.repeat_threshold = repeat_threshold
+        self.slowest_kept = slowest
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self):
+        if not self.enabled:
+            event.listen(self.engine, "before_cursor_execute", self._before_execute)
+            event.listen(self.engine, "after_cursor_execute", self._after_execute)
+            event.listen(self.engine, "handle_error", self._on_error)
+            self.enabled = True
+        return self
+
+    def disable(self):
+        if self.enabled:
+            event.remove(self.engine, "before_cursor_execute", self._before_execute)
+            event.remove(self.engine, "after_cursor_execute", self._after_execute)
+            event.remove(self.engine, "handle_error", self._on_error)
+            self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.operations = defaultdict(lambda: {"calls": 0, "statements": 0, "db_ms": 0.0})
+            self.slowest = []
+            # (operation, statement) -> [calls where it repeated, most repeats in one call]
+            self.repeats = {}
+            self._local.__dict__.clear()
+
+    # Event hooks
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_instrumentation_start", []).append(timer.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = (timer.perf_counter() - conn.info["sql_instrumentation_start"].pop()) * 1000
+        operation, frame = self._caller()
+        local = self._thread_state()
+        with self._lock:
+            stats = self.operations[operation]
+            # A new outermost logic frame means a new call of the operation
+            if local.frame is not frame:
+                self._close_call()
+                local.frame, local.operation, local.seen = frame, operation, Counter()
+                stats["calls"] += 1
+            local.seen[statement] += 1
+            stats["statements"] += 1
+            stats["db_ms"] += elapsed
+            if len(self.slowest) < self.slowest_kept or elapsed > self.slowest[-1]["ms"]:
+                self.slowest.append({"operation": operation, "ms": round(elapsed, 3), "statement": statement})
+                self.slowest.sort(key=lambda s: s["ms"], reverse=True)
+                del self.slowest[self.slowest_kept:]
+
+    def _on_error(self, context):
+        # A failed statement (e.g. an exclusion violation) never reaches
+        # after_cursor_execute; record it here so its start time is popped
+        conn = context.connection
+        if conn is not None and conn.info.get("sql_instrumentation_start"):
+            self._after_execute(conn, context.cursor, context.statement, context.parameters,
+                                context.execution_context, False)
+
+    def _caller(self):
+        """(operation name, its frame) for the outermost app.logic function on the stack."""
+        found = (OUTSIDE_LOGIC, None)
+        frame = sys._getframe(2)
+        while frame is not None:
+            if frame.f_globals.get("__name__") == LOGIC_MODULE and frame.f_code.co_name != "<module>":
+                found = (frame.f_code.co_name, frame)
+            frame = frame.f_back
+        return found
+
+    def _thread_state(self):
+        """This thread's current call (frame, operation, statement counts), set up on first use."""
+        local = self._local
+        if not hasattr(local, "seen"):
+            local.frame, local.operation, local.seen = NO_CALL, None, Counter()
+        return local
+
+    def _close_call(self):
+        """Folds the statements repeated in the finished call into self.repeats."""
+        local = self._thread_state()
+        for statement, count in local.seen.items():
+            if count >= self.repeat_threshold:
+                entry = self.repeats.setdefault((local.operation, statement), [0, 0])
+                entry[0] += 1
+                entry[1] = max(entry[1], count)
+        local.seen = Counter()
+
+    # Results
+
+    def report(self):
+        """The recorded numbers as a JSON-ready dict."""
+        with self._lock:
+            self._close_call()
+            self._local.frame = NO_CALL
+            operations = {
+                name: {
+                    "calls": s["calls"],
+                    "statements": s["statements"],
+                    # A thread whose call began before reset() counts statements without a call
+                    "statements_per_call": round(s["statements"] / s["calls"], 2) if s["calls"] else None,
+                    "db_ms": round(s["db_ms"], 3),
+                    "db_ms_per_call": round(s["db_ms"] / s["calls"], 3) if s["calls"] else None,
+                }
+                for name, s in sorted(self.operations.items(), key=lambda item: -item[1]["db_ms"])
+            }
+            n_plus_one = [
+                {"operation": operation, "statement": statement, "calls": calls, "max_repeats": most}
+                for (operation, statement), (calls, most) in
+                sorted(self.repeats.items(), key=lambda item: -item[1][1])
+            ]
+            return {"operations": operations, "slowest": list(self.slowest), "n_plus_one": n_plus_one}
+
+    def print_summary(self, stream=None):
+        from tabulate import tabulate  # only needed at exit, keeps it out of engine start-up
+        stream = stream or sys.stdout
+        report = self.report()
+        if not report["operations"]:
+            print("\n[SQL PROFILE] No statements recorded.", file=stream)
+            return
+        print("\n[SQL PROFILE] Statements per operation", file=stream)
+        print(tabulate([[name, s["calls"], s["statements"], s["statements_per_call"], s["db_ms"], s["db_ms_per_call"]]
+                        for name, s in report["operations"].items()],
+                       headers=["Operation", "Calls", "Statements", "Per call", "DB ms", "DB ms/call"],
+                       tablefmt="grid"), file=stream)
+        print("\n[SQL PROFILE] Slowest statements", file=stream)
+        print(tabulate([[s["ms"], s["operation"], one_line(s["statement"], 80)] for s in report["slowest"]],
+                       headers=["ms", "Operation", "Statement"], tablefmt="grid"), file=stream)
+        if report["n_plus_one"]:
+            print(f"\n[SQL PROFILE] Possible N+1 loads (same statement {self.repeat_threshold}+ times in one call)",
+                  file=stream)
+            print(tabulate([[r["operation"], r["max_repeats"], r["calls"], one_line(r["statement"], 80)]
+                            for r in report["n_plus_one"]],
+                           headers=["Operation", "Max repeats", "Calls", "Statement"], tablefmt="grid"), file=stream)
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"[SQL PROFILE] Written to {path}")
+
+
+def instrument_from_env(engine):
+    """
+    Enables instrumentation when SQL_PROFILE is set: "1" prints the summary
+    when the process exits, a path ending in .json dumps the report there
+    instead. SQL_PROFILE_REPEATS overrides the N+1 threshold.
+    Returns the SQLInstrumentation, or None when profiling is off.
+    """
+    setting = os.getenv("SQL_PROFILE", "").strip()
+    if setting.lower() in ("", "0", "false", "no"):
+        return None
+    profile = SQLInstrumentation(engine, repeat_threshold=int(os.getenv("SQL_PROFILE_REPEATS", "5"))).enable()
+    if setting.lower().endswith(".json"):
+        atexit.register(profile.dump, setting)
+    else:
+        atexit.register(profile.print_summary)
+    return profile
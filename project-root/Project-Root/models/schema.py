@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Time, ForeignKey, Boolean, DateTime, Text, Index
+from sqlalchemy import Column, Integer, String, Float, Date, Time, ForeignKey, Boolean, DateTime, Text, Index, Computed, CheckConstraint, UniqueConstraint, desc
+from sqlalchemy.dialects.postgresql import TSRANGE, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base  
@@ -70,6 +71,11 @@ class GroupClass(Base):
     schedule_time = Column(DateTime, nullable=False)
     duration_minutes = Column(Integer, nullable=False)
     capacity = Column(Integer, nullable=False)
+    # Counter cache of class_registrations rows, kept by the capacity trigger in database.py
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Stored end timestamp and [start, end) range, copied into resource_bookings
+    end_time = Column(DateTime, Computed("schedule_time + duration_minutes * interval '1 minute'", persisted=True))
+    time_range = Column(TSRANGE, Computed("tsrange(schedule_time, schedule_time + duration_minutes * interval '1 minute')", persisted=True))
 
     trainer_id = Column(Integer, ForeignKey('trainers.trainer_id'))
     room_id = Column(Integer, ForeignKey('rooms.room_id'))
@@ -80,6 +86,11 @@ class GroupClass(Base):
     manager = relationship("Admin", back_populates="classes_managed")
     registrations = relationship("ClassRegistration", back_populates="group_class")
 
+    __table_args__ = (
+        # Keyset pagination of class listings (list_group_classes in logic.py)
+        Index('idx_class_schedule', 'schedule_time', 'class_id'),
+    )
+
 class PTSession(Base):
     __tablename__ = 'pt_sessions'
     session_id = Column(Integer, primary_key=True)
@@ -88,6 +99,8 @@ class PTSession(Base):
     end_time = Column(Time, nullable=False)
     status = Column(String(20), default='Scheduled')
     notes = Column(Text)
+    # [start, end) as a timestamp range so the database can enforce overlaps
+    time_range = Column(TSRANGE, Computed("tsrange(date + start_time, date + end_time)", persisted=True))
 
     member_id = Column(Integer, ForeignKey('members.member_id'))
     trainer_id = Column(Integer, ForeignKey('trainers.trainer_id'))
@@ -98,22 +111,123 @@ class PTSession(Base):
     room = relationship("Room", back_populates="pt_sessions_hosted")
     
     __table_args__ = (
-        # Creates an index to speed up conflict checking
-        Index('idx_room_date_time', 'room_id', 'date', 'start_time'),
+        # No double-booking of a member (needs btree_gist, see database.py); room and
+        # trainer overlaps are rejected by the resource_bookings ledger
+        ExcludeConstraint(('member_id', '='), ('time_range', '&&'), name='excl_pt_member_overlap', using='gist'),
+    )
+
+class ResourceBooking(Base):
+    """
+    Booking ledger - one time-range claim on a room or a trainer, made by
+    either a PT session or a group class. Both booking paths write here, so a
+    single exclusion constraint per resource type catches every conflict.
+    """
+    __tablename__ = 'resource_bookings'
+    booking_id = Column(Integer, primary_key=True)
+    resource_type = Column(String(10), nullable=False)  # 'room' or 'trainer'
+    resource_id = Column(Integer, nullable=False)
+    time_range = Column(TSRANGE, nullable=False)
+
+    # Exactly one source; ledger rows go away with the session or class
+    session_id = Column(Integer, ForeignKey('pt_sessions.session_id', ondelete='CASCADE'))
+    class_id = Column(Integer, ForeignKey('group_classes.class_id', ondelete='CASCADE'))
+
+    pt_session = relationship("PTSession")
+    group_class = relationship("GroupClass")
+
+    __table_args__ = (
+        CheckConstraint("(session_id IS NULL) <> (class_id IS NULL)", name='chk_booking_one_source'),
+        ExcludeConstraint(('resource_id', '='), ('time_range', '&&'), name='excl_room_booking',
+                          using='gist', where="resource_type = 'room'"),
+        ExcludeConstraint(('resource_id', '='), ('time_range', '&&'), name='excl_trainer_booking',
+                          using='gist', where="resource_type = 'trainer'"),
+        Index('idx_booking_session', 'session_id'),
+        Index('idx_booking_class', 'class_id'),
+    )
+
+class PTSlot(Base):
+    """
+    Bookable PT inventory - one 15-minute slot per trainer inside their
+    availability over a rolling horizon, materialised by refresh_pt_slots
+    (database.py). A slot is free while session_id and class_id are NULL;
+    schedule_pt_session claims a session's slots with one conditional UPDATE.
+    """
+    __tablename__ = 'pt_slots'
+    slot_id = Column(Integer, primary_key=True)
+    trainer_id = Column(Integer, ForeignKey('trainers.trainer_id', ondelete='CASCADE'), nullable=False)
+    slot_start = Column(DateTime, nullable=False)
+    availability_id = Column(Integer, ForeignKey('availabilities.availability_id', ondelete='CASCADE'), nullable=False)
+    # Deferred so a booking can claim its slots before inserting the session
+    # row in the same transaction; deleting the session frees them again
+    session_id = Column(Integer, ForeignKey('pt_sessions.session_id', ondelete='SET NULL',
+                                            deferrable=True, initially='DEFERRED'))
+    class_id = Column(Integer, ForeignKey('group_classes.class_id', ondelete='SET NULL'))
+
+    __table_args__ = (
+        UniqueConstraint('trainer_id', 'slot_start', name='uq_pt_slot_trainer_start'),
     )
 
 # 3. WEAK & SUPPORTING ENTITIES
 
 class HealthMetric(Base):
     __tablename__ = 'health_metrics'
-    metric_id = Column(Integer, primary_key=True)
-    date_recorded = Column(DateTime, default=datetime.now)
+    # Partitioned by month on date_recorded, so the partition key is part of the primary key
+    metric_id = Column(Integer, primary_key=True, autoincrement=True)
+    date_recorded = Column(DateTime, primary_key=True, default=datetime.now)
     type = Column(String(50), nullable=False)
     value = Column(Float, nullable=False)
     unit = Column(String(20))
     member_id = Column(Integer, ForeignKey('members.member_id'))
     member = relationship("Member", back_populates="metrics")
 
+    __table_args__ = (
+        # Latest-per-type and recent-history lookups for the dashboard; unique so
+        # bulk ingestion can de-duplicate on (member, type, timestamp)
+        Index('idx_metric_member_type_date', 'member_id', 'type', desc('date_recorded'), unique=True),
+        # Cheap time-range pruning inside each monthly partition
+        Index('brin_metric_date_recorded', 'date_recorded', postgresql_using='brin'),
+        # Monthly partitions are created by ensure_health_metric_partitions (database.py)
+        {'postgresql_partition_by': 'RANGE (date_recorded)'},
+    )
+
+class MetricRollup(Base):
+    """
+    Daily and weekly (Monday-based) summaries of health_metrics per member and
+    metric type, kept current by the trg_metric_rollups_* triggers (see database.py).
+    grain is 'day' or 'week'; bucket is the first day of the period.
+    """
+    __tablename__ = 'metric_rollups'
+    member_id = Column(Integer, ForeignKey('members.member_id', ondelete='CASCADE'), primary_key=True)
+    type = Column(String(50), primary_key=True)
+    grain = Column(String(4), primary_key=True)
+    bucket = Column(Date, primary_key=True)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    mean_value = Column(Float, Computed("sum_value / count"))
+    last_value = Column(Float, nullable=False)
+    last_recorded = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("grain IN ('day', 'week')", name='chk_rollup_grain'),
+        # Trend queries read one type and grain across many members
+        Index('idx_rollup_type_grain', 'type', 'grain', 'member_id', 'bucket'),
+    )
+
+class MemberStats(Base):
+    """
+    Per-member dashboard counters, kept current by the trg_member_class_stats
+    and trg_member_pt_stats triggers (see database.py).
+    upcoming_classes counts registrations still in 'Registered' status.
+    """
+    __tablename__ = 'member_stats'
+    member_id = Column(Integer, ForeignKey('members.member_id', ondelete='CASCADE'), primary_key=True)
+    total_classes = Column(Integer, nullable=False, default=0)
+    attended_classes = Column(Integer, nullable=False, default=0)
+    upcoming_classes = Column(Integer, nullable=False, default=0)
+    pt_sessions = Column(Integer, nullable=False, default=0)
+
 class FitnessGoal(Base):
     __tablename__ = 'fitness_goals'
     goal_id = Column(Integer, primary_key=True)
@@ -182,4 +296,17 @@ class MaintenanceLog(Base):
     equipment_id = Column(Integer, ForeignKey('equipment.equipment_id'))
     admin_id = Column(Integer, ForeignKey('admins.admin_id'))
     equipment = relationship("Equipment", back_populates="maintenance_logs")
-    admin = relationship("Admin", back_populates="maintenance_tasks")
\ No newline at end of file
+    admin = relationship("Admin", back_populates="maintenance_tasks")
+
+# SCHEMA VERSION
+
+class SchemaVersion(Base):
+    """
+    One row per migration (see migrate in database.py). checksum covers the
+    ORM tables and the SQL features, so startup compares the latest row with
+    the code in a single query instead of re-running the DDL.
+    """
+    __tablename__ = 'schema_version'
+    version_id = Column(Integer, primary_key=True)
+    checksum = Column(String(64), nullable=False)
+    applied_at = Column(DateTime, nullable=False, default=datetime.now)
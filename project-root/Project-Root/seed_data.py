@@ -1,28 +1,79 @@
-from models.database import get_session, Base, engine, my_helper_sql_features
+import argparse
+import re
+from sqlalchemy import create_engine, text
+from models.database import get_session, Base, engine, migrate, schema_is_current, column_differences, backfill_resource_bookings
 from models.schema import (
     Member, Trainer, Admin, Room, Equipment, GroupClass, PTSession,
-    Availability, HealthMetric, FitnessGoal, Billing, MaintenanceLog, ClassRegistration
+    Availability, HealthMetric, FitnessGoal, Billing, MaintenanceLog, ClassRegistration, SchemaVersion
 )
 from datetime import datetime, date, time
 
-def seed_database():
-    # 1. Reset Database (Drop all tables and recreate)
+# Functions installed by my_helper_sql_features; TRUNCATE keeps them, so the
+# fast reset is only taken while all of them are present
+SQL_FEATURE_FUNCTIONS = [
+    "apply_member_stats_delta", "track_member_class_stats", "track_member_pt_stats",
+    "reserve_class_seat", "release_class_seat", "rollup_new_metrics", "rollup_deleted_metrics",
+    "notify_cache_invalidation",
+]
+
+# Other sessions must be gone before a database can be copied or dropped
+TERMINATE_SESSIONS_SQL = text("""
+    SELECT pg_terminate_backend(pid) FROM pg_stat_activity
+    WHERE datname = :name AND pid <> pg_backend_pid()
+""")
+
+
+def schema_unchanged(conn):
+    """True if every model table exists with the same columns and the SQL features are installed."""
+    if column_differences(conn):
+        return False
+    installed = conn.execute(text("SELECT count(DISTINCT proname) FROM pg_proc WHERE proname = ANY(:names)"),
+                             {"names": SQL_FEATURE_FUNCTIONS}).scalar()
+    return installed == len(SQL_FEATURE_FUNCTIONS)
+
+
+def reset_database(full=False):
+    """
+    Empties every table with one TRUNCATE ... RESTART IDENTITY CASCADE when the
+    live schema still matches the models and its schema_version stamp is
+    current. Otherwise, or with full=True, drops and recreates every table and
+    the SQL features (triggers, partitions) and stamps the new version.
+    """
+    if not full and schema_is_current():
+        with engine.connect() as conn:
+            if schema_unchanged(conn):
+                # The version history survives the reset
+                tables = ", ".join(table.name for table in Base.metadata.sorted_tables
+                                   if table.name != SchemaVersion.__tablename__)
+                conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+                conn.commit()
+                print("Truncated all tables (schema unchanged)")
+                return
+
     print("Recreating tables...")
     
     # First, drop the VIEW and TRIGGER that depend on tables
-    from sqlalchemy import text
     with engine.connect() as conn:
         conn.execute(text("DROP VIEW IF EXISTS v_member_dashboard_stats CASCADE"))
         conn.execute(text("DROP TRIGGER IF EXISTS trg_check_capacity ON class_registrations"))
         conn.execute(text("DROP FUNCTION IF EXISTS check_room_capacity() CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS reserve_class_seat() CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS release_class_seat() CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS track_member_class_stats() CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS track_member_pt_stats() CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS rollup_new_metrics() CASCADE"))
+        conn.execute(text("DROP FUNCTION IF EXISTS rollup_deleted_metrics() CASCADE"))
         conn.commit()
         print(" wecDropped existing views and triggers")
     
     Base.metadata.drop_all(engine)
-    Base.metadata.create_all(engine)
     
-    # 2. Install Trigger and View
-    my_helper_sql_features()
+    # 2. Create tables, install Triggers and stamp the schema version
+    migrate()
+
+def seed_database(full=False):
+    # 1. Reset Database (truncate, or drop all tables and recreate)
+    reset_database(full)
     
     session = get_session()
     try:
@@ -160,13 +211,16 @@ def seed_database():
                        status="Scheduled", member_id=m1.member_id, trainer_id=t2.trainer_id, room_id=r4.room_id)
         pt2 = PTSession(date=date(2025, 12, 4), start_time=time(14, 0), end_time=time(15, 0), 
                        status="Scheduled", member_id=m2.member_id, trainer_id=t2.trainer_id, room_id=r4.room_id)
-        pt3 = PTSession(date=date(2025, 12, 3), start_time=time(18, 0), end_time=time(19, 0), 
+        pt3 = PTSession(date=date(2025, 12, 3), start_time=time(18, 30), end_time=time(19, 30), 
                        status="Scheduled", member_id=m3.member_id, trainer_id=t3.trainer_id, room_id=r4.room_id)
         
         session.add_all([pt1, pt2, pt3])
         session.commit()
         print("   PT sessions created")
 
+        # Room and trainer claims for everything above
+        backfill_resource_bookings()
+
 
         print("\n" + "="*50)
         print("Successfully seeded all data to the database")
@@ -194,5 +248,80 @@ def seed_database():
     finally:
         session.close()
 
+def admin_engine():
+    """Engine on the server's maintenance database, for CREATE and DROP DATABASE."""
+    return create_engine(engine.url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+
+
+def valid_template_name(name):
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name) or name == engine.url.database:
+        print(f"[ERROR] '{name}' is not a valid template name.")
+        return False
+    return True
+
+
+def save_template(name):
+    """Copies the current database to a template database called `name`, replacing it."""
+    if not valid_template_name(name):
+        return False
+    source = engine.url.database
+    engine.dispose()
+    admin = admin_engine()
+    try:
+        with admin.connect() as conn:
+            conn.execute(TERMINATE_SESSIONS_SQL, {"name": source})
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+            conn.execute(text(f'CREATE DATABASE "{name}" TEMPLATE "{source}"'))
+        print(f"[SUCCESS] Saved {source} as template {name}.")
+        return True
+    except Exception as e:
+        print(f"[ERROR] saving template: {e}")
+        return False
+    finally:
+        admin.dispose()
+
+
+def restore_template(name):
+    """
+    Replaces the current database with a clone of template `name`. On
+    PostgreSQL 15+ the clone is a file-level copy (STRATEGY FILE_COPY), so it
+    does not replay the data through WAL and its cost does not grow with row counts.
+    """
+    if not valid_template_name(name):
+        return False
+    target = engine.url.database
+    engine.dispose()
+    admin = admin_engine()
+    try:
+        with admin.connect() as conn:
+            if not conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}).first():
+                print(f"[ERROR] Template {name} does not exist. Save one with --save-template.")
+                return False
+            strategy = " STRATEGY FILE_COPY" if conn.dialect.server_version_info >= (15,) else ""
+            conn.execute(TERMINATE_SESSIONS_SQL, {"name": name})
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{target}" WITH (FORCE)'))
+            conn.execute(text(f'CREATE DATABASE "{target}" TEMPLATE "{name}"{strategy}'))
+        print(f"[SUCCESS] Restored {target} from template {name}.")
+        return True
+    except Exception as e:
+        print(f"[ERROR] restoring template: {e}")
+        return False
+    finally:
+        admin.dispose()
+
+
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Reset the database and load the sample data.")
+    parser.add_argument("--full", action="store_true",
+                        help="drop and recreate the schema even when it is unchanged")
+    parser.add_argument("--save-template", metavar="NAME",
+                        help="copy the current database to template NAME instead of seeding")
+    parser.add_argument("--from-template", metavar="NAME",
+                        help="replace the database with a clone of template NAME instead of seeding")
+    args = parser.parse_args()
+    if args.save_template:
+        save_template(args.save_template)
+    elif args.from_template:
+        restore_template(args.from_template)
+    else:
+        seed_database(args.full)
\ No newline at end of file